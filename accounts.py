@@ -0,0 +1,146 @@
+"""
+Customer Accounts
+=================
+
+Email addresses are matched case-insensitively. User.email keeps the
+address as the customer typed it (shown in the admin panel, used for mail);
+User.email_normalized holds normalize_email() of it and carries the unique
+index that login, signup and guest checkout look accounts up by, so
+"Jane@Example.com" and "jane@example.com " are one account and each lookup
+is a single index probe.
+
+Databases created before the column existed may hold accounts that differ
+only in case. merge_duplicate_accounts() (`flask normalize-emails`) is the
+one-time migration: it adds the column, folds every group of duplicates
+into one account, fills the column and creates the unique index.
+
+Guest checkout finds or creates its account with upsert_guest_customer():
+an INSERT .. ON CONFLICT DO NOTHING on that index creates a new account in
+one statement, and a returning guest costs one extra index probe instead of
+a write to their row.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+
+from sqlalchemy import bindparam, delete, insert, inspect, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def normalize_email(email):
+    """Lookup form of an email address: surrounding whitespace removed, lowercased"""
+    return (email or '').strip().lower()
+
+
+@lru_cache(maxsize=None)
+def placeholder_password_hash(password):
+    """
+    Hash of the guest checkout placeholder password, computed once per
+    process instead of once per guest (the KDF costs ~175 ms).
+    """
+    return generate_password_hash(password)
+
+
+def upsert_guest_customer(conn, user_table, values):
+    """
+    Find or create a guest checkout account. A new account takes one
+    statement; for an existing one a second index probe reads its id, so
+    a returning guest's row is never rewritten.
+
+    An existing account with the same normalized email is returned as is;
+    its name, phone and address are not overwritten by the guest form.
+
+    Args:
+        conn: Connection inside the booking transaction
+        user_table (Table): user
+        values (dict): Column values for a new account, including email_normalized
+
+    Returns:
+        int: The account id
+    """
+    existing = select(user_table.c.id).where(user_table.c.email_normalized == values['email_normalized'])
+    dialect = conn.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = (
+            dialect_insert(user_table).values(**values)
+            .on_conflict_do_nothing(index_elements=['email_normalized'])
+            .returning(user_table.c.id)
+        )
+        # No row back means the account exists; nothing was written to it
+        created = conn.execute(statement).scalar()
+        return created if created is not None else conn.execute(existing).scalar_one()
+
+    found = conn.execute(existing).scalar()
+    if found is not None:
+        return found
+    return conn.execute(insert(user_table).values(**values)).inserted_primary_key[0]
+
+
+def _keeper(accounts, guest_password):
+    """
+    The account a group of duplicates is merged into: an admin, else one the
+    customer set a password for (not the guest checkout placeholder), else the oldest.
+    """
+    def preference(account):
+        has_own_password = not check_password_hash(account.password_hash, guest_password)
+        return (not account.is_admin, not has_own_password, account.id)
+    return min(accounts, key=preference)
+
+
+def merge_duplicate_accounts(conn, user_table, owned_tables, guest_password, dry_run=False, log=None):
+    """
+    Merge accounts whose emails differ only in case or surrounding spaces.
+
+    Bookings, recurring schedules and photos of the merged accounts are moved
+    to the kept account before the others are deleted.
+
+    Args:
+        conn: Connection inside the migration transaction
+        user_table (Table): user
+        owned_tables (list): Tables with a user_id foreign key
+        guest_password (str): Placeholder password given to guest checkout accounts
+        dry_run (bool): Only report what would be merged
+        log (callable): Optional progress callback taking a message string
+
+    Returns:
+        dict: groups (duplicate groups found), merged (accounts removed)
+    """
+    log = log or (lambda message: None)
+    rows = conn.execute(select(user_table.c.id, user_table.c.email, user_table.c.is_admin,
+                               user_table.c.password_hash).order_by(user_table.c.id)).all()
+    groups = defaultdict(list)
+    for row in rows:
+        groups[normalize_email(row.email)].append(row)
+    duplicates = {email: accounts for email, accounts in groups.items() if len(accounts) > 1}
+
+    merged_ids = set()
+    for email, accounts in duplicates.items():
+        keeper = _keeper(accounts, guest_password)
+        others = [account.id for account in accounts if account.id != keeper.id]
+        log(f'  {email}: keeping #{keeper.id}, merging {", ".join(f"#{i}" for i in others)}')
+        merged_ids.update(others)
+        if dry_run:
+            continue
+        for table in owned_tables:
+            conn.execute(update(table).where(table.c.user_id.in_(others)).values(user_id=keeper.id))
+        conn.execute(delete(user_table).where(user_table.c.id.in_(others)))
+
+    if dry_run:
+        return {'groups': len(duplicates), 'merged': len(merged_ids)}
+
+    if 'email_normalized' not in {column['name'] for column in inspect(conn).get_columns(user_table.name)}:
+        table_name = conn.dialect.identifier_preparer.format_table(user_table)
+        conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN email_normalized VARCHAR(120)'))
+
+    remaining = [{'user_id': row.id, 'normalized': normalize_email(row.email)}
+                 for row in rows if row.id not in merged_ids]
+    if remaining:
+        conn.execute(update(user_table).where(user_table.c.id == bindparam('user_id'))
+                     .values(email_normalized=bindparam('normalized')), remaining)
+    for index in user_table.indexes:
+        if 'email_normalized' in index.columns:
+            index.create(conn, checkfirst=True)
+
+    return {'groups': len(duplicates), 'merged': len(merged_ids)}
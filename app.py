@@ -22,42 +22,42 @@ For: AMR Services
 Date: 2025
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, jsonify, session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, validates
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, date, time, timedelta
+from collections import Counter
 import pytz
 import os
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import sys
 import threading
 import time as time_module
-from flask import current_app
-from email.mime.base import MIMEBase
-from email import encoders
-import os
-from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
+import click
+from logging_config import configure_logging
+from metrics import init_metrics
+from profiling import init_profiling
+from database import configure_database, RoutingSession, use_replica, snapshot_sqlite
+from rollups import track_booking_rollups, rebuild_rollups, apply_deltas
+from events import BOOKING_STATUS_CHANGED, init_events, publish, stream_events, track_booking_events
+from availability import init_availability, next_open_slots, open_slots, slots_by_day, stream_availability
+from business_calendar import CLOSED, CalendarRules, hours_mask, init_business_calendar, minutes_of
+from sessions import init_sessions
+from accounts import merge_duplicate_accounts, normalize_email, placeholder_password_hash, upsert_guest_customer
+from tasks import defer, init_tasks
+from booking_status import (BOOKING_STATUSES, COMPLETED, PENDING, STATUS_CODE_CHECK, STATUS_CODE_CHECK_NAME,
+                            status_code, status_name)
+from intervals import (assign_uncrewed_bookings, booking_span, busy_crews, busy_spans, day_window,
+                       install_interval_schema, is_overlap_violation, track_booking_spans)
+from search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, rebuild_search_index, search_customers, track_customer_search
 
 load_dotenv()
 
-
-# Application Configuration
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///amr_bookings.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Email Configuration (configure these for email notifications)
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'  # Change to your email provider
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USERNAME'] = 'your-email@gmail.com'  # Your email
-app.config['MAIL_PASSWORD'] = 'your-app-password'     # Your email app password
-app.config['MAIL_USE_TLS'] = True
-
 # Business Configuration
 # Eastern timezone configuration for Charlotte/Carolinas area
 EASTERN_TZ = pytz.timezone('US/Eastern')
@@ -77,12 +77,15 @@ def get_current_eastern_date():
     """Get current date in Eastern timezone"""
     return get_current_eastern_time().date()
 
-# Initialize database and login manager
-db = SQLAlchemy(app)
+# Extensions are bound to the app in create_app()
+# RoutingSession sends @use_replica views to the read replica (see database.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# All routes live on this blueprint; create_app() registers it
+bp = Blueprint('main', __name__, cli_group=None)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -99,7 +102,9 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    # normalize_email(email); every account lookup by email goes through this index
+    email_normalized = db.Column(db.String(120), unique=True, index=True, nullable=False)
     phone = db.Column(db.String(20), nullable=False)
     address = db.Column(db.Text, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
@@ -122,9 +127,18 @@ class User(UserMixin, db.Model):
         """Check if provided password matches hash"""
         return check_password_hash(self.password_hash, password)
     
+    @validates('email')
+    def _set_email_normalized(self, key, email):
+        email = email.strip()
+        self.email_normalized = normalize_email(email)
+        return email
+    
     def __repr__(self):
         return f'<User {self.full_name}>'
 
+# Customer search index (FTS5 on SQLite, pg_trgm on Postgres) is created with the user table
+track_customer_search(User.__table__)
+
 class ServiceType(db.Model):
     """
     Defines the different types of services offered by AMR.
@@ -144,6 +158,74 @@ class ServiceType(db.Model):
     def __repr__(self):
         return f'<ServiceType {self.name}>'
 
+class Crew(db.Model):
+    """
+    A crew that can work one job at a time. Active crews of a category form
+    that category's pool: up to that many of its bookings may overlap.
+    With no crews set up, the business is scheduled as a single crew.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50), nullable=False)  # 'landscaping' or 'pressure_washing'
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Crew {self.name} ({self.category})>'
+
+# ========================================
+# BUSINESS CALENDAR RULES (see business_calendar.py)
+# ========================================
+
+class BusinessHours(db.Model):
+    """
+    Weekly template: the hours of one weekday. Weekdays without a row use
+    BUSINESS_HOURS.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    weekday = db.Column(db.Integer, unique=True, nullable=False)  # 0 = Monday .. 6 = Sunday
+    open_time = db.Column(db.Time)
+    close_time = db.Column(db.Time)
+    is_closed = db.Column(db.Boolean, default=False, nullable=False)
+
+class BusinessHoursOverride(db.Model):
+    """Other hours, or closed, on one date (replaces the weekly template that day)"""
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, unique=True, nullable=False)
+    open_time = db.Column(db.Time)
+    close_time = db.Column(db.Time)
+    is_closed = db.Column(db.Boolean, default=False, nullable=False)
+    note = db.Column(db.String(200))
+
+class BusinessBlackout(db.Model):
+    """No bookings from start_date to end_date inclusive (beats overrides)"""
+    id = db.Column(db.Integer, primary_key=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    reason = db.Column(db.String(200))
+
+# Allowed values for ServiceType.category and Crew.category
+SERVICE_CATEGORIES = ('landscaping', 'pressure_washing')
+
+# Most entries accepted by one bulk status update request
+MAX_BULK_STATUS_UPDATES = 500
+
+# Largest page size for /api/customer/bookings?page=
+MAX_CUSTOMER_BOOKINGS_PAGE_SIZE = 100
+
+# Largest JSON body accepted by /api/set-booking-options (kept in the session)
+MAX_BOOKING_OPTIONS_BYTES = 4096
+
+# Longest date range one /api/availability request may cover
+MAX_AVAILABILITY_RANGE_DAYS = 92
+
+# How far ahead the "next available" search looks, and how many slots it may return
+NEXT_AVAILABLE_HORIZON_DAYS = 180
+MAX_NEXT_AVAILABLE_SLOTS = 50
+
+# Password given to accounts created by guest checkout, until the customer sets one
+GUEST_PLACEHOLDER_PASSWORD = 'temp_password_123'
+
 class Booking(db.Model):
     """
     Main booking model that stores appointment information.
@@ -154,14 +236,21 @@ class Booking(db.Model):
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     service_type_id = db.Column(db.Integer, db.ForeignKey('service_type.id'), nullable=False)
+    crew_id = db.Column(db.Integer, db.ForeignKey('crew.id'))  # Assigned at booking once crews are set up
     
     # Booking details
     booking_date = db.Column(db.Date, nullable=False)
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)       # Calculated based on service duration
     
+    # Occupied interval in minutes since 1970-01-01, kept in step by intervals.py
+    span_start = db.Column(db.Integer)
+    span_end = db.Column(db.Integer)
+    
     # Status tracking
     status = db.Column(db.String(20), default='pending')  # pending, confirmed, completed, cancelled
+    # The same status as a small int (see booking_status.py); queries and indexes use this
+    status_code = db.Column(db.SmallInteger, default=PENDING, nullable=False)
     custom_description = db.Column(db.Text)               # For custom services
     admin_notes = db.Column(db.Text)                      # Internal notes
     
@@ -169,6 +258,26 @@ class Booking(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # status_code always matches status
+        db.CheckConstraint(STATUS_CODE_CHECK, name=STATUS_CODE_CHECK_NAME),
+        # A customer's bookings, newest first (customer panel)
+        db.Index('ix_booking_user_created', 'user_id', 'created_at'),
+        # Per-customer status counts and last booking date, from the index alone
+        db.Index('ix_booking_user_status', 'user_id', 'status_code', 'booking_date'),
+        # Overlap queries for any window, answered from the index alone
+        db.Index('ix_booking_span', 'span_start', 'span_end', 'status_code', 'service_type_id', 'crew_id'),
+        # Bookings in one status in time order (dashboard pending list)
+        db.Index('ix_booking_status_span', 'status_code', 'span_start'),
+        # Recently created bookings (dashboard)
+        db.Index('ix_booking_created', 'created_at'),
+    )
+    
+    @validates('status')
+    def _set_status_code(self, key, status):
+        self.status_code = status_code(status)
+        return status
+    
     def calculate_end_time(self):
         """Calculate end time based on service duration"""
         duration = timedelta(hours=self.service_type.duration_hours)
@@ -228,11 +337,35 @@ class ServicePhoto(db.Model):
     booking = db.relationship('Booking', backref='photos')
     user = db.relationship('User', backref='photos')
 
+class BookingDailyStat(db.Model):
+    """
+    Rollup: number of bookings per day, service and status.
+    Maintained by rollups.py; rebuild with `flask rebuild-rollups`.
+    """
+    booking_date = db.Column(db.Date, primary_key=True)
+    service_type_id = db.Column(db.Integer, db.ForeignKey('service_type.id'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    booking_count = db.Column(db.Integer, nullable=False, default=0)
+
+class BookingStatusTotal(db.Model):
+    """
+    Rollup: number of bookings per status across all dates, so dashboard
+    totals are a handful of rows however much history there is.
+    """
+    status = db.Column(db.String(20), primary_key=True)
+    booking_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Every ORM write fills the booking's interval columns
+track_booking_spans(Booking)
+
+# Every ORM flush that creates, deletes or re-statuses a booking updates the rollups
+track_booking_rollups(RoutingSession, Booking, BookingDailyStat.__table__, BookingStatusTotal.__table__)
+
 # ========================================
 # AUTHENTICATION ROUTES
 # ========================================
 
-@app.route('/api/signup', methods=['POST'])
+@bp.route('/api/signup', methods=['POST'])
 def api_signup():
     """API endpoint for user registration"""
     try:
@@ -245,7 +378,7 @@ def api_signup():
                 return jsonify({'success': False, 'message': f'{field} is required'}), 400
         
         # Check if user already exists
-        if User.query.filter_by(email=data['email']).first():
+        if User.query.filter_by(email_normalized=normalize_email(data['email'])).first():
             return jsonify({'success': False, 'message': 'User with this email already exists'}), 400
         
         # Create new user
@@ -281,7 +414,7 @@ def api_signup():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Error creating account: {str(e)}'}), 500
 
-@app.route('/api/login', methods=['POST'])
+@bp.route('/api/login', methods=['POST'])
 def api_login():
     """API endpoint for user login"""
     try:
@@ -292,7 +425,7 @@ def api_login():
         if not email or not password:
             return jsonify({'success': False, 'message': 'Email and password are required'}), 400
         
-        user = User.query.filter_by(email=email).first()
+        user = User.query.filter_by(email_normalized=normalize_email(email)).first()
         
         if user and user.check_password(password):
             login_user(user)
@@ -314,14 +447,14 @@ def api_login():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error logging in: {str(e)}'}), 500
 
-@app.route('/api/logout', methods=['POST'])
+@bp.route('/api/logout', methods=['POST'])
 @login_required
 def api_logout():
     """API endpoint for user logout"""
     logout_user()
     return jsonify({'success': True, 'message': 'Logged out successfully'})
 
-@app.route('/api/current-user', methods=['GET'])
+@bp.route('/api/current-user', methods=['GET'])
 def api_current_user():
     """API endpoint to get current user info"""
     if current_user.is_authenticated:
@@ -338,7 +471,7 @@ def api_current_user():
         })
     else:
         return jsonify({'authenticated': False, 'isAdmin': False})
-@app.context_processor
+@bp.app_context_processor
 def inject_google_maps_key():
     return dict(google_maps_key=os.getenv('GOOGLE_MAPS_API_KEY'))
 
@@ -346,6 +479,151 @@ def inject_google_maps_key():
 # UTILITY FUNCTIONS
 # ========================================
 
+def earliest_booking_time(selected_date, eastern_now):
+    """
+    First start time customers may book on a date: midnight on future dates
+    (the business calendar decides when the day opens), 2 hours from now
+    (rounded up to the next 30-minute slot) today, None for past dates.
+    
+    Args:
+        selected_date (date): The date to check
+        eastern_now (datetime): Current Eastern time
+        
+    Returns:
+        time: Earliest start time, or None if the date can't be booked
+    """
+    today_eastern = eastern_now.date()
+    
+    # Don't allow booking for past dates
+    if selected_date < today_eastern:
+        return None
+    
+    # Future dates: only business hours limit the start
+    if selected_date > today_eastern:
+        return time(0, 0)
+    
+    # Calculate minimum booking time (2 hours from now in Eastern time)
+    min_booking_time = eastern_now + timedelta(hours=2)
+    if min_booking_time.date() > today_eastern:
+        return None
+    
+    # Round up to next 30-minute slot
+    minutes = min_booking_time.minute
+    if minutes == 0:
+        earliest_time = min_booking_time.time().replace(second=0, microsecond=0)
+    elif minutes <= 30:
+        earliest_time = min_booking_time.replace(minute=30, second=0, microsecond=0).time()
+    else:
+        # Round up to next hour
+        next_hour = min_booking_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        if next_hour.date() > today_eastern:
+            return None
+        earliest_time = next_hour.time()
+    
+    return earliest_time
+
+
+def load_business_rules():
+    """
+    The stored business calendar rules (weekly template, date overrides,
+    blackouts) as slot masks, for business_calendar.BusinessCalendar.
+    
+    Returns:
+        CalendarRules
+    """
+    def rule_mask(rule):
+        if rule.is_closed or rule.open_time is None or rule.close_time is None:
+            return CLOSED
+        return hours_mask(minutes_of(rule.open_time), minutes_of(rule.close_time))
+    
+    return CalendarRules(
+        default=hours_mask(minutes_of(BUSINESS_HOURS['start']), minutes_of(BUSINESS_HOURS['end'])),
+        weekly={rule.weekday: rule_mask(rule) for rule in BusinessHours.query.all()},
+        overrides={rule.date: rule_mask(rule) for rule in BusinessHoursOverride.query.all()},
+        blackouts=[(rule.start_date, rule.end_date) for rule in BusinessBlackout.query.all()],
+    )
+
+
+def business_hours_by_day(first_day, last_day):
+    """
+    Slot masks of business hours for a date range, from the compiled
+    business calendar (see business_calendar.py).
+    
+    Returns:
+        dict: date -> slot mask
+    """
+    return current_app.extensions['amr_calendar'].masks(first_day, last_day)
+
+
+def service_block_minutes(duration_hours, is_custom):
+    """
+    Minutes a booking of a service holds in the schedule. The slot search
+    looks for this many free minutes and the booking is stored with this
+    length (see booking_end_time()), so what is offered is what gets held.
+    Custom landscaping blocks only the selected slot (1 hour for safety
+    buffer); standard services block their full duration.
+    """
+    if is_custom:
+        return 60
+    return int(round(duration_hours * 60))
+
+
+def blocking_minutes(service_duration_hours, service_type=None):
+    """service_block_minutes() of a ServiceType (a standard service if None)"""
+    return service_block_minutes(service_duration_hours, bool(service_type and service_type.is_custom))
+
+
+def booking_end_time(booking_date, start_time, block_minutes):
+    """End time of a booking holding `block_minutes` from `start_time` (may pass midnight)"""
+    return (datetime.combine(booking_date, start_time) + timedelta(minutes=block_minutes)).time()
+
+
+def crew_pool(service_type=None):
+    """
+    The crews a service's bookings are scheduled against.
+    
+    With no crews set up the whole business is one crew and every booking
+    competes with every other. Otherwise each category has its own pool:
+    only bookings of that category's services count, against the number of
+    its active crews. Without a service, the pool is every active crew.
+    
+    Args:
+        service_type (ServiceType): The service, or None for the whole business
+        
+    Returns:
+        tuple: (service_type_ids, capacity); service_type_ids is None when
+            bookings of every service count
+    """
+    crews = db.session.execute(select(Crew.category, Crew.is_active)).all()
+    if not crews:
+        return None, 1
+    if service_type is None:
+        return None, sum(1 for crew in crews if crew.is_active)
+    capacity = sum(1 for crew in crews if crew.is_active and crew.category == service_type.category)
+    service_type_ids = db.session.execute(
+        select(ServiceType.id).where(ServiceType.category == service_type.category)
+    ).scalars().all()
+    return service_type_ids, capacity
+
+
+def assign_crew(service_type, span_start, span_end):
+    """
+    Crew for a new booking: the first active crew of the service's category
+    with no active booking overlapping the interval.
+    
+    Returns:
+        tuple: (crews_set_up, crew_id); crew_id is None when no crew is free,
+            or when no crews are set up (the booking then gets no crew)
+    """
+    if db.session.execute(select(Crew.id).limit(1)).first() is None:
+        return False, None
+    crew_ids = db.session.execute(
+        select(Crew.id).where(Crew.category == service_type.category, Crew.is_active.is_(True)).order_by(Crew.id)
+    ).scalars().all()
+    busy = busy_crews(db.session, Booking.__table__, span_start, span_end, crew_ids) if crew_ids else set()
+    return True, next((crew_id for crew_id in crew_ids if crew_id not in busy), None)
+
+
 def get_available_time_slots(selected_date, service_duration_hours, service_type=None):
     """
     Calculate available time slots for a given date and service duration.
@@ -353,6 +631,7 @@ def get_available_time_slots(selected_date, service_duration_hours, service_type
     Business hours: 6:00 AM to 8:00 PM Eastern
     Time slots: 30-minute increments
     Minimum 2-hour advance booking required (Eastern time)
+    A slot is open while fewer bookings overlap it than the crew pool has crews.
     
     Args:
         selected_date (date): The date to check availability
@@ -362,80 +641,94 @@ def get_available_time_slots(selected_date, service_duration_hours, service_type
     Returns:
         list: Available time slots as time objects
     """
+    earliest_time = earliest_booking_time(selected_date, get_current_eastern_time())
+    if earliest_time is None:
+        return []
     
-    # Get current Eastern time
-    eastern_now = get_current_eastern_time()
-    today_eastern = eastern_now.date()
+    # Intervals the pool holds on this date (cancelled bookings no longer hold
+    # their slot), one range scan of ix_booking_span
+    service_type_ids, capacity = crew_pool(service_type)
+    busy = busy_spans(db.session, Booking.__table__, *day_window(selected_date), service_type_ids)
     
-    # Don't allow booking for past dates
-    if selected_date < today_eastern:
-        return []
+    hours = business_hours_by_day(selected_date, selected_date)[selected_date]
+    return open_slots(selected_date, earliest_time, hours,
+                      blocking_minutes(service_duration_hours, service_type), busy, capacity)
+
+
+def available_slots_by_day(first_day, last_day, service_duration_hours, service_type=None):
+    """
+    get_available_time_slots() for every date in a range, from a single
+    range query for the busy intervals of the whole range.
     
-    # Get existing bookings for this date
-    existing_bookings = Booking.query.filter_by(booking_date=selected_date).all()
+    Args:
+        first_day (date): First date of the range
+        last_day (date): Last date of the range (inclusive)
+        service_duration_hours (float): Duration of the service in hours
+        service_type (ServiceType): The service type object
+        
+    Returns:
+        dict: date -> list of available time slots as time objects
+    """
+    eastern_now = get_current_eastern_time()
+    service_type_ids, capacity = crew_pool(service_type)
+    busy = busy_spans(db.session, Booking.__table__,
+                      day_window(first_day)[0], day_window(last_day)[1], service_type_ids)
+    return slots_by_day(first_day, last_day, lambda day: earliest_booking_time(day, eastern_now),
+                        business_hours_by_day(first_day, last_day),
+                        blocking_minutes(service_duration_hours, service_type), busy, capacity)
+
+
+def next_available_slots(service_types, first_day, limit=1, horizon_days=NEXT_AVAILABLE_HORIZON_DAYS):
+    """
+    The first open slots for each service from a date on.
     
-    # Calculate minimum booking time (2 hours from now in Eastern time)
-    min_booking_time = eastern_now + timedelta(hours=2)
+    Closed days, and days whose hours are too short for the service, are
+    skipped using the business calendar. The rest are evaluated slot by slot,
+    with busy intervals fetched a couple of weeks per query and shared by
+    every service of the same crew pool.
     
-    # If booking for today, use minimum booking time
-    # If booking for future date, start from business hours
-    if selected_date == today_eastern:
-        # Round up to next 30-minute slot
-        minutes = min_booking_time.minute
-        if minutes == 0:
-            earliest_time = min_booking_time.time()
-        elif minutes <= 30:
-            earliest_time = min_booking_time.replace(minute=30, second=0, microsecond=0).time()
-        else:
-            # Round up to next hour
-            next_hour = min_booking_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-            earliest_time = next_hour.time()
-        
-        # Don't allow booking before business hours start (6 AM Eastern)
-        business_start = BUSINESS_HOURS['start']  # 6:00 AM
-        if earliest_time < business_start:
-            earliest_time = business_start
-    else:
-        # Future dates can start from business hours
-        earliest_time = BUSINESS_HOURS['start']  # 6:00 AM
-    
-    # Create list of all possible 30-minute slots
-    available_slots = []
-    current_time = earliest_time
-    end_time = BUSINESS_HOURS['end']  # 8:00 PM
-    
-    while current_time < end_time:
-        # Determine blocking duration based on service type
-        if service_type and service_type.is_custom:
-            # Custom landscaping: block only the selected slot (use 1.0 hour for safety buffer)
-            blocking_duration = 1.0
-        else:
-            # Standard services: use full duration
-            blocking_duration = service_duration_hours
-        
-        # Calculate when this service would end
-        start_datetime = datetime.combine(selected_date, current_time)
-        end_datetime = start_datetime + timedelta(hours=blocking_duration)
-        service_end_time = end_datetime.time()
-        
-        # Check if service would end before business hours end (8 PM)
-        if service_end_time <= end_time:
-            # Check for conflicts with existing bookings
-            slot_available = True
-            
-            for booking in existing_bookings:
-                # Check if this time slot overlaps with existing booking
-                if (current_time < booking.end_time and service_end_time > booking.start_time):
-                    slot_available = False
-                    break
-            
-            if slot_available:
-                available_slots.append(current_time)
+    Args:
+        service_types (list): ServiceType objects
+        first_day (date): Date to start searching from
+        limit (int): Slots wanted per service
+        horizon_days (int): Days searched before giving up
         
-        # Move to next 30-minute slot
-        current_time = (datetime.combine(date.today(), current_time) + timedelta(minutes=30)).time()
+    Returns:
+        dict: service id -> list of (date, time) pairs
+    """
+    last_day = first_day + timedelta(days=horizon_days - 1)
+    eastern_now = get_current_eastern_time()
+    hours = business_hours_by_day(first_day, last_day)
+    busy_cache = {}
+    
+    def search(service):
+        service_type_ids, capacity = crew_pool(service)
+        pool = tuple(service_type_ids) if service_type_ids is not None else None
+        
+        def busy_between(first, last):
+            if (pool, first, last) not in busy_cache:
+                busy_cache[(pool, first, last)] = busy_spans(db.session, Booking.__table__,
+                                                             day_window(first)[0], day_window(last)[1],
+                                                             service_type_ids)
+            return busy_cache[(pool, first, last)]
+        
+        return next_open_slots(first_day, last_day, lambda day: earliest_booking_time(day, eastern_now),
+                               hours, blocking_minutes(service.duration_hours, service), busy_between,
+                               limit, capacity)
     
-    return available_slots
+    return {service.id: search(service) for service in service_types}
+
+
+def available_slot_times(selected_date, service_id):
+    """
+    Open start times for a service on a date as 'HH:MM' strings
+    (the values cached and streamed by availability.py).
+    """
+    service = db.session.get(ServiceType, service_id)
+    if service is None:
+        return []
+    slots = get_available_time_slots(selected_date, service.duration_hours, service)
+    return [slot.strftime('%H:%M') for slot in slots]
 
 
 def is_date_available(check_date):
@@ -462,532 +755,71 @@ def is_date_available(check_date):
 def send_confirmation_email(booking):
     """
     Send booking confirmation email to customer.
-    Enhanced version with logo image and service-specific colors.
+    The mail module (smtplib, ssl, MIME) is imported on first use.
     
     Args:
         booking (Booking): The booking object to send confirmation for
     """
-    try:
-        # Email configuration
-        smtp_server = "smtp.gmail.com"
-        port = 587
-        
-        # Your Gmail credentials
-        sender_email = "amrservicescontact@gmail.com"
-        sender_password = "vtdd evzr okic znzk"
-        sender_name = "AMR Services"
-        
-        # Service-specific colors
-        if booking.service_type.category == 'landscaping':
-            primary_color = "#035F0A"  # Your green color
-            service_emoji = "🌱"
-        else:  # pressure_washing
-            primary_color = "#7EE0FF"  # Your blue color
-            service_emoji = "💧"
-        
-        # Create email message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"AMR Services - Booking Confirmation #{booking.id}"
-        msg['From'] = f"{sender_name} <{sender_email}>"
-        msg['To'] = booking.user.email
-        
-        # Create the email body (HTML version with logo and dynamic colors)
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ 
-                    background-color: {primary_color}; 
-                    color: white; 
-                    padding: 30px 20px; 
-                    text-align: center; 
-                    border-radius: 10px 10px 0 0; 
-                    position: relative;
-                }}
-                .logo {{ 
-                    max-width: 120px; 
-                    height: auto; 
-                    border-radius: 15px; 
-                    margin-bottom: 15px;
-                    border: 3px solid white;
-                    box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-                }}
-                .content {{ background-color: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px; }}
-                .detail-row {{ 
-                    margin: 10px 0; 
-                    padding: 15px; 
-                    background-color: white; 
-                    border-radius: 8px; 
-                    border-left: 4px solid {primary_color};
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .emoji {{ font-size: 1.2em; margin-right: 8px; }}
-                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 0.9em; }}
-                .service-badge {{
-                    background-color: {primary_color};
-                    color: white;
-                    padding: 8px 16px;
-                    border-radius: 20px;
-                    font-weight: bold;
-                    display: inline-block;
-                    margin: 10px 0;
-                }}
-                .contact-info {{
-                    background-color: {primary_color};
-                    color: white;
-                    padding: 15px;
-                    border-radius: 8px;
-                    margin: 15px 0;
-                }}
-                .what-to-expect {{
-                    background-color: rgba({int(primary_color[1:3], 16)}, {int(primary_color[3:5], 16)}, {int(primary_color[5:7], 16)}, 0.1);
-                    padding: 15px;
-                    border-radius: 8px;
-                    border: 1px solid {primary_color};
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1 style="margin: 0; color: white;">{service_emoji} AMR Services</h1>
-                    <h2 style="margin: 0; font-size: 1.8em;">{service_emoji} Booking Confirmed!</h2>
-                    <div class="service-badge">{booking.service_type.category.replace('_', ' ').title()} Service</div>
-                </div>
-                
-                <div class="content">
-                    <p style="font-size: 1.1em; margin-bottom: 20px;">Hi <strong>{booking.user.first_name}</strong>,</p>
-                    
-                    <p>Great news! Your appointment with AMR Services has been confirmed. Here are your booking details:</p>
-                    
-                    <div class="detail-row">
-                        <span class="emoji">🛠️</span><strong>Service:</strong> {booking.service_type.name}
-                    </div>
-                    
-                    <div class="detail-row">
-                        <span class="emoji">📅</span><strong>Date:</strong> {booking.booking_date.strftime('%A, %B %d, %Y')}
-                    </div>
-                    
-                    <div class="detail-row">
-                        <span class="emoji">🕐</span><strong>Time:</strong> {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}
-                    </div>
-                    
-                    <div class="detail-row">
-                        <span class="emoji">⏱️</span><strong>Duration:</strong> {booking.duration_display}
-                    </div>
-                    
-                    <div class="detail-row">
-                        <span class="emoji">📍</span><strong>Service Address:</strong><br>{booking.user.address}
-                    </div>
-                    
-                    <div class="detail-row">
-                        <span class="emoji">🎫</span><strong>Booking ID:</strong> #{booking.id}
-                    </div>
-                    
-                    {f'<div class="detail-row"><span class="emoji">📝</span><strong>Special Request:</strong><br>{booking.custom_description}</div>' if booking.custom_description else ''}
-                    
-                    <div class="what-to-expect">
-                        <h3 style="color: {primary_color}; margin-top: 0;">What to expect:</h3>
-                        <ul style="margin: 10px 0;">
-                            <li>Our team will arrive at the scheduled time</li>
-                            <li>Please ensure access to the work area</li>
-                            <li>We'll clean up after ourselves</li>
-                            <li>Payment can be made after service completion</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="contact-info">
-                        <h3 style="margin-top: 0;">Need to make changes? Contact us:</h3>
-                        <p style="margin: 5px 0;">📧 Email: {sender_email}</p>
-                        <p style="margin: 5px 0;">📱 Phone: (803) 899-4393</p>
-                    </div>
-                    
-                    <p style="text-align: center; font-size: 1.1em; color: {primary_color}; font-weight: bold;">
-                        Thank you for choosing AMR Services!
-                    </p>
-                    
-                    <div class="footer">
-                        <p style="color: {primary_color}; font-weight: bold;">AMR Landscaping & Pressure Washing</p>
-                        <p>Professional service you can trust</p>
-                        
-                        <p><small>This email was sent because you booked a service with AMR Services. 
-                        If you didn't make this booking, please contact us immediately.</small></p>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create plain text version as backup
-        text_body = f"""
-        AMR Services - Booking Confirmation
-        
-        Hi {booking.user.first_name},
-        
-        Your {booking.service_type.category.replace('_', ' ')} appointment with AMR Services has been confirmed!
-        
-        Booking Details:
-        ================
-        Service: {booking.service_type.name}
-        Date: {booking.booking_date.strftime('%A, %B %d, %Y')}
-        Time: {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}
-        Duration: {booking.duration_display}
-        Address: {booking.user.address}
-        Booking ID: #{booking.id}
-        
-        {f'Special Request: {booking.custom_description}' if booking.custom_description else ''}
-        
-        What to expect:
-        - Our team will arrive at the scheduled time
-        - Please ensure access to the work area  
-        - We'll clean up after ourselves
-        - Payment can be made after service completion
-        
-        Need to make changes? Contact us:
-        Email: {sender_email}
-        Phone: (803) 899-4393
-        
-        Thank you for choosing AMR Services!
-        
-        AMR Landscaping & Pressure Washing
-        Professional service you can trust
-        """
-        # Attach both versions
-        part1 = MIMEText(text_body, 'plain')
-        part2 = MIMEText(html_body, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
-
-        # Send the email
-        context = ssl.create_default_context()
-        # Send the email
-        context = ssl.create_default_context()
-        with smtplib.SMTP(smtp_server, port) as server:
-            server.starttls(context=context)
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-        
-        print(f"✅ Confirmation email sent successfully to {booking.user.email}")
-        print(f"   Service: {booking.service_type.category} (using {primary_color} theme)")
-        return True
-        
-        # Send the email
-        context = ssl.create_default_context()
-        with smtplib.SMTP(smtp_server, port) as server:
-            server.starttls(context=context)
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-        
-        print(f"✅ Confirmation email sent successfully to {booking.user.email}")
-        print(f"   Service: {booking.service_type.category} (using {primary_color} theme)")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error sending email to {booking.user.email}: {str(e)}")
-        
-        # Still print the fallback version
-        print(f"\n📧 EMAIL CONTENT (would have been sent to {booking.user.email}):")
-        print(f"Subject: AMR Services - Booking Confirmation #{booking.id}")
-        print(f"To: {booking.user.full_name} <{booking.user.email}>")
-        print(f"Service Type: {booking.service_type.category}")
-        print("\n" + "="*50)
-        print(text_body)
-        print("="*50 + "\n")
-        
-        return False
+    from mailer import send_confirmation_email as send
+    return send(booking)
+
 
-def send_reminder_email(booking):
+def send_booking_confirmation(booking_id):
     """
-    Send 24-hour reminder email to customer.
+    Background task: reload the booking and send its confirmation email.
     
     Args:
-        booking (Booking): The booking object to send reminder for
+        booking_id (int): ID of a committed booking
     """
-    try:
-        # Email configuration
-        smtp_server = "smtp.gmail.com"
-        port = 587
-        
-        # Your Gmail credentials
-        sender_email = "amrservicescontact@gmail.com"
-        sender_password = "vtdd evzr okic znzk"
-        sender_name = "AMR Services"
-        
-        # Service-specific colors and emoji
-        if booking.service_type.category == 'landscaping':
-            primary_color = "#035F0A"
-            service_emoji = "🌱"
-        else:  # pressure_washing
-            primary_color = "#7EE0FF"
-            service_emoji = "💧"
-        
-        # Create email message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"⏰ Reminder: AMR Service Tomorrow - Booking #{booking.id}"
-        msg['From'] = f"{sender_name} <{sender_email}>"
-        msg['To'] = booking.user.email
-        
-        # Calculate time until service
-        service_datetime = datetime.combine(booking.booking_date, booking.start_time)
-        time_until = service_datetime - datetime.now()
-        hours_until = int(time_until.total_seconds() / 3600)
-        
-        # Create reminder HTML email
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ 
-                    background: linear-gradient(135deg, {primary_color} 0%, {primary_color}dd 100%);
-                    color: white; 
-                    padding: 25px; 
-                    text-align: center; 
-                    border-radius: 15px 15px 0 0;
-                }}
-                .content {{ background-color: #f9f9f9; padding: 25px; border-radius: 0 0 15px 15px; }}
-                .reminder-badge {{
-                    background-color: #FF6B35;
-                    color: white;
-                    padding: 10px 20px;
-                    border-radius: 25px;
-                    font-weight: bold;
-                    display: inline-block;
-                    margin: 10px 0;
-                    font-size: 1.1em;
-                }}
-                .detail-box {{ 
-                    background: white; 
-                    padding: 20px; 
-                    border-radius: 10px; 
-                    border-left: 5px solid {primary_color};
-                    margin: 15px 0;
-                    box-shadow: 0 3px 6px rgba(0,0,0,0.1);
-                }}
-                .important-note {{
-                    background-color: #FFF3CD;
-                    border: 1px solid #FFEAA7;
-                    color: #856404;
-                    padding: 15px;
-                    border-radius: 8px;
-                    margin: 20px 0;
-                }}
-                .contact-section {{
-                    background-color: {primary_color};
-                    color: white;
-                    padding: 20px;
-                    border-radius: 10px;
-                    text-align: center;
-                    margin: 20px 0;
-                }}
-                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 0.9em; }}
-                .emoji {{ font-size: 1.3em; margin-right: 10px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1 style="margin: 0;">{service_emoji} AMR Services</h1>
-                    <div class="reminder-badge">⏰ Service Reminder</div>
-                    <h2 style="margin: 10px 0 0 0;">Your appointment is tomorrow!</h2>
-                </div>
-                
-                <div class="content">
-                    <p style="font-size: 1.2em; color: {primary_color}; font-weight: bold;">
-                        Hi {booking.user.first_name}, just a friendly reminder about your upcoming service!
-                    </p>
-                    
-                    <div class="detail-box">
-                        <h3 style="color: {primary_color}; margin-top: 0;">📋 Appointment Details</h3>
-                        <p><span class="emoji">🛠️</span><strong>Service:</strong> {booking.service_type.name}</p>
-                        <p><span class="emoji">📅</span><strong>Date:</strong> {booking.booking_date.strftime('%A, %B %d, %Y')}</p>
-                        <p><span class="emoji">🕐</span><strong>Time:</strong> {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}</p>
-                        <p><span class="emoji">📍</span><strong>Address:</strong> {booking.user.address}</p>
-                        <p><span class="emoji">🎫</span><strong>Booking ID:</strong> #{booking.id}</p>
-                        {f'<p><span class="emoji">📝</span><strong>Special Request:</strong> {booking.custom_description}</p>' if booking.custom_description else ''}
-                    </div>
-                    
-                    <div class="important-note">
-                        <h3 style="margin-top: 0;">⚠️ Please Prepare for Our Arrival</h3>
-                        <ul style="margin: 10px 0;">
-                            <li><strong>Clear access</strong> to work areas (move cars, outdoor furniture, etc.)</li>
-                            <li><strong>Secure pets</strong> indoors during service</li>
-                            <li><strong>Be available</strong> for any questions from our team</li>
-                            <li><strong>Water access</strong> available if needed</li>
-                        </ul>
-                    </div>
-                    
-                    <div style="background-color: rgba({int(primary_color[1:3], 16)}, {int(primary_color[3:5], 16)}, {int(primary_color[5:7], 16)}, 0.1); padding: 20px; border-radius: 10px; margin: 20px 0;">
-                        <h3 style="color: {primary_color}; margin-top: 0;">☀️ Weather Considerations</h3>
-                        <p>Our team monitors weather conditions. If severe weather is forecasted, we'll contact you about rescheduling. Light rain typically doesn't affect most of our services.</p>
-                    </div>
-                    
-                    <div class="contact-section">
-                        <h3 style="margin-top: 0;">Need to reschedule or have questions?</h3>
-                        <p style="font-size: 1.1em; margin: 10px 0;">📧 <strong>{sender_email}</strong></p>
-                        <p style="font-size: 1.1em; margin: 10px 0;">📱 <strong>(803) 899-4393</strong></p>
-                        <p style="margin: 15px 0 0 0; font-size: 0.9em;">
-                            <em>Please contact us at least 4 hours before your appointment for any changes</em>
-                        </p>
-                    </div>
-                    
-                    <p style="text-align: center; font-size: 1.2em; color: {primary_color}; font-weight: bold; margin: 25px 0;">
-                        We're excited to provide excellent service for you tomorrow! 🌟
-                    </p>
-                    
-                    <div class="footer">
-                        <p style="color: {primary_color}; font-weight: bold;">AMR Landscaping & Pressure Washing</p>
-                        <p>Professional service you can trust</p>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create plain text version
-        text_body = f"""
-        AMR Services - Service Reminder
-        
-        Hi {booking.user.first_name},
-        
-        This is a friendly reminder about your appointment TOMORROW!
-        
-        Appointment Details:
-        ===================
-        Service: {booking.service_type.name}
-        Date: {booking.booking_date.strftime('%A, %B %d, %Y')}
-        Time: {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}
-        Address: {booking.user.address}
-        Booking ID: #{booking.id}
-        
-        {f'Special Request: {booking.custom_description}' if booking.custom_description else ''}
-        
-        Please Prepare:
-        - Clear access to work areas
-        - Secure pets indoors during service  
-        - Be available for any questions
-        - Ensure water access if needed
-        
-        Weather: Our team monitors conditions and will contact you if rescheduling is needed.
-        
-        Need to reschedule or have questions?
-        Email: {sender_email}
-        Phone: (803) 899-4393
-        
-        Please contact us at least 4 hours before your appointment for changes.
-        
-        We're excited to provide excellent service tomorrow!
-        
-        AMR Landscaping & Pressure Washing
-        Professional service you can trust
-        """
-        
-        # Attach both versions
-        part1 = MIMEText(text_body, 'plain')
-        part2 = MIMEText(html_body, 'html')
-        
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Send the email
-        context = ssl.create_default_context()
-        with smtplib.SMTP(smtp_server, port) as server:
-            server.starttls(context=context)
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-        
-        print(f"✅ Reminder email sent to {booking.user.email} for booking #{booking.id}")
-        print(f"   Service: {booking.service_type.name} on {booking.booking_date}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error sending reminder email: {str(e)}")
-        return False
-
-
-def check_and_send_reminders():
-    """
-    Check for bookings that need 24-hour reminders and send them.
-    This function runs in a background thread.
-    """
-    with app.app_context():
-        try:
-            # Calculate tomorrow's date
-            tomorrow = date.today() + timedelta(days=1)
-            
-            # Find all confirmed bookings for tomorrow that haven't been reminded
-            bookings_tomorrow = Booking.query.filter(
-                Booking.booking_date == tomorrow,
-                Booking.status == 'confirmed'
-            ).all()
-            
-            reminders_sent = 0
-            
-            for booking in bookings_tomorrow:
-                # Check if reminder was already sent (you might want to add a reminder_sent field to Booking model)
-                # For now, we'll send reminders for all confirmed bookings
-                
-                success = send_reminder_email(booking)
-                if success:
-                    reminders_sent += 1
-                    
-                    # Optional: Mark that reminder was sent
-                    # booking.reminder_sent = True
-                    # db.session.commit()
-            
-            if reminders_sent > 0:
-                print(f"📧 Sent {reminders_sent} reminder email(s) for tomorrow's appointments")
-            else:
-                print(f"📅 No reminders needed - {len(bookings_tomorrow)} bookings tomorrow")
-                
-        except Exception as e:
-            print(f"❌ Error in reminder check: {str(e)}")
+    booking = db.session.get(Booking, booking_id)
+    if booking is not None:
+        send_confirmation_email(booking)
 
 
-def start_reminder_scheduler():
+def start_background_reminders(app):
     """
-    Start the background reminder scheduler.
-    Checks for reminders every hour.
+    Start the reminder scheduler from a background thread, so importing the
+    mail and scheduler code never delays serving the first request.
     """
-    def reminder_loop():
-        while True:
-            try:
-                # Check current time
-                now = datetime.now()
-                
-                # Send reminders at 9 AM daily (you can adjust this)
-                if now.hour == 9 and now.minute < 5:  # 9:00-9:05 AM window
-                    print(f"🕘 Daily reminder check at {now.strftime('%I:%M %p')}")
-                    check_and_send_reminders()
-                    
-                    # Sleep for 10 minutes to avoid duplicate sends in the same hour
-                    time_module.sleep(600)  # 10 minutes
-                else:
-                    # Check every hour
-                    time_module.sleep(3600)  # 1 hour
-                    
-            except Exception as e:
-                print(f"❌ Error in reminder scheduler: {str(e)}")
-                time_module.sleep(300)  # 5 minutes before retrying
-    
-    # Start reminder thread
-    reminder_thread = threading.Thread(target=reminder_loop, daemon=True)
-    reminder_thread.start()
-    print("📧 Email reminder scheduler started - will check daily at 9 AM")
+    def start():
+        from reminders import start_reminder_scheduler
+        start_reminder_scheduler(app)
+    
+    threading.Thread(target=start, daemon=True).start()
 
 # ========================================
 # ADMIN API ROUTES
 # ========================================
 
-@app.route('/api/admin/dashboard', methods=['GET'])
+def format_admin_booking(booking):
+    """Booking as shown in the admin panel (dashboard lists and live events)"""
+    return {
+        'id': booking.id,
+        'customer_name': booking.user.full_name,
+        'customer_email': booking.user.email,
+        'customer_phone': booking.user.phone,
+        'service_name': booking.service_type.name,
+        'service_category': booking.service_type.category,
+        'booking_date': booking.booking_date.strftime('%Y-%m-%d'),
+        'start_time': booking.start_time.strftime('%H:%M'),
+        'end_time': booking.end_time.strftime('%H:%M'),
+        'status': booking.status,
+        'crew_id': booking.crew_id,
+        'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M'),
+        'address': booking.user.address,
+        'custom_description': booking.custom_description
+    }
+
+def admin_booking_query():
+    """Booking query that loads the customer and service format_admin_booking() reads in the same statement"""
+    return Booking.query.options(joinedload(Booking.user), joinedload(Booking.service_type))
+
+# Committed booking inserts and status changes are pushed to /api/admin/events
+track_booking_events(RoutingSession, Booking, format_admin_booking)
+
+@bp.route('/api/admin/dashboard', methods=['GET'])
 @login_required
+@use_replica
 def api_admin_dashboard():
     """API endpoint for admin dashboard data"""
     if not current_user.is_admin:
@@ -997,49 +829,36 @@ def api_admin_dashboard():
         # Get recent bookings (last 30 days)
         from datetime import datetime, timedelta
         thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_bookings = Booking.query.filter(
+        recent_bookings = admin_booking_query().filter(
             Booking.created_at >= thirty_days_ago
         ).order_by(Booking.created_at.desc()).limit(50).all()
         
-        # Get today's bookings
+        # Get today's bookings (a range of ix_booking_span)
         today = date.today()
-        today_bookings = Booking.query.filter_by(booking_date=today).all()
+        window_start, window_end = day_window(today)
+        today_bookings = admin_booking_query().filter(
+            Booking.span_start >= window_start, Booking.span_start < window_end
+        ).order_by(Booking.span_start).all()
         
-        # Get pending bookings
-        pending_bookings = Booking.query.filter_by(status='pending').all()
+        # Get pending bookings (ix_booking_status_span)
+        pending_bookings = admin_booking_query().filter(Booking.status_code == PENDING).order_by(Booking.span_start).all()
         
         # Get all customers
         total_customers = User.query.filter_by(is_admin=False).count()
         
-        # Calculate stats
-        total_bookings = Booking.query.count()
-        confirmed_bookings = Booking.query.filter_by(status='confirmed').count()
-        completed_bookings = Booking.query.filter_by(status='completed').count()
-        
-        # Format booking data
-        def format_booking(booking):
-            return {
-                'id': booking.id,
-                'customer_name': booking.user.full_name,
-                'customer_email': booking.user.email,
-                'customer_phone': booking.user.phone,
-                'service_name': booking.service_type.name,
-                'service_category': booking.service_type.category,
-                'booking_date': booking.booking_date.strftime('%Y-%m-%d'),
-                'start_time': booking.start_time.strftime('%H:%M'),
-                'end_time': booking.end_time.strftime('%H:%M'),
-                'status': booking.status,
-                'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M'),
-                'address': booking.user.address,
-                'custom_description': booking.custom_description
-            }
+        # Calculate stats from the per-status rollup instead of scanning bookings
+        status_totals = dict(db.session.query(BookingStatusTotal.status, BookingStatusTotal.booking_count).all())
+        total_bookings = sum(status_totals.values())
+        confirmed_bookings = status_totals.get('confirmed', 0)
+        completed_bookings = status_totals.get('completed', 0)
         
         return jsonify({
             'success': True,
             'data': {
-                'recent_bookings': [format_booking(b) for b in recent_bookings],
-                'today_bookings': [format_booking(b) for b in today_bookings],
-                'pending_bookings': [format_booking(b) for b in pending_bookings],
+                'recent_bookings': [format_admin_booking(b) for b in recent_bookings],
+                'today_bookings': [format_admin_booking(b) for b in today_bookings],
+                'pending_bookings': [format_admin_booking(b) for b in pending_bookings],
+                'today': today.strftime('%Y-%m-%d'),
                 'stats': {
                     'total_bookings': total_bookings,
                     'confirmed_bookings': confirmed_bookings,
@@ -1054,7 +873,7 @@ def api_admin_dashboard():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error loading dashboard: {str(e)}'}), 500
 
-@app.route('/api/admin/bookings/<int:booking_id>/status', methods=['POST'])
+@bp.route('/api/admin/bookings/<int:booking_id>/status', methods=['POST'])
 @login_required
 def api_update_booking_status(booking_id):
     """API endpoint to update booking status"""
@@ -1085,8 +904,446 @@ def api_update_booking_status(booking_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Error updating booking: {str(e)}'}), 500
 
-@app.route('/api/admin/customers', methods=['GET'])
+def status_values(status, admin_notes=None):
+    """Column values of a Core UPDATE setting a booking's status (and notes, if given)"""
+    values = {'status': status, 'status_code': status_code(status)}
+    if admin_notes:
+        values['admin_notes'] = admin_notes
+    return values
+
+@bp.route('/api/admin/bookings/status', methods=['POST'])
+@login_required
+def api_bulk_update_booking_status():
+    """
+    Update the status (and optionally admin notes) of many bookings at once.
+    
+    Body: {"updates": [{"id": 12, "status": "confirmed", "admin_notes": "..."}, ...]}
+    
+    Valid entries are applied together in one transaction, with one UPDATE
+    per distinct (status, admin_notes) pair. Invalid or unknown entries are
+    reported in the per-item results and don't block the others.
+    
+    Re-activating a cancelled booking can collide with one made since, so
+    each of those runs alone in a SAVEPOINT; one the overlap guard rejects
+    is reported as 'slot taken' and the rest of the batch still applies.
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    updates = data.get('updates')
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'success': False, 'message': 'updates must be a non-empty list'}), 400
+    if len(updates) > MAX_BULK_STATUS_UPDATES:
+        return jsonify({'success': False,
+                        'message': f'At most {MAX_BULK_STATUS_UPDATES} updates per request'}), 400
+    
+    results = []
+    valid = {}          # booking id -> (status, admin_notes)
+    for item in updates:
+        booking_id = item.get('id') if isinstance(item, dict) else None
+        status = item.get('status') if isinstance(item, dict) else None
+        admin_notes = item.get('admin_notes') if isinstance(item, dict) else None
+        if not isinstance(booking_id, int) or isinstance(booking_id, bool):
+            results.append({'id': booking_id, 'success': False, 'message': 'id must be an integer'})
+        elif status not in BOOKING_STATUSES:
+            results.append({'id': booking_id, 'success': False, 'message': 'Invalid status'})
+        elif admin_notes is not None and not isinstance(admin_notes, str):
+            results.append({'id': booking_id, 'success': False, 'message': 'admin_notes must be a string'})
+        elif booking_id in valid:
+            results.append({'id': booking_id, 'success': False, 'message': 'Duplicate id in request'})
+        else:
+            valid[booking_id] = (status, admin_notes or None)
+            results.append({'id': booking_id, 'success': True, 'status': status})
+    
+    try:
+        booking_table = Booking.__table__
+        # Current values, locked on Postgres, for not-found checks and rollup deltas
+        current = {}
+        if valid:
+            rows = db.session.execute(
+                select(booking_table.c.id, booking_table.c.booking_date,
+                       booking_table.c.service_type_id, booking_table.c.status)
+                .where(booking_table.c.id.in_(valid))
+                .with_for_update()
+            ).all()
+            current = {row.id: row for row in rows}
+        
+        groups, reactivated = {}, []
+        for result in results:
+            if not result['success']:
+                continue
+            row = current.get(result['id'])
+            if row is None:
+                result.update(success=False, message='Booking not found')
+                result.pop('status')
+                continue
+            status, admin_notes = valid[result['id']]
+            if row.status == 'cancelled' and status != 'cancelled':
+                reactivated.append(result)
+            else:
+                groups.setdefault((status, admin_notes), []).append(result['id'])
+        
+        for (status, admin_notes), ids in groups.items():
+            db.session.execute(update(booking_table).where(booking_table.c.id.in_(ids))
+                               .values(**status_values(status, admin_notes)))
+        for result in reactivated:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(update(booking_table).where(booking_table.c.id == result['id'])
+                                       .values(**status_values(*valid[result['id']])))
+            except IntegrityError as e:
+                if not is_overlap_violation(e):
+                    raise
+                result.update(success=False, message='slot taken')
+                result.pop('status')
+        
+        deltas = Counter()
+        for result in results:
+            if not result['success']:
+                continue
+            row, status = current[result['id']], result['status']
+            if row.status != status:
+                deltas[(row.booking_date, row.service_type_id, row.status)] -= 1
+                deltas[(row.booking_date, row.service_type_id, status)] += 1
+        
+        # Core UPDATEs skip the ORM flush hook, so the rollups are bumped here
+        apply_deltas(db.session.connection(bind_arguments={'mapper': Booking}),
+                     BookingDailyStat.__table__, BookingStatusTotal.__table__, deltas)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error updating bookings: {str(e)}'}), 500
+    
+    # Core UPDATEs aren't seen by the ORM event hooks either; tell open dashboards
+    changed = [result['id'] for result in results
+               if result['success'] and current[result['id']].status != result['status']]
+    if changed:
+        events = []
+        for booking in admin_booking_query().filter(Booking.id.in_(changed)).all():
+            data = format_admin_booking(booking)
+            data['previous_status'] = current[booking.id].status
+            events.append((BOOKING_STATUS_CHANGED, data))
+        publish(events)
+    
+    updated = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': True,
+        'message': f'{updated} of {len(results)} bookings updated',
+        'updated': updated,
+        'results': results
+    })
+
+def format_crew(crew):
+    return {
+        'id': crew.id,
+        'name': crew.name,
+        'category': crew.category,
+        'is_active': crew.is_active,
+    }
+
+@bp.route('/api/admin/crews', methods=['GET'])
+@login_required
+def api_admin_crews():
+    """List crews. Active crews of a category set how many of its bookings may overlap."""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    crews = Crew.query.order_by(Crew.category, Crew.id).all()
+    return jsonify({'success': True, 'crews': [format_crew(crew) for crew in crews]})
+
+@bp.route('/api/admin/crews', methods=['POST'])
+@login_required
+def api_admin_create_crew():
+    """
+    Add a crew.
+    
+    Body: {"name": "Crew B", "category": "landscaping"}
+    
+    Adding the first crew switches scheduling from one business-wide crew
+    to per-category crew pools. The first crew of a category takes over
+    the category's bookings made before then, which have no crew.
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    category = data.get('category')
+    if not name:
+        return jsonify({'success': False, 'message': 'name is required'}), 400
+    if category not in SERVICE_CATEGORIES:
+        return jsonify({'success': False,
+                        'message': f'category must be one of {", ".join(SERVICE_CATEGORIES)}'}), 400
+    
+    crew = Crew(name=name, category=category)
+    db.session.add(crew)
+    db.session.flush()
+    # Bookings without a crew would escape the per-crew overlap guard
+    service_type_ids = db.session.execute(
+        select(ServiceType.id).where(ServiceType.category == category)
+    ).scalars().all()
+    assign_uncrewed_bookings(db.session.connection(bind_arguments={'mapper': Booking}),
+                             Booking.__table__, crew.id, service_type_ids)
+    db.session.commit()
+    # Every date's open slots depend on the crew count
+    current_app.extensions['amr_availability'].clear()
+    return jsonify({'success': True, 'crew': format_crew(crew)}), 201
+
+@bp.route('/api/admin/crews/<int:crew_id>', methods=['POST'])
+@login_required
+def api_admin_update_crew(crew_id):
+    """
+    Rename or (de)activate a crew.
+    
+    Body: {"name": "Crew B", "is_active": false} (either field optional)
+    
+    A deactivated crew keeps its bookings but takes no new ones.
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    crew = db.session.get(Crew, crew_id)
+    if crew is None:
+        return jsonify({'success': False, 'message': 'Crew not found'}), 404
+    data = request.get_json(silent=True) or {}
+    if 'name' in data:
+        name = (data.get('name') or '').strip()
+        if not name:
+            return jsonify({'success': False, 'message': 'name must not be empty'}), 400
+        crew.name = name
+    if 'is_active' in data:
+        if not isinstance(data['is_active'], bool):
+            return jsonify({'success': False, 'message': 'is_active must be true or false'}), 400
+        crew.is_active = data['is_active']
+    
+    db.session.commit()
+    current_app.extensions['amr_availability'].clear()
+    return jsonify({'success': True, 'crew': format_crew(crew)})
+
+def format_hours(rule):
+    return {
+        'open': rule.open_time.strftime('%H:%M') if rule.open_time else None,
+        'close': rule.close_time.strftime('%H:%M') if rule.close_time else None,
+        'closed': rule.is_closed,
+    }
+
+def format_blackout(blackout):
+    return {
+        'id': blackout.id,
+        'start_date': blackout.start_date.isoformat(),
+        'end_date': blackout.end_date.isoformat(),
+        'reason': blackout.reason,
+    }
+
+def parse_hours(data):
+    """
+    Hours from a rule body: {"closed": true} or {"open": "HH:MM", "close": "HH:MM"}.
+    
+    Returns:
+        tuple: (open_time, close_time, is_closed, error message or None)
+    """
+    if data.get('closed') is True:
+        return None, None, True, None
+    try:
+        open_time = datetime.strptime(data.get('open') or '', '%H:%M').time()
+        close_time = datetime.strptime(data.get('close') or '', '%H:%M').time()
+    except ValueError:
+        return None, None, False, 'open and close must be HH:MM (or send closed: true)'
+    if close_time <= open_time:
+        return None, None, False, 'close must be after open'
+    return open_time, close_time, False, None
+
+def business_calendar_changed():
+    """
+    Recompile the slot masks and drop cached slots after a rule change.
+    
+    Only this worker process's caches are cleared. Every other worker keeps
+    its compiled calendar until CALENDAR_TTL_SECONDS (60 s) pass, so for up
+    to a minute after an edit it may still offer, and accept, slots on a
+    day that was just closed (or not yet offer newly opened hours).
+    """
+    current_app.extensions['amr_calendar'].clear()
+    current_app.extensions['amr_availability'].clear()
+
+@bp.route('/api/admin/business-hours', methods=['GET'])
+@login_required
+def api_admin_business_hours():
+    """The business calendar rules: weekly template, date overrides and blackouts"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    weekly = {rule.weekday: rule for rule in BusinessHours.query.all()}
+    default = {'open': BUSINESS_HOURS['start'].strftime('%H:%M'),
+               'close': BUSINESS_HOURS['end'].strftime('%H:%M'), 'closed': False}
+    return jsonify({
+        'success': True,
+        'weekly': [dict(weekday=weekday, **(format_hours(weekly[weekday]) if weekday in weekly else default))
+                   for weekday in range(7)],
+        'overrides': [dict(date=rule.date.isoformat(), note=rule.note, **format_hours(rule))
+                      for rule in BusinessHoursOverride.query.order_by(BusinessHoursOverride.date)],
+        'blackouts': [format_blackout(blackout)
+                      for blackout in BusinessBlackout.query.order_by(BusinessBlackout.start_date)],
+    })
+
+@bp.route('/api/admin/business-hours/weekly', methods=['POST'])
+@login_required
+def api_admin_set_weekly_hours():
+    """
+    Set the hours of one weekday in the weekly template.
+    
+    Body: {"weekday": 6, "open": "08:00", "close": "14:00"} or {"weekday": 6, "closed": true}
+    (weekday 0 = Monday)
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    weekday = data.get('weekday')
+    if not isinstance(weekday, int) or isinstance(weekday, bool) or not 0 <= weekday <= 6:
+        return jsonify({'success': False, 'message': 'weekday must be 0 (Monday) to 6 (Sunday)'}), 400
+    open_time, close_time, is_closed, error = parse_hours(data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    
+    rule = BusinessHours.query.filter_by(weekday=weekday).first() or BusinessHours(weekday=weekday)
+    rule.open_time, rule.close_time, rule.is_closed = open_time, close_time, is_closed
+    db.session.add(rule)
+    db.session.commit()
+    business_calendar_changed()
+    return jsonify({'success': True, 'weekly': dict(weekday=weekday, **format_hours(rule))})
+
+@bp.route('/api/admin/business-hours/overrides', methods=['POST'])
+@login_required
+def api_admin_set_hours_override():
+    """
+    Set other hours (or closed) for one date.
+    
+    Body: {"date": "2026-12-24", "open": "06:00", "close": "12:00", "note": "Christmas Eve"}
+    or {"date": "2026-12-25", "closed": true, "note": "Christmas"}
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        override_date = date.fromisoformat(data.get('date') or '')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'date must be YYYY-MM-DD'}), 400
+    open_time, close_time, is_closed, error = parse_hours(data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    
+    rule = (BusinessHoursOverride.query.filter_by(date=override_date).first()
+            or BusinessHoursOverride(date=override_date))
+    rule.open_time, rule.close_time, rule.is_closed = open_time, close_time, is_closed
+    rule.note = data.get('note')
+    db.session.add(rule)
+    db.session.commit()
+    business_calendar_changed()
+    return jsonify({'success': True,
+                    'override': dict(date=override_date.isoformat(), note=rule.note, **format_hours(rule))})
+
+@bp.route('/api/admin/business-hours/overrides/<string:override_date>', methods=['DELETE'])
+@login_required
+def api_admin_delete_hours_override(override_date):
+    """Remove a date override; the weekly template applies that day again"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    try:
+        rule = BusinessHoursOverride.query.filter_by(date=date.fromisoformat(override_date)).first()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'date must be YYYY-MM-DD'}), 400
+    if rule is None:
+        return jsonify({'success': False, 'message': 'Override not found'}), 404
+    db.session.delete(rule)
+    db.session.commit()
+    business_calendar_changed()
+    return jsonify({'success': True})
+
+@bp.route('/api/admin/business-hours/blackouts', methods=['POST'])
+@login_required
+def api_admin_add_blackout():
+    """
+    Close for a range of dates (inclusive), e.g. a vacation week.
+    
+    Body: {"start_date": "2026-07-01", "end_date": "2026-07-07", "reason": "Vacation"}
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        start_date = date.fromisoformat(data.get('start_date') or '')
+        end_date = date.fromisoformat(data.get('end_date') or '')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'start_date and end_date must be YYYY-MM-DD'}), 400
+    if end_date < start_date:
+        return jsonify({'success': False, 'message': 'end_date must not be before start_date'}), 400
+    
+    blackout = BusinessBlackout(start_date=start_date, end_date=end_date, reason=data.get('reason'))
+    db.session.add(blackout)
+    db.session.commit()
+    business_calendar_changed()
+    return jsonify({'success': True, 'blackout': format_blackout(blackout)}), 201
+
+@bp.route('/api/admin/business-hours/blackouts/<int:blackout_id>', methods=['DELETE'])
 @login_required
+def api_admin_delete_blackout(blackout_id):
+    """Remove a blackout range"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    blackout = db.session.get(BusinessBlackout, blackout_id)
+    if blackout is None:
+        return jsonify({'success': False, 'message': 'Blackout not found'}), 404
+    db.session.delete(blackout)
+    db.session.commit()
+    business_calendar_changed()
+    return jsonify({'success': True})
+
+@bp.route('/api/admin/events', methods=['GET'])
+@login_required
+def api_admin_events():
+    """
+    Server-Sent Events stream of booking_created and booking_status_changed
+    events (data: the booking as in /api/admin/dashboard lists).
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(
+        stream_events(current_app.extensions['amr_events'], last_event_id),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def customer_booking_totals(user_ids=None):
+    """
+    Bookings, completed bookings and latest booking date per customer, in
+    one grouped query (answered from ix_booking_user_status).
+    
+    Args:
+        user_ids (list): Only these customers; None for all
+    
+    Returns:
+        dict: user id -> row with total_bookings, completed_bookings, last_booking
+    """
+    query = db.session.query(
+        Booking.user_id,
+        db.func.count().label('total_bookings'),
+        db.func.sum(db.case((Booking.status_code == COMPLETED, 1), else_=0)).label('completed_bookings'),
+        db.func.max(Booking.booking_date).label('last_booking')
+    )
+    if user_ids is not None:
+        query = query.filter(Booking.user_id.in_(user_ids))
+    return {row.user_id: row for row in query.group_by(Booking.user_id).all()}
+
+@bp.route('/api/admin/customers', methods=['GET'])
+@login_required
+@use_replica
 def api_admin_customers():
     """API endpoint to get all customers"""
     if not current_user.is_admin:
@@ -1094,10 +1351,12 @@ def api_admin_customers():
     
     try:
         customers = User.query.filter_by(is_admin=False).order_by(User.created_at.desc()).all()
+        # Every customer's booking totals in one grouped query instead of one query each
+        totals = customer_booking_totals()
         
         customer_data = []
         for customer in customers:
-            bookings = Booking.query.filter_by(user_id=customer.id).all()
+            total = totals.get(customer.id)
             customer_data.append({
                 'id': customer.id,
                 'name': customer.full_name,
@@ -1105,9 +1364,9 @@ def api_admin_customers():
                 'phone': customer.phone,
                 'address': customer.address,
                 'created_at': customer.created_at.strftime('%Y-%m-%d'),
-                'total_bookings': len(bookings),
-                'completed_bookings': len([b for b in bookings if b.status == 'completed']),
-                'last_booking': bookings[-1].booking_date.strftime('%Y-%m-%d') if bookings else None
+                'total_bookings': total.total_bookings if total else 0,
+                'completed_bookings': int(total.completed_bookings) if total else 0,
+                'last_booking': total.last_booking.strftime('%Y-%m-%d') if total else None
             })
         
         return jsonify({
@@ -1117,8 +1376,88 @@ def api_admin_customers():
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error loading customers: {str(e)}'}), 500
+
+@bp.route('/api/admin/customers/search', methods=['GET'])
+@login_required
+@use_replica
+def api_admin_customer_search():
+    """
+    Search customers by name, email, phone or address (substrings, every term must match).
+    
+    Query parameters:
+        q: search text
+        limit: results to return (default DEFAULT_SEARCH_LIMIT, at most MAX_SEARCH_LIMIT)
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    try:
+        query = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int), 1), MAX_SEARCH_LIMIT)
+        matches = search_customers(db.session.connection(bind_arguments={'mapper': User}), query, limit)
+        
+        # Booking totals for just the matched customers, in one grouped query
+        totals = customer_booking_totals([match.id for match in matches]) if matches else {}
+        
+        customers = []
+        for match in matches:
+            total = totals.get(match.id)
+            customers.append({
+                'id': match.id,
+                'name': f"{match.first_name} {match.last_name}",
+                'email': match.email,
+                'phone': match.phone,
+                'address': match.address,
+                'created_at': match.created_at.strftime('%Y-%m-%d') if match.created_at else None,
+                'total_bookings': total.total_bookings if total else 0,
+                'completed_bookings': int(total.completed_bookings) if total else 0,
+                'last_booking': total.last_booking.strftime('%Y-%m-%d') if total else None
+            })
+        
+        return jsonify({'success': True, 'customers': customers})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error searching customers: {str(e)}'}), 500
+
+@bp.route('/api/admin/export/<string:dataset>', methods=['GET'])
+@login_required
+@use_replica
+def api_admin_export(dataset):
+    """
+    Stream bookings or customers as CSV or NDJSON.
+    
+    Query parameters:
+        format: csv (default) or ndjson
+        from, to: YYYY-MM-DD, inclusive (booking date for bookings, signup date for customers)
+        status: comma-separated statuses to include
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    from exports import EXPORT_FORMATS, ExportError, bookings_query, customers_query, parse_export_args, stream_export
+    
+    queries = {'bookings': bookings_query, 'customers': customers_query}
+    if dataset not in queries:
+        return jsonify({'success': False, 'message': 'Unknown export'}), 404
+    
+    try:
+        options = parse_export_args(request.args)
+    except ExportError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    query = queries[dataset](options['date_from'], options['date_to'], options['statuses'])
+    # Resolved now, while @use_replica is active; the body is generated after the view returns
+    engine = db.session.get_bind(mapper=Booking)
+    filename = f"amr-{dataset}-{get_current_eastern_date():%Y%m%d}.{options['format']}"
+    
+    return Response(
+        stream_export(engine, query, options['format']),
+        content_type=EXPORT_FORMATS[options['format']],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                 'X-Accel-Buffering': 'no'}
+    )
 # Photo upload route
-@app.route('/api/upload-photos', methods=['POST'])
+@bp.route('/api/upload-photos', methods=['POST'])
 def upload_photos():
     """Handle photo uploads for custom landscaping requests"""
     try:
@@ -1129,25 +1468,8 @@ def upload_photos():
         if 'photos' not in request.files:
             return jsonify({'success': False, 'message': 'No photos provided'}), 400
         
-        photos = request.files.getlist('photos')
-        uploaded_files = []
-        
-        for photo in photos:
-            if photo.filename != '' and photo:
-                # Generate secure filename
-                filename = secure_filename(photo.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                filename = timestamp + filename
-                
-                # Save file
-                file_path = os.path.join(upload_folder, filename)
-                photo.save(file_path)
-                
-                uploaded_files.append({
-                    'filename': filename,
-                    'original_name': photo.filename,
-                    'url': f'/static/uploads/{filename}'
-                })
+        from photos import save_uploaded_photos
+        uploaded_files = save_uploaded_photos(request.files.getlist('photos'), upload_folder)
         
         return jsonify({
             'success': True,
@@ -1159,55 +1481,94 @@ def upload_photos():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # Booking options route
-@app.route('/api/set-booking-options', methods=['POST'])
+@bp.route('/api/set-booking-options', methods=['POST'])
 def set_booking_options():
     """Store booking options in session"""
     try:
-        data = request.get_json()
+        # Applies to chunked bodies too, not just the Content-Length header
+        request.max_content_length = MAX_BOOKING_OPTIONS_BYTES
+        try:
+            data = request.get_json(silent=True)
+        except RequestEntityTooLarge:
+            return jsonify({'success': False,
+                            'message': f'Booking options must be at most {MAX_BOOKING_OPTIONS_BYTES} bytes'}), 413
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': 'Booking options must be a JSON object'}), 400
         session['booking_options'] = data
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
-@app.route('/api/customer/bookings', methods=['GET'])
+@bp.route('/api/customer/bookings', methods=['GET'])
 @login_required
 def api_customer_bookings():
-    """API endpoint for customer's own bookings"""
+    """
+    API endpoint for customer's own bookings.
+    
+    Returns every booking unless ?page= is given; then ?per_page= (default 20,
+    at most MAX_CUSTOMER_BOOKINGS_PAGE_SIZE) bookings of that page.
+    Stats always cover all of the customer's bookings.
+    """
     try:
-        # Get customer's bookings
-        customer_bookings = Booking.query.filter_by(user_id=current_user.id).order_by(Booking.created_at.desc()).all()
-        
-        # Calculate stats
-        total_bookings = len(customer_bookings)
-        completed_bookings = len([b for b in customer_bookings if b.status == 'completed'])
-        pending_bookings = len([b for b in customer_bookings if b.status == 'pending'])
-        cancelled_bookings = len([b for b in customer_bookings if b.status == 'cancelled'])
-        
-        # Format booking data
-        def format_customer_booking(booking):
-            return {
-                'id': booking.id,
-                'service_name': booking.service_type.name,
-                'service_category': booking.service_type.category,
-                'booking_date': booking.booking_date.strftime('%Y-%m-%d'),
-                'start_time': booking.start_time.strftime('%H:%M'),
-                'end_time': booking.end_time.strftime('%H:%M'),
-                'status': booking.status,
-                'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M'),
-                'custom_description': booking.custom_description
+        # Status counts in one grouped query (ix_booking_user_status alone)
+        status_counts = {
+            status_name(code): count
+            for code, count in db.session.query(Booking.status_code, db.func.count())
+            .filter(Booking.user_id == current_user.id)
+            .group_by(Booking.status_code)
+            .all()
+        }
+        total_bookings = sum(status_counts.values())
+        
+        # Only the columns the panel shows, joined with the service name
+        bookings_query = (
+            db.session.query(
+                Booking.id, ServiceType.name, ServiceType.category, Booking.booking_date,
+                Booking.start_time, Booking.end_time, Booking.status, Booking.created_at,
+                Booking.custom_description
+            )
+            .join(ServiceType, Booking.service_type_id == ServiceType.id)
+            .filter(Booking.user_id == current_user.id)
+            .order_by(Booking.created_at.desc(), Booking.id.desc())
+        )
+        
+        pagination = None
+        page = request.args.get('page', type=int)
+        if page is not None:
+            page = max(page, 1)
+            per_page = min(max(request.args.get('per_page', 20, type=int), 1), MAX_CUSTOMER_BOOKINGS_PAGE_SIZE)
+            bookings_query = bookings_query.limit(per_page).offset((page - 1) * per_page)
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total': total_bookings,
+                'pages': (total_bookings + per_page - 1) // per_page
             }
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'bookings': [format_customer_booking(b) for b in customer_bookings],
-                'stats': {
-                    'total_bookings': total_bookings,
-                    'completed_bookings': completed_bookings,
-                    'pending_bookings': pending_bookings,
-                    'cancelled_bookings': cancelled_bookings
-                }
+        bookings = [{
+            'id': row.id,
+            'service_name': row.name,
+            'service_category': row.category,
+            'booking_date': row.booking_date.strftime('%Y-%m-%d'),
+            'start_time': row.start_time.strftime('%H:%M'),
+            'end_time': row.end_time.strftime('%H:%M'),
+            'status': row.status,
+            'created_at': row.created_at.strftime('%Y-%m-%d %H:%M'),
+            'custom_description': row.custom_description
+        } for row in bookings_query.all()]
+        
+        data = {
+            'bookings': bookings,
+            'stats': {
+                'total_bookings': total_bookings,
+                'completed_bookings': status_counts.get('completed', 0),
+                'pending_bookings': status_counts.get('pending', 0),
+                'cancelled_bookings': status_counts.get('cancelled', 0)
             }
-        })
+        }
+        if pagination:
+            data['pagination'] = pagination
+        
+        return jsonify({'success': True, 'data': data})
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error loading bookings: {str(e)}'}), 500
@@ -1216,7 +1577,7 @@ def api_customer_bookings():
 # MAIN ROUTES
 # ========================================
 
-@app.route('/')
+@bp.route('/')
 def index():
     """
     Landing page - displays AMR logo and two main service options.
@@ -1224,7 +1585,7 @@ def index():
     """
     return render_template('index.html')
 
-@app.route('/services/<service_category>')
+@bp.route('/services/<service_category>')
 def select_service(service_category):
     """
     Service selection page - shows specific services within a category.
@@ -1234,7 +1595,7 @@ def select_service(service_category):
     """
     if service_category not in ['landscaping', 'pressure_washing']:
         flash('Invalid service category', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     # Get services for this category
     services = ServiceType.query.filter_by(
@@ -1242,11 +1603,19 @@ def select_service(service_category):
         is_active=True
     ).all()
     
+    # First open slot per service, shown on each card
+    today_eastern = get_current_eastern_date()
+    next_available = {service_id: slots[0]
+                      for service_id, slots in next_available_slots(services, today_eastern).items()
+                      if slots}
+    
     return render_template('select_service.html', 
                          services=services, 
-                         category=service_category)
+                         category=service_category,
+                         next_available=next_available,
+                         today=today_eastern)
 
-@app.route('/calendar/<int:service_id>')
+@bp.route('/calendar/<int:service_id>')
 def calendar(service_id):
     """
     Calendar page - shows available dates for booking (current month).
@@ -1254,7 +1623,7 @@ def calendar(service_id):
     today = date.today()
     return calendar_month(service_id, today.year, today.month)
 
-@app.route('/calendar-month/<int:service_id>/<int:year>/<int:month>')
+@bp.route('/calendar-month/<int:service_id>/<int:year>/<int:month>')
 def calendar_month(service_id, year, month):
     """
     Calendar page with month navigation support.
@@ -1284,13 +1653,12 @@ def calendar_month(service_id, year, month):
     import calendar as cal
     month_calendar = cal.monthcalendar(year, month)
     
-    # Check availability for each day
-    available_dates = {}
-    for week in month_calendar:
-        for day in week:
-            if day != 0:
-                check_date = date(year, month, day)
-                available_dates[day] = is_date_available(check_date)
+    # Check availability for each day of the month for this service (one
+    # range query); past days have no slots
+    first_day = date(year, month, 1)
+    last_day = date(year, month, cal.monthrange(year, month)[1])
+    slots = available_slots_by_day(first_day, last_day, service.duration_hours, service)
+    available_dates = {day.day: bool(day_slots) for day, day_slots in slots.items()}
     
     # Get today's date in Eastern timezone for highlighting
     today_eastern = get_current_eastern_date()
@@ -1310,7 +1678,7 @@ def calendar_month(service_id, year, month):
                          today_day=today_eastern.day,
                          month_name=cal.month_name[month])
 
-@app.route('/time-selection/<int:year>/<int:month>/<int:day>')
+@bp.route('/time-selection/<int:year>/<int:month>/<int:day>')
 def time_selection(year, month, day):
     """
     Time selection page - shows available time slots for selected date.
@@ -1322,7 +1690,7 @@ def time_selection(year, month, day):
     service_id = session.get('selected_service_id')
     if not service_id:
         flash('Please select a service first', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     service = ServiceType.query.get_or_404(service_id)
     selected_date = date(year, month, day)
@@ -1338,7 +1706,132 @@ def time_selection(year, month, day):
                          selected_date=selected_date,
                          available_times=available_times)
 
-@app.route('/booking-form/<selected_time>')
+@bp.route('/api/availability/stream', methods=['GET'])
+def api_availability_stream():
+    """
+    Server-Sent Events stream of slot_taken / slot_freed deltas for one
+    service on one date, used by the time selection page.
+    
+    Each stream holds a request thread, so a worker only serves
+    AVAILABILITY_MAX_STREAMS at once; beyond that the answer is 503 and the
+    page polls /api/availability instead (see availability.py).
+    
+    Query parameters:
+        service_id (int), date (YYYY-MM-DD)
+    """
+    service_id = request.args.get('service_id', type=int)
+    try:
+        selected_date = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'date must be YYYY-MM-DD'}), 400
+    if service_id is None or db.session.get(ServiceType, service_id) is None:
+        return jsonify({'success': False, 'message': 'Unknown service'}), 404
+    
+    streams = current_app.extensions['amr_availability_streams']
+    if not streams.acquire():
+        return jsonify({'success': False, 'message': 'Live updates busy, poll /api/availability'}), 503
+    response = Response(
+        stream_availability(current_app._get_current_object(), current_app.extensions['amr_events'],
+                            current_app.extensions['amr_availability'], selected_date, service_id,
+                            current_app.config['AVAILABILITY_STREAM_SECONDS']),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(streams.release)
+    return response
+
+@bp.route('/api/availability', methods=['GET'])
+def api_availability():
+    """
+    Open slots per day for one service over a date range, for the frontend,
+    partners and the crew app.
+    
+    Query parameters:
+        service_id (int)
+        from (YYYY-MM-DD): First date [today]
+        to (YYYY-MM-DD): Last date, inclusive [from + 6 days]; at most
+            MAX_AVAILABILITY_RANGE_DAYS days after `from`
+    
+    The response carries an ETag of its content; a request with a matching
+    If-None-Match gets 304 Not Modified.
+    """
+    service_id = request.args.get('service_id', type=int)
+    service = db.session.get(ServiceType, service_id) if service_id is not None else None
+    if service is None or not service.is_active:
+        return jsonify({'success': False, 'message': 'Unknown service'}), 404
+    
+    try:
+        first_day = (datetime.strptime(request.args['from'], '%Y-%m-%d').date()
+                     if request.args.get('from') else get_current_eastern_date())
+        last_day = (datetime.strptime(request.args['to'], '%Y-%m-%d').date()
+                    if request.args.get('to') else first_day + timedelta(days=6))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'from and to must be YYYY-MM-DD'}), 400
+    if last_day < first_day:
+        return jsonify({'success': False, 'message': 'to must not be before from'}), 400
+    if (last_day - first_day).days >= MAX_AVAILABILITY_RANGE_DAYS:
+        return jsonify({'success': False,
+                        'message': f'At most {MAX_AVAILABILITY_RANGE_DAYS} days per request'}), 400
+    
+    slots = available_slots_by_day(first_day, last_day, service.duration_hours, service)
+    response = jsonify({
+        'success': True,
+        'service': {
+            'id': service.id,
+            'name': service.name,
+            'category': service.category,
+            'duration_hours': service.duration_hours,
+        },
+        'from': first_day.isoformat(),
+        'to': last_day.isoformat(),
+        'days': [
+            {
+                'date': day.isoformat(),
+                'available': bool(times),
+                'slots': [slot.strftime('%H:%M') for slot in times],
+            }
+            for day, times in slots.items()
+        ],
+    })
+    # Clients revalidate every time; unchanged availability costs a 304
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@bp.route('/api/availability/next', methods=['GET'])
+def api_next_available():
+    """
+    The first open slots for a service from a date on.
+    
+    Query parameters:
+        service_id (int)
+        from (YYYY-MM-DD): Date to search from [today]
+        limit (int): Slots wanted [5], at most MAX_NEXT_AVAILABLE_SLOTS
+    """
+    service_id = request.args.get('service_id', type=int)
+    service = db.session.get(ServiceType, service_id) if service_id is not None else None
+    if service is None or not service.is_active:
+        return jsonify({'success': False, 'message': 'Unknown service'}), 404
+    
+    try:
+        first_day = (datetime.strptime(request.args['from'], '%Y-%m-%d').date()
+                     if request.args.get('from') else get_current_eastern_date())
+    except ValueError:
+        return jsonify({'success': False, 'message': 'from must be YYYY-MM-DD'}), 400
+    limit = request.args.get('limit', 5, type=int)
+    if not 1 <= limit <= MAX_NEXT_AVAILABLE_SLOTS:
+        return jsonify({'success': False,
+                        'message': f'limit must be between 1 and {MAX_NEXT_AVAILABLE_SLOTS}'}), 400
+    
+    slots = next_available_slots([service], first_day, limit)[service.id]
+    return jsonify({
+        'success': True,
+        'service_id': service.id,
+        'from': first_day.isoformat(),
+        'slots': [{'date': day.isoformat(), 'time': slot.strftime('%H:%M')} for day, slot in slots],
+    })
+
+@bp.route('/booking-form/<selected_time>')
 def booking_form(selected_time):
     """
     Booking form page - collects customer information.
@@ -1353,7 +1846,7 @@ def booking_form(selected_time):
     
     if not service_id or not selected_date_str:
         flash('Please start the booking process from the beginning', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     service = ServiceType.query.get_or_404(service_id)
     selected_date = date.fromisoformat(selected_date_str)
@@ -1364,7 +1857,7 @@ def booking_form(selected_time):
         session['selected_time'] = selected_time
     except ValueError:
         flash('Invalid time format', 'error')
-        return redirect(url_for('calendar', service_id=service_id))
+        return redirect(url_for('main.calendar', service_id=service_id))
     
     return render_template('booking_form.html',
                          service=service,
@@ -1372,7 +1865,13 @@ def booking_form(selected_time):
                          selected_time=selected_time_obj,
                          current_user=current_user)
 
-@app.route('/submit-booking', methods=['POST'])
+def slot_taken_redirect(selected_date):
+    """Back to the date's time selection when the chosen slot is no longer free"""
+    flash('Sorry, that time was just booked. Please choose another time.', 'error')
+    return redirect(url_for('main.time_selection', year=selected_date.year,
+                            month=selected_date.month, day=selected_date.day))
+
+@bp.route('/submit-booking', methods=['POST'])
 def submit_booking():
     """
     Process booking form submission and create new booking.
@@ -1385,7 +1884,7 @@ def submit_booking():
         
         if not all([service_id, selected_date_str, selected_time_str]):
             flash('Session expired. Please start over.', 'error')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         
         # Get service and validate
         service = ServiceType.query.get_or_404(service_id)
@@ -1410,6 +1909,16 @@ def submit_booking():
             flash('All fields are required', 'error')
             return redirect(request.referrer)
         
+        # The booking holds exactly the block the slot search reserved for it
+        end_time = booking_end_time(selected_date, selected_time,
+                                    blocking_minutes(service.duration_hours, service))
+        
+        # Pick a free crew of the service's category; the overlap guard
+        # rejects the booking if another submit takes the crew meanwhile
+        crews_set_up, crew_id = assign_crew(service, *booking_span(selected_date, selected_time, end_time))
+        if crews_set_up and crew_id is None:
+            return slot_taken_redirect(selected_date)
+        
         # If user is logged in, use their account
         if current_user.is_authenticated:
             user = current_user
@@ -1419,46 +1928,41 @@ def submit_booking():
             user.email = email
             user.phone = phone
             user.address = address
+            user_id = user.id
         else:
-            # Check if user exists or create new one
-            user = User.query.filter_by(email=email).first()
-            if not user:
-                # Create new user account automatically
-                user = User(
-                    first_name=first_name,
-                    last_name=last_name,
-                    email=email,
-                    phone=phone,
-                    address=address
-                )
-                # Set a temporary password - user can reset it later
-                user.set_password('temp_password_123')
-                db.session.add(user)
-                db.session.flush()  # Get user ID without committing
-        
-        # Calculate end time
-        start_datetime = datetime.combine(selected_date, selected_time)
-        end_datetime = start_datetime + timedelta(hours=service.duration_hours)
-        end_time = end_datetime.time()
+            # Guest fast path: one INSERT .. ON CONFLICT finds the existing
+            # account or creates one (with a temporary password the user can reset later)
+            user_id = upsert_guest_customer(
+                db.session.connection(bind_arguments={'mapper': User}),
+                User.__table__,
+                {
+                    'first_name': first_name,
+                    'last_name': last_name,
+                    'email': email,
+                    'email_normalized': normalize_email(email),
+                    'phone': phone,
+                    'address': address,
+                    'password_hash': placeholder_password_hash(GUEST_PLACEHOLDER_PASSWORD)
+                }
+            )
         
         # Create booking
         booking = Booking(
-            user_id=user.id,
+            user_id=user_id,
             service_type_id=service_id,
+            crew_id=crew_id,
             booking_date=selected_date,
             start_time=selected_time,
             end_time=end_time,
             custom_description=custom_description if service.is_custom else None,
             status='confirmed' if not service.is_custom else 'pending'
         )
-        
         db.session.add(booking)
-        db.session.flush()  # Get booking ID
         
         # Handle recurring booking setup
         if is_recurring and frequency_data:
             recurring_booking = RecurringBooking(
-                user_id=user.id,
+                user_id=user_id,
                 service_type_id=service_id,
                 frequency_value=str(frequency_data.get('value', '1')),
                 frequency_type=frequency_data.get('type', 'weeks'),
@@ -1467,10 +1971,13 @@ def submit_booking():
             )
             db.session.add(recurring_booking)
         
+        # One flush for the booking, recurrence and rollups, then the commit
+        db.session.flush()
+        booking_id = booking.id
         db.session.commit()
         
-        # Send confirmation email
-        send_confirmation_email(booking)
+        # Confirmation email goes out in the background (see tasks.py)
+        defer(send_booking_confirmation, booking_id)
         
         # Clear session
         session.pop('selected_service_id', None)
@@ -1479,14 +1986,17 @@ def submit_booking():
         session.pop('booking_options', None)
         
         flash('Booking confirmed successfully!', 'success')
-        return redirect(url_for('confirmation', booking_id=booking.id))
+        return redirect(url_for('main.confirmation', booking_id=booking_id))
         
     except Exception as e:
         db.session.rollback()
+        if is_overlap_violation(e):
+            # Another customer took the slot between page load and submit
+            return slot_taken_redirect(selected_date)
         flash(f'Error creating booking: {str(e)}', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
-@app.route('/confirmation/<int:booking_id>')
+@bp.route('/confirmation/<int:booking_id>')
 def confirmation(booking_id):
     """
     Booking confirmation page - shows booking details to customer.
@@ -1501,8 +2011,9 @@ def confirmation(booking_id):
 # ADMIN ROUTES
 # ========================================
 
-@app.route('/admin')
+@bp.route('/admin')
 @login_required
+@use_replica
 def admin_dashboard():
     """
     Admin dashboard - overview of all bookings.
@@ -1510,16 +2021,19 @@ def admin_dashboard():
     """
     if not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     # Get recent bookings
     recent_bookings = Booking.query.order_by(Booking.created_at.desc()).limit(20).all()
     
-    # Get today's bookings
-    today_bookings = Booking.query.filter_by(booking_date=date.today()).all()
+    # Get today's bookings (a range of ix_booking_span)
+    window_start, window_end = day_window(date.today())
+    today_bookings = Booking.query.filter(
+        Booking.span_start >= window_start, Booking.span_start < window_end
+    ).order_by(Booking.span_start).all()
     
     # Get pending custom service bookings
-    pending_bookings = Booking.query.filter_by(status='pending').all()
+    pending_bookings = Booking.query.filter(Booking.status_code == PENDING).order_by(Booking.span_start).all()
     
     # Get all users
     all_users = User.query.order_by(User.created_at.desc()).all()
@@ -1530,7 +2044,7 @@ def admin_dashboard():
                          pending_bookings=pending_bookings,
                          all_users=all_users)
 
-@app.route('/admin/booking/<int:booking_id>')
+@bp.route('/admin/booking/<int:booking_id>')
 @login_required
 def admin_booking_detail(booking_id):
     """
@@ -1538,12 +2052,12 @@ def admin_booking_detail(booking_id):
     """
     if not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     booking = Booking.query.get_or_404(booking_id)
     return render_template('admin/booking_detail.html', booking=booking)
 
-@app.route('/admin/booking/<int:booking_id>/update-status', methods=['POST'])
+@bp.route('/admin/booking/<int:booking_id>/update-status', methods=['POST'])
 @login_required
 def update_booking_status(booking_id):
     """
@@ -1551,7 +2065,7 @@ def update_booking_status(booking_id):
     """
     if not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     booking = Booking.query.get_or_404(booking_id)
     new_status = request.form.get('status')
@@ -1567,15 +2081,46 @@ def update_booking_status(booking_id):
     else:
         flash('Invalid status', 'error')
     
-    return redirect(url_for('admin_booking_detail', booking_id=booking_id))
+    return redirect(url_for('main.admin_booking_detail', booking_id=booking_id))
 
 # ========================================
 # DATABASE INITIALIZATION
 # ========================================
 
-def init_database():
+# Default service catalogue, used by init_database() and the seed-data command
+DEFAULT_SERVICES = [
+    # Landscaping Services
+    {'name': 'Standard Lawn Service', 'category': 'landscaping', 'description': 'Grass cutting and weed eating',
+     'duration_hours': 1.5, 'is_custom': False},
+    {'name': 'Mulching', 'category': 'landscaping', 'description': 'Professional mulching for flower beds and landscaping',
+     'duration_hours': 2.0, 'is_custom': False},
+    {'name': 'Hedge Trimming', 'category': 'landscaping', 'description': 'Trimming and shaping of hedges and shrubs',
+     'duration_hours': 1.5, 'is_custom': False},
+    {'name': 'Specialty Lawn Care', 'category': 'landscaping', 'description': 'Fertilization, weed control, and specialized lawn treatments',
+     'duration_hours': 1.0, 'is_custom': False},
+    {'name': 'Custom Landscaping', 'category': 'landscaping', 'description': 'Custom landscaping work - duration set by admin',
+     'duration_hours': 1.0, 'is_custom': True},
+
+    # Pressure Washing Services
+    {'name': 'Full House Pressure Washing', 'category': 'pressure_washing', 'description': 'Complete house exterior pressure washing',
+     'duration_hours': 4.0, 'is_custom': False},
+    {'name': 'Driveway Pressure Washing', 'category': 'pressure_washing', 'description': 'Driveway and walkway cleaning',
+     'duration_hours': 3.0, 'is_custom': False},
+    {'name': 'Patio Pressure Washing', 'category': 'pressure_washing', 'description': 'Patio and outdoor area cleaning',
+     'duration_hours': 2.0, 'is_custom': False},
+    {'name': 'Deck & Fence Pressure Washing', 'category': 'pressure_washing', 'description': 'Professional deck and fence cleaning and restoration',
+     'duration_hours': 3.5, 'is_custom': False},
+    {'name': 'Window Cleaning', 'category': 'pressure_washing', 'description': 'Professional window cleaning service',
+     'duration_hours': 1.5, 'is_custom': False},
+]
+
+
+def init_database(app):
     """
     Initialize database with tables and sample data.
+    
+    Args:
+        app (Flask): The application whose database is (re)created
     """
     with app.app_context():
         # Drop all tables first to ensure clean slate
@@ -1584,83 +2129,12 @@ def init_database():
         # Create all tables with new structure
         db.create_all()
         
-        # Add default services if none exist
-        # Add default services if none exist
-        services = [
-    # Landscaping Services
-    ServiceType(
-        name='Standard Lawn Service',
-        category='landscaping',
-        description='Grass cutting and weed eating',
-        duration_hours=1.5,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Mulching',
-        category='landscaping',
-        description='Professional mulching for flower beds and landscaping',
-        duration_hours=2.0,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Hedge Trimming',
-        category='landscaping',
-        description='Trimming and shaping of hedges and shrubs',
-        duration_hours=1.5,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Specialty Lawn Care',
-        category='landscaping',
-        description='Fertilization, weed control, and specialized lawn treatments',
-        duration_hours=1.0,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Custom Landscaping',
-        category='landscaping',
-        description='Custom landscaping work - duration set by admin',
-        duration_hours=1.0,
-        is_custom=True
-    ),
-    
-    # Pressure Washing Services
-    ServiceType(
-        name='Full House Pressure Washing',
-        category='pressure_washing',
-        description='Complete house exterior pressure washing',
-        duration_hours=4.0,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Driveway Pressure Washing',
-        category='pressure_washing',
-        description='Driveway and walkway cleaning',
-        duration_hours=3.0,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Patio Pressure Washing',
-        category='pressure_washing',
-        description='Patio and outdoor area cleaning',
-        duration_hours=2.0,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Deck & Fence Pressure Washing',
-        category='pressure_washing',
-        description='Professional deck and fence cleaning and restoration',
-        duration_hours=3.5,
-        is_custom=False
-    ),
-    ServiceType(
-        name='Window Cleaning',
-        category='pressure_washing',
-        description='Professional window cleaning service',
-        duration_hours=1.5,
-        is_custom=False
-    ),
-]
+        # New installs get the database-level double booking guard (intervals.py)
+        with db.engine.begin() as conn:
+            install_interval_schema(conn, Booking.__table__)
+        
+        # Add default services
+        services = [ServiceType(**service) for service in DEFAULT_SERVICES]
         
         for service in services:
             db.session.add(service)
@@ -1681,17 +2155,184 @@ def init_database():
         print("Database initialized with correct structure!")
         print("Admin login: admin@amrservices.com / admin123")
 
+@bp.cli.command('seed-data')
+@click.option('--users', default=1000, show_default=True, help='Customers to create')
+@click.option('--bookings', default=10000, show_default=True, help='Bookings to create')
+@click.option('--recurring', default=500, show_default=True, help='Recurring schedules to create')
+@click.option('--photos', default=200, show_default=True, help='Photo records for custom requests')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT batch')
+@click.option('--history-days', default=730, show_default=True, help='Days of past bookings')
+@click.option('--horizon-days', default=90, show_default=True, help='Days of upcoming bookings')
+@click.option('--seed', type=int, default=None, help='Random seed for a reproducible dataset')
+def seed_data_command(users, bookings, recurring, photos, batch_size, history_days, horizon_days, seed):
+    """
+    Bulk-generate synthetic customers, bookings, recurrences and photos.
+    Unlike init_database() this never drops existing data.
+    """
+    from seed_data import seed_synthetic_data
+
+    db.create_all()
+    started = time_module.perf_counter()
+    counts = seed_synthetic_data(
+        users=users, bookings=bookings, recurring=recurring, photos=photos,
+        batch_size=batch_size, seed=seed, history_days=history_days,
+        horizon_days=horizon_days, log=click.echo
+    )
+    elapsed = time_module.perf_counter() - started
+    click.echo(f"Seeded {counts['users']} users, {counts['bookings']} bookings, "
+               f"{counts['recurring_bookings']} recurring schedules and {counts['photos']} photos "
+               f"in {elapsed:.1f}s")
+    click.echo("Generated customers share the password: password123")
+
+@bp.cli.command('replica-snapshot')
+@click.argument('path')
+def replica_snapshot_command(path):
+    """
+    Copy the SQLite database to PATH as a read-replica stand-in
+    (see DATABASE_REPLICA_URL in database.py).
+    """
+    snapshot_sqlite(db.engine, path)
+    click.echo(f"Snapshot written to {path}")
+    click.echo(f"Use it with DATABASE_REPLICA_URL='sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true'")
+
+@bp.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """
+    Recompute the booking rollup tables from scratch (backfills, manual SQL fixes).
+    Also creates the rollup tables if they don't exist yet.
+    """
+    db.create_all()
+    started = time_module.perf_counter()
+    with db.engine.begin() as conn:
+        rows = rebuild_rollups(conn, Booking.__table__, BookingDailyStat.__table__, BookingStatusTotal.__table__)
+    click.echo(f"Rebuilt {rows} daily rollup rows in {time_module.perf_counter() - started:.1f}s")
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """
+    Create the customer search index on an existing database and (SQLite)
+    refill it from the user table.
+    """
+    started = time_module.perf_counter()
+    with db.engine.begin() as conn:
+        rebuild_search_index(conn)
+    click.echo(f"Rebuilt the customer search index in {time_module.perf_counter() - started:.1f}s")
+
+@bp.cli.command('normalize-emails')
+@click.option('--dry-run', is_flag=True, help='Only list the accounts that would be merged')
+def normalize_emails_command(dry_run):
+    """
+    One-time migration to case-insensitive emails: merge accounts whose emails
+    differ only in case (bookings move to the kept account), then add and fill
+    user.email_normalized and its unique index.
+    """
+    with db.engine.begin() as conn:
+        result = merge_duplicate_accounts(
+            conn, User.__table__,
+            [Booking.__table__, RecurringBooking.__table__, ServicePhoto.__table__],
+            GUEST_PLACEHOLDER_PASSWORD, dry_run=dry_run, log=click.echo,
+        )
+    verb = 'Would merge' if dry_run else 'Merged'
+    click.echo(f"{verb} {result['merged']} accounts in {result['groups']} duplicate groups")
+
+@bp.cli.command('install-booking-guard')
+@click.option('--no-guard', is_flag=True, help='Only add and fill the booking columns and their indexes')
+def install_booking_guard_command(no_guard):
+    """
+    Add booking.span_start / span_end, crew_id and status_code to an
+    existing database, fill the spans and status codes, index them and
+    install the overlap guard that rejects double bookings of a crew
+    (exclusion constraint on PostgreSQL, triggers on SQLite).
+    """
+    # New tables (crew, business hours) first; the booking columns reference crew
+    db.create_all()
+    with db.engine.begin() as conn:
+        result = install_interval_schema(conn, Booking.__table__, guard=not no_guard, log=click.echo)
+    click.echo(f"Filled intervals for {result['filled']} bookings")
+    if result['guard']:
+        click.echo("Overlap guard installed")
+    elif result['overlapping']:
+        raise click.ClickException(f"{result['overlapping']} pairs of active bookings overlap; "
+                                   f"cancel or move them, then run this again to install the guard")
+
 # ========================================
 # APPLICATION STARTUP
 # ========================================
 
+def create_app(config=None):
+    """
+    Application factory.
+    
+    Only configuration, the database, the login manager and the routes are set
+    up here. Mail, photo and reminder code is imported on first use so a cold
+    start can serve its first request as early as possible.
+    
+    Args:
+        config (dict): Optional config overrides (e.g. for tests or benchmarks)
+        
+    Returns:
+        Flask: The configured application
+    """
+    # All log output goes through a background queue listener (see logging_config.py)
+    configure_logging()
+    
+    # Application Configuration
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-production'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Email Configuration (configure these for email notifications)
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')  # Change to your email provider
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USERNAME'] = 'your-email@gmail.com'  # Your email
+    app.config['MAIL_PASSWORD'] = 'your-app-password'     # Your email app password
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
+    
+    if config:
+        app.config.update(config)
+    
+    # Database URI, pool and SQLite PRAGMAs come from the environment (see database.py)
+    configure_database(app, db)
+    
+    # Session data lives server-side; the cookie only holds its id (see sessions.py)
+    init_sessions(app, db)
+    
+    # Initialize login manager
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+    
+    # Live booking events for admin dashboards and the time selection page
+    # (in-process or Postgres NOTIFY)
+    with app.app_context():
+        events_backend = init_events(app, db.engine)
+    init_availability(app, events_backend, available_slot_times)
+    
+    # Business hours, holidays and blackouts compiled into per-date slot masks
+    init_business_calendar(app, load_business_rules, get_current_eastern_date, NEXT_AVAILABLE_HORIZON_DAYS)
+    
+    # Confirmation emails and other post-commit side effects (thread pool or inline)
+    init_tasks(app)
+    
+    # Per-route latency, SQL, template and SMTP metrics on /metrics
+    init_metrics(app)
+    
+    # Opt-in N+1 detector and slow query log (SQL_PROFILING=1)
+    init_profiling(app)
+    
+    return app
+
+
 if __name__ == '__main__':
+    # Lazily imported modules do "from app import ..."; make that resolve to
+    # this module instead of importing app.py a second time
+    sys.modules['app'] = sys.modules[__name__]
+    
+    app = create_app()
     # Initialize database (comment out after first run)
-    # init_database()
-    # Start the reminder system
-    start_reminder_scheduler()
+    # init_database(app)
+    # Start the reminder system (in the background, off the startup path)
+    start_background_reminders(app)
     # Run the application
-    import os
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
 """
@@ -1713,7 +2354,7 @@ DEPLOYMENT NOTES:
    - MAIL_PASSWORD=your-app-password
 
 3. HOSTING PLATFORMS:
-   - Heroku: Add Procfile with "web: gunicorn app:app"
+   - Heroku: Add Procfile with "web: gunicorn wsgi:app"
    - Railway: Automatically detects Flask apps
    - DigitalOcean: Use their App Platform
    - Render: Connect your GitHub repo
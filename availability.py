@@ -0,0 +1,358 @@
+"""
+Live Slot Availability
+======================
+
+Keeps customers on the time selection page in sync with bookings made by
+others while they decide.
+
+AvailabilityCache holds the open slots per (date, service). Entries are
+dropped as soon as a booking event for that date arrives (the events.py
+broker calls invalidate() before notifying any subscriber), and expire
+after CACHE_TTL_SECONDS anyway because today's slots close as time passes.
+Every open stream for the same date and service shares one recompute.
+
+stream_availability() is the per-page SSE stream: a `slots` snapshot on
+connect, then `slot_taken` / `slot_freed` deltas. Each open stream holds a
+request thread, so a worker serves at most AVAILABILITY_MAX_STREAMS of them
+at once (StreamSlots) and each lasts AVAILABILITY_STREAM_SECONDS at most.
+Pages turned away, or whose stream ended, poll /api/availability instead
+(ETag, so an unchanged day is a 304). With gunicorn gthread and 16 threads,
+the default of 4 leaves 12 threads for every other request.
+
+open_slots() and slots_by_day() are the slot engine itself: pure functions
+over the busy intervals (intervals.busy_spans()) that one query returns,
+whether for a single day or a range of them. Bookings are counted against
+the capacity of a crew pool (see Crew in app.py): the day is split into
+SLOT_MINUTES cells and concurrent jobs per cell come from a difference
+array and a prefix sum, giving a bitmask of the cells with a crew free.
+One AND with the day's business-hours mask (business_calendar.py) and a
+few shift-ANDs find every start whose cells are all free and open, so a
+day costs O(cells) for any service duration. next_open_slots() searches
+forward for the first open slots, a couple of weeks of busy intervals per
+query, skipping days whose business hours are too short for the booking.
+
+Environment (defaults in brackets):
+    AVAILABILITY_MAX_STREAMS    [4]    live streams per worker process; 0 = polling only
+    AVAILABILITY_STREAM_SECONDS [300]  a stream ends after this, the page then polls
+"""
+
+import os
+import queue
+import threading
+import time as time_module
+from bisect import bisect_left
+from datetime import time, timedelta
+from itertools import accumulate
+
+from events import KEEPALIVE_SECONDS, format_sse
+from intervals import MAX_BOOKING_MINUTES, MINUTES_PER_DAY, day_window
+
+CACHE_TTL_SECONDS = 60
+
+# Start times are offered every SLOT_MINUTES; the day is counted in cells of that size
+SLOT_MINUTES = 30
+CELLS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+
+# Days of busy intervals next_open_slots() fetches per query
+SEARCH_CHUNK_DAYS = 14
+
+
+# ========================================
+# SLOT ENGINE
+# ========================================
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def free_cells(day, busy, capacity=1):
+    """
+    Slot mask of the day's SLOT_MINUTES cells that still have a crew free.
+
+    Each busy interval adds one concurrent job to every cell it touches
+    (a difference array, then one running sum); a cell is full once
+    `capacity` jobs overlap it.
+
+    Args:
+        day (date): The date
+        busy (list): (span_start, span_end) intervals overlapping the day
+        capacity (int): Jobs the pool can run at once
+
+    Returns:
+        int: Bit i set when cell i is free
+    """
+    midnight = day_window(day)[0]
+    diff = [0] * (CELLS_PER_DAY + 1)
+    for span_start, span_end in busy:
+        first = max(0, (span_start - midnight) // SLOT_MINUTES)
+        last = min(CELLS_PER_DAY, _ceil_div(span_end - midnight, SLOT_MINUTES))
+        if first < last:
+            diff[first] += 1
+            diff[last] -= 1
+    free = 0
+    for cell, load in enumerate(accumulate(diff[:CELLS_PER_DAY])):
+        if load < capacity:
+            free |= 1 << cell
+    return free
+
+
+def run_starts(mask, cells):
+    """
+    Bits of `mask` that start a run of at least `cells` set bits, i.e. the
+    start cells of a booking `cells` long that fits. O(log cells) shifts.
+    """
+    covered = 1
+    while covered < cells and mask:
+        step = min(covered, cells - covered)
+        mask &= mask >> step
+        covered += step
+    return mask
+
+
+def open_slots(day, earliest, hours, block_minutes, busy, capacity=1):
+    """
+    Start times on `day` at which a booking holding `block_minutes` fits,
+    i.e. every cell it covers is within business hours and has a crew free.
+    The business calendar is applied with one AND of the day's slot mask.
+
+    Args:
+        day (date): The date
+        earliest (time): First start time offered (slots step from here)
+        hours (int): The day's slot mask of business hours (business_calendar.py)
+        block_minutes (int): Minutes the booking holds
+        busy (list): (span_start, span_end) intervals of the pool overlapping the day
+        capacity (int): Jobs the pool can run at once
+
+    Returns:
+        list: Open start times as time objects
+    """
+    if capacity <= 0 or not hours:
+        return []
+    starts = run_starts(free_cells(day, busy, capacity) & hours, _ceil_div(block_minutes, SLOT_MINUTES))
+    # Drop starts before `earliest`
+    first = _ceil_div(earliest.hour * 60 + earliest.minute, SLOT_MINUTES)
+    starts = starts >> first << first
+    slots = []
+    while starts:
+        lowest = starts & -starts
+        minutes = (lowest.bit_length() - 1) * SLOT_MINUTES
+        slots.append(time(minutes // 60, minutes % 60))
+        starts ^= lowest
+    return slots
+
+
+def slots_by_day(first_day, last_day, earliest_for, hours_for, block_minutes, busy, capacity=1):
+    """
+    open_slots() for every day from `first_day` to `last_day` inclusive,
+    sharing one list of busy intervals for the whole range.
+
+    Args:
+        earliest_for (callable): date -> first start time, or None if the
+            day can't be booked (e.g. it's in the past)
+        hours_for (dict): date -> slot mask of business hours
+        busy (list): (span_start, span_end) intervals overlapping the range,
+            sorted by start
+        capacity (int): Jobs the pool can run at once
+
+    Returns:
+        dict: date -> list of open start times
+    """
+    starts = [span[0] for span in busy]
+    result = {}
+    day = first_day
+    while day <= last_day:
+        earliest = earliest_for(day)
+        if earliest is None:
+            result[day] = []
+        else:
+            window_start, window_end = day_window(day)
+            # Only intervals that can reach into this day
+            lo = bisect_left(starts, window_start - MAX_BOOKING_MINUTES)
+            hi = bisect_left(starts, window_end)
+            result[day] = open_slots(day, earliest, hours_for[day], block_minutes, busy[lo:hi], capacity)
+        day += timedelta(days=1)
+    return result
+
+
+def next_open_slots(first_day, last_day, earliest_for, hours_for, block_minutes,
+                    busy_between, limit, capacity=1):
+    """
+    The first `limit` open slots from `first_day` on, searching no further
+    than `last_day`.
+
+    Days whose business hours have no run of open cells long enough for
+    the booking (closed days included) are skipped from the slot mask alone.
+    The rest are evaluated slot by slot, with the busy intervals fetched
+    SEARCH_CHUNK_DAYS at a time and only once a day in the chunk needs them.
+
+    Args:
+        earliest_for (callable): date -> first start time, or None
+        hours_for (dict): date -> slot mask of business hours
+        busy_between (callable): (first date, last date) -> busy intervals of
+            the pool overlapping those days, sorted by start
+        limit (int): Most slots returned
+        capacity (int): Jobs the pool can run at once
+
+    Returns:
+        list: (date, time) pairs in order
+    """
+    cells = _ceil_div(block_minutes, SLOT_MINUTES)
+    found = []
+    chunk_last, busy, starts = None, [], []
+    day = first_day
+    while day <= last_day and len(found) < limit:
+        earliest = earliest_for(day)
+        hours = hours_for[day]
+        if earliest is not None and capacity > 0 and run_starts(hours, cells):
+            if chunk_last is None or day > chunk_last:
+                chunk_last = min(day + timedelta(days=SEARCH_CHUNK_DAYS - 1), last_day)
+                busy = busy_between(day, chunk_last)
+                starts = [span[0] for span in busy]
+            window_start, window_end = day_window(day)
+            lo = bisect_left(starts, window_start - MAX_BOOKING_MINUTES)
+            hi = bisect_left(starts, window_end)
+            for slot in open_slots(day, earliest, hours, block_minutes, busy[lo:hi], capacity):
+                found.append((day, slot))
+                if len(found) == limit:
+                    break
+        day += timedelta(days=1)
+    return found
+
+
+# ========================================
+# CACHE AND STREAMS
+# ========================================
+
+
+class AvailabilityCache:
+    """Open slots ('HH:MM' strings) per (date, service id)"""
+
+    def __init__(self, compute, ttl=CACHE_TTL_SECONDS):
+        """
+        Args:
+            compute (callable): (date, service_id) -> iterable of 'HH:MM';
+                called inside an app context
+            ttl (int): Seconds before an entry is recomputed regardless
+        """
+        self._compute = compute
+        self._ttl = ttl
+        self._entries = {}      # (date, service_id) -> (expires_at, frozenset)
+        self._generations = {}  # 'YYYY-MM-DD' -> invalidation count
+        self._cleared = 0       # clear() count
+        self._lock = threading.Lock()
+
+    def get(self, day, service_id):
+        key = (day, service_id)
+        now = time_module.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        generation = (self._generations.get(day.isoformat(), 0), self._cleared)
+        slots = frozenset(self._compute(day, service_id))
+        with self._lock:
+            # A booking that landed mid-compute may be missing from `slots`; don't keep them
+            if (self._generations.get(day.isoformat(), 0), self._cleared) == generation:
+                self._entries[key] = (now + self._ttl, slots)
+        return slots
+
+    def invalidate(self, day_iso):
+        """Drop every entry for the date given as 'YYYY-MM-DD'"""
+        with self._lock:
+            self._generations[day_iso] = self._generations.get(day_iso, 0) + 1
+            for key in [key for key in self._entries if key[0].isoformat() == day_iso]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every entry (crews changed, so every date's slots may have)"""
+        with self._lock:
+            self._cleared += 1
+            self._entries.clear()
+
+    def on_event(self, event_type, data):
+        """events.EventBroker listener"""
+        booking_date = data.get('booking_date') if isinstance(data, dict) else None
+        if booking_date:
+            self.invalidate(booking_date)
+
+
+class StreamSlots:
+    """Caps the live streams one worker process serves at once"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+
+    def acquire(self):
+        """
+        Returns:
+            bool: True if a stream may start; release() once it ends
+        """
+        return self._semaphore is not None and self._semaphore.acquire(blocking=False)
+
+    def release(self):
+        self._semaphore.release()
+
+
+def init_availability(app, backend, compute):
+    """
+    Create the app's availability cache and stream limit, and hook the cache
+    to booking events.
+
+    Returns:
+        AvailabilityCache
+    """
+    app.config.setdefault('AVAILABILITY_MAX_STREAMS', int(os.environ.get('AVAILABILITY_MAX_STREAMS', 4)))
+    app.config.setdefault('AVAILABILITY_STREAM_SECONDS', int(os.environ.get('AVAILABILITY_STREAM_SECONDS', 300)))
+
+    cache = AvailabilityCache(compute)
+    backend.broker.add_listener(cache.on_event)
+    app.extensions['amr_availability'] = cache
+    app.extensions['amr_availability_streams'] = StreamSlots(app.config['AVAILABILITY_MAX_STREAMS'])
+    return cache
+
+
+def stream_availability(app, backend, cache, day, service_id, max_seconds):
+    """
+    SSE body for one time selection page.
+
+    Events:
+        slots       {"available": [...]} on connect
+        slot_taken  {"times": [...]} slots that just became unavailable
+        slot_freed  {"times": [...]} slots that opened up again
+        expired     {} after `max_seconds`; the page switches to polling
+    """
+    backend.start()
+    subscriber = backend.broker.subscribe()
+    day_iso = day.isoformat()
+    deadline = time_module.monotonic() + max_seconds
+    try:
+        with app.app_context():
+            current = cache.get(day, service_id)
+        yield 'retry: 3000\n\n' + format_sse(None, 'slots', {'available': sorted(current)})
+
+        while True:
+            remaining = deadline - time_module.monotonic()
+            if remaining <= 0:
+                yield format_sse(None, 'expired', {})
+                return
+            try:
+                _, _, data = subscriber.get(timeout=min(KEEPALIVE_SECONDS, remaining))
+                if not isinstance(data, dict) or data.get('booking_date') != day_iso:
+                    continue
+            except queue.Empty:
+                if not backend.broker.is_subscribed(subscriber):
+                    return
+                # Recheck anyway: today's early slots close as the clock moves
+
+            with app.app_context():
+                latest = cache.get(day, service_id)
+            taken, freed = current - latest, latest - current
+            current = latest
+            if taken:
+                yield format_sse(None, 'slot_taken', {'times': sorted(taken)})
+            if freed:
+                yield format_sse(None, 'slot_freed', {'times': sorted(freed)})
+            if not taken and not freed:
+                yield ': keepalive\n\n'
+    finally:
+        backend.broker.unsubscribe(subscriber)
@@ -0,0 +1,355 @@
+"""
+AMR Booking Hot Path Benchmarks
+===============================
+
+Seeds a throwaway database with synthetic bookings and times the booking
+hot paths through the Flask test client:
+
+- get_available_time_slots (called directly)
+- calendar_month
+- api_admin_dashboard
+- api_admin_customers
+- api_customer_bookings
+- submit_booking
+
+Results (latency percentiles and SQL query counts) are written as JSON so
+runs can be diffed between commits.
+
+Usage:
+    python benchmarks/bench_hot_paths.py --sizes 1000,100000,1000000
+    python benchmarks/bench_hot_paths.py --sizes 1000 --output bench.json
+    python benchmarks/bench_hot_paths.py --database-url postgresql://localhost/amr_bench
+
+WARNING: the target database is dropped and re-created for every dataset size.
+Never point --database-url at a real database.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time as time_module
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = '1000,100000,1000000'
+ALL_PATHS = [
+    'get_available_time_slots',
+    'calendar_month',
+    'api_admin_dashboard',
+    'api_admin_customers',
+    'api_customer_bookings',
+    'submit_booking',
+]
+
+# Synthetic data shape
+BOOKINGS_PER_CUSTOMER = 10
+HISTORY_DAYS = 3 * 365      # Bookings spread over three years of history...
+HORIZON_DAYS = 90           # ...plus three months of future appointments
+BATCH_SIZE = 10000
+ADMIN_EMAIL = 'admin@amrservices.com'
+ADMIN_PASSWORD = 'admin123'
+CUSTOMER_PASSWORD = 'bench_password'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the AMR booking hot paths.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'Comma-separated booking counts to seed (default: {DEFAULT_SIZES})')
+    parser.add_argument('--iterations', type=int, default=20,
+                        help='Timed requests per path and dataset size (default: 20)')
+    parser.add_argument('--warmup', type=int, default=2,
+                        help='Untimed requests per path before measuring (default: 2)')
+    parser.add_argument('--paths', default=','.join(ALL_PATHS),
+                        help='Comma-separated subset of paths to run')
+    parser.add_argument('--database-url',
+                        help='Database to benchmark against (default: temporary SQLite file)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for synthetic data')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    return parser.parse_args(argv)
+
+
+def log(message):
+    """Progress output goes to stderr so stdout stays valid JSON"""
+    print(message, file=sys.stderr, flush=True)
+
+
+# ========================================
+# MEASUREMENT HELPERS
+# ========================================
+
+class QueryCounter:
+    """
+    Counts SQL statements executed on an engine via SQLAlchemy engine events.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms, query_counts, errors):
+    """Build the JSON summary for one path"""
+    ordered = sorted(latencies_ms)
+    return {
+        'iterations': len(latencies_ms),
+        'errors': errors,
+        'latency_ms': {
+            'min': round(ordered[0], 3) if ordered else None,
+            'p50': round(percentile(ordered, 50), 3) if ordered else None,
+            'p90': round(percentile(ordered, 90), 3) if ordered else None,
+            'p99': round(percentile(ordered, 99), 3) if ordered else None,
+            'max': round(ordered[-1], 3) if ordered else None,
+            'mean': round(statistics.fmean(ordered), 3) if ordered else None,
+        },
+        'queries': {
+            'min': min(query_counts) if query_counts else None,
+            'mean': round(statistics.fmean(query_counts), 2) if query_counts else None,
+            'max': max(query_counts) if query_counts else None,
+        },
+    }
+
+
+def measure(func, counter, iterations, warmup):
+    """
+    Run func() warmup + iterations times, timing the last `iterations` runs.
+
+    func must return True on success.
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    queries = []
+    errors = 0
+    for _ in range(iterations):
+        counter.reset()
+        started = time_module.perf_counter()
+        ok = func()
+        latencies.append((time_module.perf_counter() - started) * 1000.0)
+        queries.append(counter.count)
+        if not ok:
+            errors += 1
+    return summarize(latencies, queries, errors)
+
+
+# ========================================
+# SYNTHETIC DATA
+# ========================================
+
+def seed_dataset(amr, n_bookings, seed):
+    """
+    Drop and re-create all tables, then bulk load an admin plus synthetic
+    customers and n_bookings bookings through seed_data.seed_synthetic_data().
+
+    Returns:
+        dict: Facts about the dataset the benchmarks need (dates, heavy customer)
+    """
+    from sqlalchemy import func, select
+    from seed_data import seed_synthetic_data
+
+    db = amr.db
+    db.drop_all()
+    db.create_all()
+
+    admin = amr.User(first_name='Admin', last_name='User', email=ADMIN_EMAIL, phone='555-0123',
+                     address='123 Admin St, Admin City, AC 12345', is_admin=True)
+    admin.set_password(ADMIN_PASSWORD)
+    db.session.add(admin)
+    db.session.commit()
+
+    n_customers = max(1, n_bookings // BOOKINGS_PER_CUSTOMER)
+    seed_synthetic_data(
+        users=n_customers, bookings=n_bookings, recurring=n_customers // 20,
+        photos=n_bookings // 100, batch_size=BATCH_SIZE, seed=seed,
+        history_days=HISTORY_DAYS, horizon_days=HORIZON_DAYS, password=CUSTOMER_PASSWORD,
+    )
+
+    # The customer with the longest booking history exercises api_customer_bookings hardest
+    heavy_user_id = db.session.execute(
+        select(amr.Booking.user_id).group_by(amr.Booking.user_id)
+        .order_by(func.count().desc()).limit(1)
+    ).scalar()
+
+    return {
+        'customers': n_customers,
+        'bookings': n_bookings,
+        'today': amr.get_current_eastern_date(),
+        'heavy_customer_email': db.session.get(amr.User, heavy_user_id).email,
+    }
+
+
+# ========================================
+# BENCHMARKED PATHS
+# ========================================
+
+def login(client, email, password):
+    response = client.post('/api/login', json={'email': email, 'password': password})
+    if response.status_code != 200:
+        raise RuntimeError(f'Login failed for {email}: {response.status_code}')
+
+
+def build_paths(amr, app, facts, rng):
+    """
+    Returns a dict of path name -> zero-argument callable returning success.
+    """
+    target_date = facts['today'] + timedelta(days=7)
+    with app.app_context():
+        service_hours = amr.db.session.get(amr.ServiceType, 1).duration_hours
+
+    anonymous = app.test_client()
+    admin = app.test_client()
+    login(admin, ADMIN_EMAIL, ADMIN_PASSWORD)
+    customer = app.test_client()
+    login(customer, facts['heavy_customer_email'], CUSTOMER_PASSWORD)
+
+    def available_slots():
+        with app.app_context():
+            service_type = amr.db.session.get(amr.ServiceType, 1)
+            amr.get_available_time_slots(target_date, service_hours, service_type)
+        return True
+
+    def calendar_month():
+        response = anonymous.get(f'/calendar-month/1/{target_date.year}/{target_date.month}')
+        return response.status_code == 200
+
+    def admin_dashboard():
+        response = admin.get('/api/admin/dashboard')
+        return response.status_code == 200 and response.get_json()['success']
+
+    def admin_customers():
+        response = admin.get('/api/admin/customers')
+        return response.status_code == 200 and response.get_json()['success']
+
+    def customer_bookings():
+        response = customer.get('/api/customer/bookings')
+        return response.status_code == 200 and response.get_json()['success']
+
+    submit_counter = {'n': 0}
+
+    def submit_booking():
+        submit_counter['n'] += 1
+        n = submit_counter['n']
+        guest = app.test_client()
+        with guest.session_transaction() as sess:
+            sess['selected_service_id'] = 1
+            sess['selected_date'] = (target_date + timedelta(days=rng.randint(0, 60))).isoformat()
+            sess['selected_time'] = '10:00'
+        response = guest.post('/submit-booking', data={
+            'first_name': 'Guest',
+            'last_name': f'Bench{n}',
+            'email': f'guest{n}@bench.example.com',
+            'phone': '555-0199',
+            'address': f'{n} Guest Lane, Charlotte, NC',
+        })
+        return response.status_code == 302 and '/confirmation/' in response.headers.get('Location', '')
+
+    return {
+        'get_available_time_slots': available_slots,
+        'calendar_month': calendar_month,
+        'api_admin_dashboard': admin_dashboard,
+        'api_admin_customers': admin_customers,
+        'api_customer_bookings': customer_bookings,
+        'submit_booking': submit_booking,
+    }
+
+
+# ========================================
+# MAIN
+# ========================================
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    paths = [path.strip() for path in args.paths.split(',') if path.strip()]
+    unknown = set(paths) - set(ALL_PATHS)
+    if unknown:
+        raise SystemExit(f'Unknown paths: {", ".join(sorted(unknown))}')
+
+    temp_dir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        temp_dir = tempfile.TemporaryDirectory(prefix='amr-bench-')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(temp_dir.name, 'bench.db')
+        os.environ['SESSION_SQLITE_PATH'] = os.path.join(temp_dir.name, 'sessions.db')
+
+    sys.path.insert(0, ROOT)
+    import app as amr
+    app = amr.create_app()
+
+    # Never talk to the real SMTP server from a benchmark
+    amr.send_confirmation_email = lambda booking: True
+
+    rng = random.Random(args.seed)
+    results = []
+
+    # Requests must not run inside a long-lived app context: Flask would reuse
+    # it, sharing flask.g (the logged-in user) and the db session across clients.
+    with app.app_context():
+        engine = amr.db.engine
+    counter = QueryCounter(engine)
+    dialect = engine.dialect.name
+
+    for size in sizes:
+        log(f'Seeding {size} bookings...')
+        started = time_module.perf_counter()
+        with app.app_context():
+            facts = seed_dataset(amr, size, args.seed)
+        seed_seconds = time_module.perf_counter() - started
+        log(f'  seeded in {seed_seconds:.1f}s')
+
+        runners = build_paths(amr, app, facts, rng)
+        for path in paths:
+            log(f'  timing {path}...')
+            summary = measure(runners[path], counter, args.iterations, args.warmup)
+            summary.update({'path': path, 'dataset_bookings': size, 'seed_seconds': round(seed_seconds, 2)})
+            results.append(summary)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+        log(f'Results written to {args.output}')
+    else:
+        print(output)
+
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+AMR Cold Start Benchmark
+========================
+
+Measures what a customer hitting a freshly spun-up instance waits for:
+
+- import_ms: time to `import wsgi` (module import + create_app()), what a
+  WSGI worker pays before serving
+- module_import_ms: time to `import app` alone, what scripts and modules
+  that only need the models pay
+- first_response_ms: from launching `python app.py` until the first
+  `GET /` returns 200
+
+Each run is a brand new Python process against a temporary SQLite database,
+with SMTP pointed at a closed local port so nothing is ever sent.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --runs 5 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time as time_module
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    'import sys, time; sys.path.insert(0, {root!r}); '
+    't = time.perf_counter(); import {module}; '
+    'print((time.perf_counter() - t) * 1000.0)'
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure AMR cold start latency.')
+    parser.add_argument('--runs', type=int, default=10, help='Processes to start per measurement (default: 10)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait for the first response')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    return parser.parse_args(argv)
+
+
+def log(message):
+    """Progress output goes to stderr so stdout stays valid JSON"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        'runs': len(ordered),
+        'min': round(ordered[0], 2),
+        'p50': round(statistics.median(ordered), 2),
+        'max': round(ordered[-1], 2),
+        'mean': round(statistics.fmean(ordered), 2),
+    }
+
+
+def measure_import(env, module):
+    output = subprocess.check_output(
+        [sys.executable, '-c', IMPORT_SNIPPET.format(root=ROOT, module=module)],
+        env=env, cwd=ROOT, stderr=subprocess.DEVNULL,
+    )
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def measure_first_response(env, timeout):
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    url = f'http://127.0.0.1:{port}/'
+
+    started = time_module.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'app.py')], env=env, cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time_module.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f'app.py exited early with code {process.returncode}')
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    if response.status == 200:
+                        return (time_module.perf_counter() - started) * 1000.0
+            except (urllib.error.URLError, ConnectionError):
+                time_module.sleep(0.005)
+        raise RuntimeError(f'No response from app.py within {timeout}s')
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='amr-startup-') as temp_dir:
+        env = dict(os.environ)
+        env.update({
+            'DATABASE_URL': 'sqlite:///' + os.path.join(temp_dir, 'startup.db'),
+            'SESSION_SQLITE_PATH': os.path.join(temp_dir, 'sessions.db'),
+            'MAIL_SERVER': '127.0.0.1',
+            'MAIL_PORT': '9',
+            'MAIL_USE_TLS': 'false',
+            'PYTHONDONTWRITEBYTECODE': '',
+        })
+
+        import_times = []
+        module_import_times = []
+        first_responses = []
+        for run in range(args.runs):
+            log(f'Run {run + 1}/{args.runs}...')
+            import_times.append(measure_import(env, 'wsgi'))
+            module_import_times.append(measure_import(env, 'app'))
+            first_responses.append(measure_first_response(env, args.timeout))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': {
+            'import_ms': summarize(import_times),
+            'module_import_ms': summarize(module_import_times),
+            'first_response_ms': summarize(first_responses),
+        },
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+        log(f'Results written to {args.output}')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
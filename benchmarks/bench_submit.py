@@ -0,0 +1,193 @@
+"""
+AMR Booking Submit Latency Benchmark
+====================================
+
+Times POST /submit-booking for guest checkouts through the Flask test client,
+against a temporary SQLite database and a local SMTP sink, so the
+confirmation email is part of the measurement exactly as in production
+(the sink waits --smtp-delay-ms before each reply, like a remote provider).
+
+Two kinds of submits are timed:
+
+- new_guest:       an email address never seen before (account is created)
+- returning_guest: the email of an earlier guest in a different case
+
+Every submit must redirect to its confirmation page, and every confirmation
+email must reach the sink before the report is written.
+
+Usage:
+    python benchmarks/bench_submit.py
+    python benchmarks/bench_submit.py --iterations 200 --smtp-delay-ms 40 --output submit.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time as time_module
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from loadgen import SMTPSink  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark guest booking submit latency.')
+    parser.add_argument('--iterations', type=int, default=100,
+                        help='Timed submits per kind (default: 100)')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='Untimed submits before measuring (default: 5)')
+    parser.add_argument('--smtp-delay-ms', type=float, default=20.0,
+                        help='SMTP sink delay before each reply (default: 20)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for booking dates')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    return parser.parse_args(argv)
+
+
+def log(message):
+    """Progress output goes to stderr so stdout stays valid JSON"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms, errors):
+    ordered = sorted(latencies_ms)
+    return {
+        'iterations': len(ordered),
+        'errors': errors,
+        'latency_ms': {
+            'min': round(ordered[0], 3),
+            'p50': round(percentile(ordered, 50), 3),
+            'p90': round(percentile(ordered, 90), 3),
+            'p99': round(percentile(ordered, 99), 3),
+            'max': round(ordered[-1], 3),
+            'mean': round(statistics.fmean(ordered), 3),
+        },
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    smtp_sink = SMTPSink(('127.0.0.1', 0), reply_delay=args.smtp_delay_ms / 1000.0)
+    threading.Thread(target=smtp_sink.serve_forever, daemon=True).start()
+
+    temp_dir = tempfile.TemporaryDirectory(prefix='amr-submit-')
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(temp_dir.name, 'submit.db'),
+        'SESSION_SQLITE_PATH': os.path.join(temp_dir.name, 'sessions.db'),
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(smtp_sink.server_address[1]),
+        'MAIL_USE_TLS': 'false',
+    })
+
+    sys.path.insert(0, ROOT)
+    import app as amr
+
+    app = amr.create_app()
+    # init_database() prints; keep stdout valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        amr.init_database(app)
+    today = amr.get_current_eastern_date()
+    counter = {'n': 0}
+
+    # The overlap guard rejects double bookings, so every submit gets its own
+    # slot: 2-hour steps from 6:00, days in random order
+    hours = range(6, 20, 2)
+    days = (args.warmup + 2 * args.iterations) // len(hours) + 1
+    free_slots = [(today + timedelta(days=d), f'{h:02d}:00') for d in range(1, days + 1) for h in hours]
+    rng.shuffle(free_slots)
+
+    def submit(email):
+        counter['n'] += 1
+        n = counter['n']
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['selected_service_id'] = 1
+            booking_date, booking_time = free_slots.pop()
+            sess['selected_date'] = booking_date.isoformat()
+            sess['selected_time'] = booking_time
+        started = time_module.perf_counter()
+        response = client.post('/submit-booking', data={
+            'first_name': 'Guest',
+            'last_name': f'Submit{n}',
+            'email': email,
+            'phone': '555-0199',
+            'address': f'{n} Guest Lane, Charlotte, NC',
+        })
+        elapsed_ms = (time_module.perf_counter() - started) * 1000.0
+        ok = response.status_code == 302 and '/confirmation/' in response.headers.get('Location', '')
+        return elapsed_ms, ok
+
+    for i in range(args.warmup):
+        submit(f'warmup{i}@submit.example.com')
+
+    results = []
+    new_emails = [f'guest{i}@submit.example.com' for i in range(args.iterations)]
+    kinds = [
+        ('new_guest', new_emails),
+        ('returning_guest', [email.upper() for email in new_emails]),
+    ]
+    for kind, emails in kinds:
+        log(f'timing {kind}...')
+        latencies, errors = [], 0
+        for email in emails:
+            elapsed_ms, ok = submit(email)
+            latencies.append(elapsed_ms)
+            errors += not ok
+        summary = summarize(latencies, errors)
+        summary['kind'] = kind
+        results.append(summary)
+
+    # Deferred emails must still all arrive
+    tasks = app.extensions.get('amr_tasks')
+    if tasks is not None:
+        tasks.join(timeout=120)
+    expected = counter['n']
+    deadline = time_module.monotonic() + 10
+    while smtp_sink.messages < expected and time_module.monotonic() < deadline:
+        time_module.sleep(0.05)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'smtp_delay_ms': args.smtp_delay_ms,
+            'tasks_mode': app.config.get('TASKS_MODE', 'none'),
+            'emails_expected': expected,
+            'emails_sunk': smtp_sink.messages,
+        },
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+
+    smtp_sink.shutdown()
+    temp_dir.cleanup()
+    return 0 if smtp_sink.messages >= expected and not any(r['errors'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,478 @@
+"""
+AMR Booking Funnel Load Generator
+=================================
+
+Replays the full customer booking journey with concurrent virtual users:
+
+    /  ->  /services/<category>  ->  /calendar/<id>  ->  /time-selection/<y>/<m>/<d>
+       ->  /booking-form/<time>  ->  /submit-booking
+
+Each virtual user keeps its own cookie jar (the funnel state lives in the
+Flask session), picks a random service, day and time slot from the pages it
+was served, and submits a guest booking.
+
+By default the tool starts its own server in a subprocess against a temporary
+SQLite database, with SMTP pointed at a local sink that accepts and discards
+every message. Use --url to target a server you started yourself (make sure
+its MAIL_SERVER/MAIL_PORT point somewhere harmless).
+
+Usage:
+    python benchmarks/loadgen.py --concurrency 20 --duration 60
+    python benchmarks/loadgen.py --concurrency 5 --journeys 100 --output load.json
+    python benchmarks/loadgen.py --url http://127.0.0.1:5000 --concurrency 10
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import socket
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEPS = ['index', 'select_service', 'calendar', 'time_selection', 'booking_form', 'submit_booking']
+CATEGORIES = ['landscaping', 'pressure_washing']
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is +Inf)
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+SERVICE_ID_RE = re.compile(r'data-service-id="(\d+)"')
+DAY_LINK_RE = re.compile(r'href="(/time-selection/\d+/\d+/\d+)"')
+NEXT_MONTH_RE = re.compile(r'href="(/calendar-month/\d+/\d+/\d+)"')
+TIME_LINK_RE = re.compile(r'href="(/booking-form/\d\d:\d\d)"')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the AMR booking funnel.')
+    parser.add_argument('--url', help='Base URL of a running server (default: start a local one)')
+    parser.add_argument('--concurrency', type=int, default=10, help='Virtual users (default: 10)')
+    parser.add_argument('--duration', type=float, default=30.0,
+                        help='Seconds to run (default: 30, ignored when --journeys is set)')
+    parser.add_argument('--journeys', type=int, help='Stop after this many total journeys')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Seconds each virtual user pauses between steps (default: 0)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--port', type=int, default=0, help='Port for the local server (default: random)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def log(message):
+    """Progress output goes to stderr so stdout stays valid JSON"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ========================================
+# LOCAL SMTP SINK
+# ========================================
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP conversation that accepts any login and message and drops it.
+    Advertises AUTH PLAIN (no STARTTLS) so smtplib's login() succeeds.
+    """
+
+    def reply(self, line):
+        if self.server.reply_delay:
+            time_module.sleep(self.server.reply_delay)
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.reply('220 amr-loadgen SMTP sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply('250-amr-loadgen')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif command == 'AUTH':
+                self.reply('235 Authentication successful')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                self.server.record_message()
+                self.reply('250 OK: message discarded')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif command in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, reply_delay=0.0):
+        """
+        Args:
+            reply_delay (float): Seconds to wait before each reply, to stand in
+                for a remote mail provider's round trips
+        """
+        super().__init__(address, SMTPSinkHandler)
+        self.reply_delay = reply_delay
+        self.messages = 0
+        self._lock = threading.Lock()
+
+    def record_message(self):
+        with self._lock:
+            self.messages += 1
+
+
+# ========================================
+# LOCAL SERVER
+# ========================================
+
+def serve(port):
+    """
+    Subprocess entry point: initialize the (temporary) database and run the app.
+    DATABASE_URL and the MAIL_* settings come from the parent's environment.
+    """
+    sys.path.insert(0, ROOT)
+    import app as amr
+
+    app = amr.create_app()
+    amr.init_database(app)
+    app.run(host='127.0.0.1', port=port, threaded=True, debug=False, use_reloader=False)
+
+
+def start_local_server(args, smtp_port, temp_dir):
+    port = args.port or free_port()
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(temp_dir, 'loadgen.db'),
+        'SESSION_SQLITE_PATH': os.path.join(temp_dir, 'sessions.db'),
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(smtp_port),
+        'MAIL_USE_TLS': 'false',
+    })
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+
+    deadline = time_module.monotonic() + 30
+    while time_module.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'Local server exited early with code {process.returncode}')
+        try:
+            with urllib.request.urlopen(base_url + '/', timeout=2):
+                return process, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time_module.sleep(0.2)
+    process.terminate()
+    raise SystemExit('Local server did not become ready within 30s')
+
+
+# ========================================
+# VIRTUAL USERS
+# ========================================
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Surface redirects as responses so each funnel step is timed on its own"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class StepError(Exception):
+    pass
+
+
+class Stats:
+    """Thread-safe per-step latency and error collection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.journeys_completed = 0
+        self.journeys_failed = 0
+
+    def record(self, step, elapsed_ms, ok):
+        with self._lock:
+            self.latencies[step].append(elapsed_ms)
+            if not ok:
+                self.errors[step] += 1
+
+    def journey_done(self, ok):
+        with self._lock:
+            if ok:
+                self.journeys_completed += 1
+            else:
+                self.journeys_failed += 1
+
+
+class VirtualUser:
+    def __init__(self, user_id, base_url, stats, rng, timeout, think_time):
+        self.user_id = user_id
+        self.base_url = base_url
+        self.stats = stats
+        self.rng = rng
+        self.timeout = timeout
+        self.think_time = think_time
+        self.journey = 0
+        self.opener = None
+
+    def request(self, step, path, data=None, expect_redirect=False):
+        url = urllib.parse.urljoin(self.base_url, path)
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time_module.perf_counter()
+        status, location, text = None, None, ''
+        try:
+            with self.opener.open(url, data=body, timeout=self.timeout) as response:
+                status = response.status
+                text = response.read().decode(errors='replace')
+        except urllib.error.HTTPError as error:
+            status = error.code
+            location = error.headers.get('Location')
+            error.close()
+        except (urllib.error.URLError, OSError):
+            status = None
+        elapsed_ms = (time_module.perf_counter() - started) * 1000.0
+
+        if expect_redirect:
+            ok = status == 302 and location is not None and '/confirmation/' in location
+        else:
+            ok = status == 200
+        self.stats.record(step, elapsed_ms, ok)
+        if not ok:
+            raise StepError(f'{step}: {path} -> {status}')
+        if self.think_time:
+            time_module.sleep(self.think_time)
+        return text
+
+    def run_journey(self):
+        # Fresh cookie jar per journey: every journey is a new guest customer
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect()
+        )
+        self.journey += 1
+
+        self.request('index', '/')
+
+        category = self.rng.choice(CATEGORIES)
+        page = self.request('select_service', f'/services/{category}')
+        service_ids = SERVICE_ID_RE.findall(page)
+        if not service_ids:
+            raise StepError(f'select_service: no services listed for {category}')
+
+        service_id = self.rng.choice(service_ids)
+        page = self.request('calendar', f'/calendar/{service_id}')
+        day_links = DAY_LINK_RE.findall(page)
+        if not day_links:
+            # Late in the month: try the next month once
+            month_links = NEXT_MONTH_RE.findall(page)
+            if month_links:
+                page = self.request('calendar', month_links[-1])
+                day_links = DAY_LINK_RE.findall(page)
+        if not day_links:
+            raise StepError('calendar: no available days')
+
+        page = self.request('time_selection', self.rng.choice(day_links))
+        time_links = TIME_LINK_RE.findall(page)
+        if not time_links:
+            raise StepError('time_selection: no available times')
+
+        self.request('booking_form', self.rng.choice(time_links))
+
+        self.request('submit_booking', '/submit-booking', data={
+            'first_name': 'Load',
+            'last_name': f'User{self.user_id}',
+            'email': f'vu{self.user_id}-{self.journey}@loadgen.example.com',
+            'phone': '555-0100',
+            'address': f'{self.journey} Load Test Lane, Charlotte, NC',
+            'custom_description': 'Load test custom request',
+        }, expect_redirect=True)
+
+
+def run_virtual_user(vu, stop_event, journey_budget):
+    while not stop_event.is_set():
+        if journey_budget is not None and not journey_budget.acquire(blocking=False):
+            return
+        try:
+            vu.run_journey()
+            vu.stats.journey_done(True)
+        except StepError:
+            vu.stats.journey_done(False)
+
+
+# ========================================
+# REPORTING
+# ========================================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def histogram(values):
+    """Non-cumulative bucket counts keyed by upper bound ('+Inf' for the overflow bucket)"""
+    counts = {str(bound): 0 for bound in HISTOGRAM_BUCKETS_MS}
+    counts['+Inf'] = 0
+    for value in values:
+        for bound in HISTOGRAM_BUCKETS_MS:
+            if value <= bound:
+                counts[str(bound)] += 1
+                break
+        else:
+            counts['+Inf'] += 1
+    return counts
+
+
+def build_report(stats, elapsed, args, smtp_sink):
+    steps = {}
+    total_requests = 0
+    total_errors = 0
+    for step in STEPS:
+        values = sorted(stats.latencies[step])
+        total_requests += len(values)
+        total_errors += stats.errors[step]
+        steps[step] = {
+            'requests': len(values),
+            'errors': stats.errors[step],
+            'error_rate': round(stats.errors[step] / len(values), 4) if values else 0.0,
+            'latency_ms': {
+                'p50': round(percentile(values, 50), 3) if values else None,
+                'p90': round(percentile(values, 90), 3) if values else None,
+                'p99': round(percentile(values, 99), 3) if values else None,
+                'max': round(values[-1], 3) if values else None,
+                'mean': round(statistics.fmean(values), 3) if values else None,
+            },
+            'histogram_ms': histogram(values),
+        }
+
+    journeys = stats.journeys_completed + stats.journeys_failed
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'target': args.url or 'local',
+            'concurrency': args.concurrency,
+            'duration_s': round(elapsed, 3),
+            'think_time_s': args.think_time,
+        },
+        'summary': {
+            'journeys_completed': stats.journeys_completed,
+            'journeys_failed': stats.journeys_failed,
+            'journey_error_rate': round(stats.journeys_failed / journeys, 4) if journeys else 0.0,
+            'journeys_per_second': round(stats.journeys_completed / elapsed, 3) if elapsed else None,
+            'requests': total_requests,
+            'requests_per_second': round(total_requests / elapsed, 3) if elapsed else None,
+            'request_error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+            'emails_sunk': smtp_sink.messages if smtp_sink else None,
+        },
+        'steps': steps,
+    }
+
+
+# ========================================
+# MAIN
+# ========================================
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve:
+        serve(args.port)
+        return
+
+    smtp_sink = None
+    server_process = None
+    temp_dir = None
+    base_url = args.url
+
+    if base_url is None:
+        smtp_sink = SMTPSink(('127.0.0.1', 0))
+        threading.Thread(target=smtp_sink.serve_forever, daemon=True).start()
+        temp_dir = tempfile.TemporaryDirectory(prefix='amr-loadgen-')
+        log('Starting local server...')
+        server_process, base_url = start_local_server(args, smtp_sink.server_address[1], temp_dir.name)
+        log(f'  serving on {base_url}, SMTP sink on port {smtp_sink.server_address[1]}')
+
+    stats = Stats()
+    stop_event = threading.Event()
+    journey_budget = threading.Semaphore(args.journeys) if args.journeys else None
+    master_rng = random.Random(args.seed)
+
+    threads = []
+    for user_id in range(args.concurrency):
+        vu = VirtualUser(user_id, base_url, stats, random.Random(master_rng.random()),
+                         args.timeout, args.think_time)
+        threads.append(threading.Thread(target=run_virtual_user,
+                                        args=(vu, stop_event, journey_budget), daemon=True))
+
+    log(f'Running {args.concurrency} virtual users...')
+    started = time_module.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        if args.journeys:
+            for thread in threads:
+                thread.join()
+        else:
+            time_module.sleep(args.duration)
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+    elapsed = time_module.perf_counter() - started
+
+    if smtp_sink is not None:
+        # Confirmation emails are sent in the background after each submit
+        deadline = time_module.monotonic() + 10
+        while smtp_sink.messages < stats.journeys_completed and time_module.monotonic() < deadline:
+            time_module.sleep(0.05)
+
+    report = build_report(stats, elapsed, args, smtp_sink)
+
+    if server_process is not None:
+        server_process.terminate()
+        server_process.wait(timeout=10)
+    if smtp_sink is not None:
+        smtp_sink.shutdown()
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+        log(f'Results written to {args.output}')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
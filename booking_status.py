@@ -0,0 +1,57 @@
+"""
+Booking Status
+==============
+
+Booking.status keeps the status name that templates, emails, rollups and
+the APIs show. Booking.status_code holds the same status as a small
+integer, set whenever the ORM assigns status, and it is what queries filter
+and index on: the overlap index and guard (intervals.py), the dashboard's
+pending list and the per-customer counts all compare one small int instead
+of a string.
+
+    0 pending    1 confirmed    2 completed    3 cancelled
+
+A check constraint (STATUS_CODE_CHECK) requires status_code to be the code
+of status, so the two can't diverge: a Core UPDATE that changes status
+without setting status_code as well is rejected by the database. A NULL
+status_code passes; the migration leaves it NULL for statuses it doesn't
+know (intervals.py).
+"""
+
+BOOKING_STATUSES = ('pending', 'confirmed', 'completed', 'cancelled')
+
+STATUS_CODES = {status: code for code, status in enumerate(BOOKING_STATUSES)}
+PENDING, CONFIRMED, COMPLETED, CANCELLED = (STATUS_CODES[status] for status in BOOKING_STATUSES)
+
+STATUS_CODE_CHECK_NAME = 'ck_booking_status_code_matches'
+
+
+def status_code_check(row=''):
+    """
+    SQL condition: status_code is the code of status (-1, matching no code,
+    for an unknown status). `row` prefixes the columns, e.g. 'NEW.' in a trigger.
+    """
+    whens = ' '.join(f"WHEN '{status}' THEN {code}" for status, code in STATUS_CODES.items())
+    return f'{row}status_code = CASE {row}status {whens} ELSE -1 END'
+
+
+STATUS_CODE_CHECK = status_code_check()
+
+
+def status_code(status):
+    """
+    Returns:
+        int: The code of a status name
+
+    Raises:
+        ValueError: Not one of BOOKING_STATUSES
+    """
+    try:
+        return STATUS_CODES[status]
+    except KeyError:
+        raise ValueError(f'Invalid booking status: {status}') from None
+
+
+def status_name(code):
+    """The status name of a code (None for a NULL code)"""
+    return None if code is None else BOOKING_STATUSES[code]
@@ -0,0 +1,179 @@
+"""
+Business Calendar
+=================
+
+When the business takes bookings, as rules stored in the database:
+
+- weekly template:  opening and closing time (or closed) per weekday
+                    (BusinessHours); weekdays without a row use the default
+                    hours (BUSINESS_HOURS in app.py)
+- date overrides:   other hours, or closed, on one date (holidays, a short
+                    Christmas Eve; BusinessHoursOverride)
+- blackout ranges:  no bookings at all from one date to another inclusive
+                    (BusinessBlackout)
+
+A blackout beats an override, which beats the weekly template.
+
+The rules are compiled into one slot mask per date: an int whose bit i is
+set when the SLOT_MINUTES cell i of the day (cell 0 starts at midnight) is
+inside business hours. Cells only partly open count as closed. The slot
+engine (availability.py) ANDs a date's mask with the cells that have a crew
+free, so the rules cost one bitwise AND per day however they are written.
+
+BusinessCalendar keeps the rules and the masks for every date of the
+booking horizon, compiled together and reused until CALENDAR_TTL_SECONDS
+pass, the date changes or clear() is called after an admin edit. Dates
+past the horizon are compiled on demand from the cached rules.
+"""
+
+import threading
+import time as time_module
+from datetime import timedelta
+
+from availability import CELLS_PER_DAY, SLOT_MINUTES
+
+CALENDAR_TTL_SECONDS = 60
+
+# Mask of a closed day
+CLOSED = 0
+
+
+def minutes_of(clock):
+    """Minutes since midnight of a time"""
+    return clock.hour * 60 + clock.minute
+
+
+def hours_mask(open_minute, close_minute):
+    """
+    Slot mask of the cells fully inside [open_minute, close_minute).
+
+    Returns:
+        int: Bit i set for each open cell; CLOSED if none
+    """
+    first = -(-open_minute // SLOT_MINUTES)
+    last = min(close_minute // SLOT_MINUTES, CELLS_PER_DAY)
+    if first >= last:
+        return CLOSED
+    return ((1 << (last - first)) - 1) << first
+
+
+class CalendarRules:
+    """
+    The stored rules as plain values (no ORM objects), so they can be
+    cached across requests and threads.
+
+    Attributes:
+        default (int): Slot mask of a weekday without a template row
+        weekly (dict): weekday (0 = Monday) -> slot mask
+        overrides (dict): date -> slot mask
+        blackouts (list): (first date, last date) pairs, inclusive
+    """
+
+    def __init__(self, default, weekly=None, overrides=None, blackouts=None):
+        self.default = default
+        self.weekly = weekly or {}
+        self.overrides = overrides or {}
+        self.blackouts = blackouts or []
+
+    def mask(self, day):
+        """Slot mask of one date (no caching; see BusinessCalendar)"""
+        if any(first <= day <= last for first, last in self.blackouts):
+            return CLOSED
+        if day in self.overrides:
+            return self.overrides[day]
+        return self.weekly.get(day.weekday(), self.default)
+
+    def compile(self, first_day, last_day):
+        """
+        Slot masks for every date from `first_day` to `last_day` inclusive.
+
+        Returns:
+            dict: date -> slot mask
+        """
+        week = [self.weekly.get(weekday, self.default) for weekday in range(7)]
+        masks = {}
+        day = first_day
+        while day <= last_day:
+            masks[day] = week[day.weekday()]
+            day += timedelta(days=1)
+        for day, mask in self.overrides.items():
+            if day in masks:
+                masks[day] = mask
+        for first, last in self.blackouts:
+            day = max(first, first_day)
+            while day <= min(last, last_day):
+                masks[day] = CLOSED
+                day += timedelta(days=1)
+        return masks
+
+
+class BusinessCalendar:
+    """Compiled slot masks for the booking horizon, reloaded from the rules when stale"""
+
+    def __init__(self, load, today, horizon_days, ttl=CALENDAR_TTL_SECONDS):
+        """
+        Args:
+            load (callable): () -> CalendarRules; called inside an app context
+            today (callable): () -> the business's current date
+            horizon_days (int): Dates from today on kept compiled
+            ttl (int): Seconds before the rules are reloaded regardless
+        """
+        self._load = load
+        self._today = today
+        self._horizon_days = horizon_days
+        self._ttl = ttl
+        self._state = None      # (expires_at, today, rules, masks)
+        self._cleared = 0       # clear() count
+        self._lock = threading.Lock()
+
+    def _current(self):
+        state = self._state
+        today = self._today()
+        if state is not None and state[0] > time_module.monotonic() and state[1] == today:
+            return state
+        cleared = self._cleared
+        rules = self._load()
+        masks = rules.compile(today, today + timedelta(days=self._horizon_days - 1))
+        state = (time_module.monotonic() + self._ttl, today, rules, masks)
+        with self._lock:
+            # Rules changed mid-load may be missing from `rules`; don't keep them
+            if self._cleared == cleared:
+                self._state = state
+        return state
+
+    def masks(self, first_day, last_day):
+        """
+        Returns:
+            dict: date -> slot mask for every date in the range
+        """
+        _, _, rules, masks = self._current()
+        return {day: masks[day] if day in masks else rules.mask(day) for day in _dates(first_day, last_day)}
+
+    def mask(self, day):
+        _, _, rules, masks = self._current()
+        return masks[day] if day in masks else rules.mask(day)
+
+    def clear(self):
+        """Reload the rules on next use (call after changing them)"""
+        with self._lock:
+            self._cleared += 1
+            self._state = None
+
+
+def _dates(first_day, last_day):
+    day = first_day
+    while day <= last_day:
+        yield day
+        day += timedelta(days=1)
+
+
+def init_business_calendar(app, load, today, horizon_days):
+    """
+    Create the app's business calendar.
+
+    Returns:
+        BusinessCalendar
+    """
+    calendar = BusinessCalendar(load, today, horizon_days)
+    app.extensions['amr_calendar'] = calendar
+    return calendar
@@ -0,0 +1,298 @@
+"""
+Database Engine Configuration
+=============================
+
+Builds the SQLAlchemy URI and engine options from the environment.
+
+PostgreSQL (production on Render) gets a bounded connection pool with
+pre-ping and recycling, so connections dropped by the managed database or
+an idle proxy are replaced instead of failing a request, plus a
+server-side statement timeout so one runaway query can't hold a connection.
+
+SQLite (local development, benchmarks) gets WAL journaling: readers work
+from a snapshot and no longer wait on the writer while a booking is being
+submitted. `synchronous=NORMAL` is durable in WAL mode except for the last
+transactions on power loss, `mmap_size` serves reads from the page cache,
+and `busy_timeout` makes a second writer wait for the lock rather than fail
+with "database is locked".
+
+Environment (defaults in brackets):
+    DATABASE_URL              [sqlite:///amr_bookings.db]; postgres:// is accepted
+    DB_POOL_SIZE              [5]     persistent connections per process
+    DB_MAX_OVERFLOW           [10]    extra connections allowed under burst
+    DB_POOL_TIMEOUT           [30]    seconds to wait for a free connection
+    DB_POOL_RECYCLE           [1800]  seconds before a connection is replaced
+    DB_POOL_PRE_PING          [true]  test connections on checkout
+    DB_STATEMENT_TIMEOUT_MS   [15000] Postgres statement_timeout, 0 disables
+    SQLITE_JOURNAL_MODE       [WAL]
+    SQLITE_SYNCHRONOUS        [NORMAL]
+    SQLITE_MMAP_SIZE          [268435456] bytes, 0 disables
+    SQLITE_BUSY_TIMEOUT_MS    [5000]
+    DATABASE_REPLICA_URL      [unset] read replica for @use_replica views
+    REPLICA_RETRY_SECONDS     [30]    how long a failed replica is skipped
+
+Read replica
+------------
+Views decorated with @use_replica (after @login_required) send their
+SELECTs to DATABASE_REPLICA_URL; everything else, and any flush, stays on
+the primary. If the replica errors, the view is re-run on the primary and
+the replica is skipped for REPLICA_RETRY_SECONDS. Only use it for pages
+that tolerate replication lag, never for read-your-own-writes pages such
+as the booking confirmation.
+
+For local testing a second Postgres works, or a read-only SQLite copy:
+    flask replica-snapshot instance/replica.db
+    DATABASE_REPLICA_URL="sqlite:///file:instance/replica.db?mode=ro&uri=true"
+"""
+
+import logging
+import os
+import sqlite3
+import time as time_module
+from functools import wraps
+
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger('amr.db')
+
+DEFAULT_DATABASE_URL = 'sqlite:///amr_bookings.db'
+
+# Drivers that accept libpq "options" for per-connection settings
+LIBPQ_DRIVERS = ('psycopg2', 'psycopg')
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def normalize_database_url(url):
+    """
+    Heroku/Render style URLs use the postgres:// scheme, which SQLAlchemy 1.4+
+    no longer recognizes.
+    """
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def database_url():
+    """The configured database URL, normalized for SQLAlchemy"""
+    return normalize_database_url(os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL)
+
+
+def engine_options(url, read_only=False):
+    """
+    Keyword arguments for create_engine() suited to the database in `url`.
+
+    Args:
+        url (str): SQLAlchemy database URL
+        read_only (bool): Open Postgres sessions as read-only (replicas)
+
+    Returns:
+        dict: Engine options (becomes SQLALCHEMY_ENGINE_OPTIONS)
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite':
+        # Pool defaults are right for SQLite; its tuning happens in PRAGMAs on connect
+        return {}
+
+    options = {
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', True),
+    }
+
+    libpq_options = []
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 15000)
+    if statement_timeout:
+        libpq_options.append(f'-c statement_timeout={statement_timeout}')
+    if read_only:
+        libpq_options.append('-c default_transaction_read_only=on')
+    if (parsed.get_backend_name() == 'postgresql' and libpq_options
+            and parsed.get_driver_name() in LIBPQ_DRIVERS):
+        options['connect_args'] = {'options': ' '.join(libpq_options)}
+    return options
+
+
+def sqlite_pragmas(read_only=False):
+    """PRAGMA statements run on every new SQLite connection, in order"""
+    if read_only:
+        # A snapshot opened with mode=ro can't change its journal; just refuse writes
+        pragmas = ['PRAGMA query_only=ON']
+    else:
+        pragmas = [
+            f"PRAGMA journal_mode={os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')}",
+            f"PRAGMA synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        ]
+    pragmas.append(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+    mmap_size = _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    if mmap_size:
+        pragmas.append(f'PRAGMA mmap_size={mmap_size}')
+    return pragmas
+
+
+def install_sqlite_pragmas(engine, read_only=False):
+    """
+    Apply sqlite_pragmas() to each connection `engine` opens. No-op for
+    other databases and for in-memory SQLite (which has no journal file).
+    """
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+# ========================================
+# READ REPLICA
+# ========================================
+
+class Replica:
+    """A replica engine plus a back-off window after it fails"""
+
+    def __init__(self, engine, retry_seconds):
+        self.engine = engine
+        self.retry_seconds = retry_seconds
+        self._skip_until = 0.0
+
+    def available(self):
+        """
+        True if the replica is outside its back-off window and a connection
+        can be checked out. The checkout is a pool hit in the normal case.
+        """
+        if time_module.monotonic() < self._skip_until:
+            return False
+        try:
+            with self.engine.connect():
+                return True
+        except DBAPIError as e:
+            self.mark_failed(e)
+            return False
+
+    def mark_failed(self, error):
+        logger.warning('Read replica unavailable, using primary for %ss: %s', self.retry_seconds,
+                       getattr(error, 'orig', error))
+        self._skip_until = time_module.monotonic() + self.retry_seconds
+
+
+class RoutingSession(Session):
+    """
+    Flask-SQLAlchemy session that sends reads to the replica while a
+    @use_replica view is running. Flushes always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get('_use_replica'):
+            replica = current_app.extensions.get('amr_replica')
+            if replica is not None:
+                return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_replica(view):
+    """
+    Run a read-only view against the replica, falling back to the primary
+    when no replica is configured or it fails.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replica = current_app.extensions.get('amr_replica')
+        if replica is None or not replica.available():
+            return view(*args, **kwargs)
+
+        g._use_replica = True
+        try:
+            return view(*args, **kwargs)
+        except DBAPIError as e:
+            # Views that handle their own errors never get here; available() covers those
+            replica.mark_failed(e)
+            g._use_replica = False
+            current_app.extensions['sqlalchemy'].session.rollback()
+            return view(*args, **kwargs)
+        finally:
+            g._use_replica = False
+    return wrapper
+
+
+def _resolve_sqlite_path(url, app):
+    """Relative SQLite paths live in the instance folder, as for the primary"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != 'sqlite' or parsed.database in (None, '', ':memory:'):
+        return parsed
+    is_uri = parsed.database.startswith('file:')
+    path = parsed.database[5:] if is_uri else parsed.database
+    if os.path.isabs(path):
+        return parsed
+    path = os.path.join(app.instance_path, path)
+    return parsed.set(database=f'file:{path}' if is_uri else path)
+
+
+def init_replica(app):
+    """
+    Create the replica engine from SQLALCHEMY_REPLICA_URI / DATABASE_REPLICA_URL.
+
+    Returns:
+        Replica: The replica, or None when not configured
+    """
+    app.config.setdefault('SQLALCHEMY_REPLICA_URI', os.environ.get('DATABASE_REPLICA_URL'))
+    url = app.config['SQLALCHEMY_REPLICA_URI']
+    if not url:
+        return None
+
+    url = normalize_database_url(url)
+    engine = create_engine(_resolve_sqlite_path(url, app), **engine_options(url, read_only=True))
+    install_sqlite_pragmas(engine, read_only=True)
+    replica = Replica(engine, _env_int('REPLICA_RETRY_SECONDS', 30))
+    app.extensions['amr_replica'] = replica
+    return replica
+
+
+def snapshot_sqlite(engine, path):
+    """
+    Copy a SQLite database to `path` with the online backup API, for use as
+    a local read-replica stand-in.
+    """
+    if engine.dialect.name != 'sqlite':
+        raise ValueError('Snapshots are only supported for SQLite databases')
+    target = sqlite3.connect(path)
+    try:
+        with engine.connect() as conn:
+            conn.connection.dbapi_connection.backup(target)
+    finally:
+        target.close()
+
+
+def configure_database(app, db):
+    """
+    Set the URI and engine options on `app` (keeping any values already set
+    through create_app(config)), initialize Flask-SQLAlchemy, tune the
+    engines it created and set up the optional read replica.
+    """
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_url())
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    db.init_app(app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine)
+
+    init_replica(app)
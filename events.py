@@ -0,0 +1,299 @@
+"""
+Admin Event Stream
+==================
+
+Pushes booking changes to open admin dashboards over Server-Sent Events,
+so the panel can patch its lists instead of re-fetching the full snapshot.
+
+Booking inserts and status changes are collected during each ORM flush and
+published only after the transaction commits (a rolled back submit never
+shows up on a dashboard). Writes that bypass the ORM call publish() after
+their own commit.
+
+Backends (EVENTS_BACKEND):
+    memory    (default) in-process fan-out; fine for a single worker
+    postgres  NOTIFY on publish, one LISTEN thread per worker feeds its local
+              subscribers, so every worker sees every event
+
+Each process keeps the last EVENT_REPLAY_SIZE events so a reconnecting
+browser (EventSource sends Last-Event-ID) catches up on what it missed.
+"""
+
+import itertools
+import json
+import logging
+import os
+import queue
+import select as select_module
+import threading
+import time as time_module
+from collections import deque
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, text
+
+logger = logging.getLogger('amr.events')
+
+EVENT_CHANNEL = 'amr_events'
+EVENT_REPLAY_SIZE = 200
+SUBSCRIBER_QUEUE_SIZE = 1000
+KEEPALIVE_SECONDS = 15
+
+BOOKING_CREATED = 'booking_created'
+BOOKING_STATUS_CHANGED = 'booking_status_changed'
+
+
+# ========================================
+# IN-PROCESS BROKER
+# ========================================
+
+class EventBroker:
+    """Fan-out of events to subscriber queues, with a short replay buffer"""
+
+    def __init__(self, replay_size=EVENT_REPLAY_SIZE):
+        self._subscribers = set()
+        self._listeners = []
+        self._recent = deque(maxlen=replay_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register a new subscriber.
+
+        Args:
+            last_event_id (int): Replay buffered events newer than this id
+
+        Returns:
+            queue.Queue: Receives (id, type, data) tuples
+        """
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if last_event_id is not None:
+                for item in self._recent:
+                    if item[0] > last_event_id:
+                        subscriber.put_nowait(item)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def add_listener(self, callback):
+        """
+        Call `callback(event_type, data)` synchronously for every event,
+        before subscribers are notified (e.g. to invalidate caches).
+        """
+        self._listeners.append(callback)
+
+    def is_subscribed(self, subscriber):
+        return subscriber in self._subscribers
+
+    def dispatch(self, event_type, data):
+        """Deliver an event to every local subscriber"""
+        with self._lock:
+            item = (next(self._ids), event_type, data)
+            self._recent.append(item)
+            subscribers = list(self._subscribers)
+        for callback in self._listeners:
+            try:
+                callback(event_type, data)
+            except Exception as e:
+                logger.warning('Event listener %r failed: %s', callback, e)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(item)
+            except queue.Full:
+                # A stalled client must not hold up the others; it will
+                # reconnect and reload the full snapshot
+                self.unsubscribe(subscriber)
+                logger.warning('Dropped a slow event subscriber')
+
+
+class MemoryBackend:
+    """Single-process backend: publish goes straight to the local broker"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def publish(self, events):
+        for event_type, data in events:
+            self.broker.dispatch(event_type, data)
+
+    def start(self):
+        pass
+
+
+class PostgresNotifyBackend:
+    """
+    Cross-process backend using Postgres LISTEN/NOTIFY. Events reach the
+    local broker through the listener thread, including this process's own.
+    """
+
+    def __init__(self, broker, engine, channel=EVENT_CHANNEL):
+        self.broker = broker
+        self.engine = engine
+        self.channel = channel
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, events):
+        with self.engine.connect() as conn:
+            for event_type, data in events:
+                payload = json.dumps({'type': event_type, 'data': data}, default=str)
+                conn.execute(text('SELECT pg_notify(:channel, :payload)'),
+                             {'channel': self.channel, 'payload': payload})
+            conn.commit()
+
+    def start(self):
+        """Start the LISTEN thread (once, on the first subscriber)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen_forever, name='amr-events-listener',
+                                                daemon=True)
+                self._thread.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.warning('Event listener lost its connection, reconnecting: %s', e)
+                time_module.sleep(2)
+
+    def _listen(self):
+        raw = self.engine.raw_connection()
+        try:
+            dbapi_connection = raw.dbapi_connection
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f'LISTEN {self.channel}')
+            while True:
+                if select_module.select([dbapi_connection], [], [], KEEPALIVE_SECONDS) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    message = json.loads(notify.payload)
+                    self.broker.dispatch(message['type'], message['data'])
+        finally:
+            raw.invalidate()
+
+
+# ========================================
+# PUBLISHING
+# ========================================
+
+def _events():
+    return current_app.extensions.get('amr_events') if has_app_context() else None
+
+
+def publish(events):
+    """
+    Publish [(type, data), ...] through the app's backend. Call only after
+    the change is committed. Never raises: a lost dashboard update must not
+    fail the write that caused it.
+    """
+    backend = _events()
+    if backend is None or not events:
+        return
+    try:
+        backend.publish(events)
+    except Exception as e:
+        logger.warning('Failed to publish %d events: %s', len(events), e)
+
+
+def track_booking_events(session_class, booking_cls, formatter):
+    """
+    Collect booking_created / booking_status_changed events on every flush
+    of `session_class` and publish them once the transaction commits.
+
+    Args:
+        formatter (callable): Booking -> JSON-able dict sent to dashboards
+    """
+
+    @event.listens_for(session_class, 'after_flush')
+    def _collect(session, flush_context):
+        # Attribute history is only available here, but new objects are still
+        # pending (relationships unloaded), so formatting waits for postexec
+        changed = session.info.setdefault('amr_event_objects', [])
+        for obj in session.new:
+            if isinstance(obj, booking_cls):
+                changed.append((BOOKING_CREATED, obj, None))
+        for obj in session.dirty:
+            if isinstance(obj, booking_cls) and obj not in session.deleted:
+                history = inspect(obj).attrs.status.history
+                if history.deleted and history.deleted[0] != obj.status:
+                    changed.append((BOOKING_STATUS_CHANGED, obj, history.deleted[0]))
+
+    @event.listens_for(session_class, 'after_flush_postexec')
+    def _format(session, flush_context):
+        pending = session.info.setdefault('amr_events', [])
+        for event_type, obj, previous_status in session.info.pop('amr_event_objects', []):
+            data = formatter(obj)
+            if previous_status is not None:
+                data['previous_status'] = previous_status
+            pending.append((event_type, data))
+
+    @event.listens_for(session_class, 'after_commit')
+    def _publish(session):
+        events = session.info.pop('amr_events', None)
+        if events:
+            publish(events)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def _discard(session):
+        session.info.pop('amr_event_objects', None)
+        session.info.pop('amr_events', None)
+
+
+# ========================================
+# SSE
+# ========================================
+
+def format_sse(event_id, event_type, data):
+    prefix = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{prefix}event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+def stream_events(backend, last_event_id=None):
+    """
+    Generate an SSE response body for one client until it disconnects.
+    Sends a comment every KEEPALIVE_SECONDS so proxies keep the connection open.
+    """
+    backend.start()
+    subscriber = backend.broker.subscribe(last_event_id)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event_id, event_type, data = subscriber.get(timeout=KEEPALIVE_SECONDS)
+            except queue.Empty:
+                if not backend.broker.is_subscribed(subscriber):
+                    # Dropped for falling behind; the browser reconnects and reloads
+                    return
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event_id, event_type, data)
+    finally:
+        backend.broker.unsubscribe(subscriber)
+
+
+def init_events(app, engine):
+    """
+    Create the event backend for `app` from EVENTS_BACKEND (memory or postgres).
+
+    Returns:
+        MemoryBackend | PostgresNotifyBackend
+    """
+    app.config.setdefault('EVENTS_BACKEND', os.environ.get('EVENTS_BACKEND', 'memory'))
+    broker = EventBroker()
+    if app.config['EVENTS_BACKEND'] == 'postgres':
+        if engine.dialect.name != 'postgresql':
+            raise RuntimeError('EVENTS_BACKEND=postgres needs a PostgreSQL DATABASE_URL')
+        backend = PostgresNotifyBackend(broker, engine)
+    else:
+        backend = MemoryBackend(broker)
+    app.extensions['amr_events'] = backend
+    return backend
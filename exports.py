@@ -0,0 +1,228 @@
+"""
+Streaming Admin Exports
+=======================
+
+Bookings (joined with customer and service) and customers (with booking
+totals) as CSV or NDJSON. Rows are fetched with a server-side cursor
+(stream_results + yield_per) and written to the response in chunks by a
+generator, so the download starts immediately and memory stays flat no
+matter how many years of data are exported.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import and_, case, func, select, true
+
+from app import Booking, ServiceType, User
+from booking_status import BOOKING_STATUSES, COMPLETED, STATUS_CODES
+from intervals import day_window
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per round trip and written per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+# Text starting with one of these is read as a formula by spreadsheet apps
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(ValueError):
+    """Invalid export parameters"""
+
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ExportError(f'{name} must be a date in YYYY-MM-DD format')
+
+
+def parse_export_args(args):
+    """
+    Read and validate the query string of an export request.
+
+    Args:
+        args (MultiDict): request.args with optional format, from, to and status
+            (comma-separated, e.g. status=pending,confirmed)
+
+    Returns:
+        dict: format, date_from, date_to, statuses
+    """
+    export_format = args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f'format must be one of: {", ".join(EXPORT_FORMATS)}')
+
+    statuses = [s.strip() for s in args.get('status', '').split(',') if s.strip()]
+    invalid = [s for s in statuses if s not in BOOKING_STATUSES]
+    if invalid:
+        raise ExportError(f'Invalid status: {", ".join(invalid)}')
+
+    date_from = _parse_date(args.get('from'), 'from')
+    date_to = _parse_date(args.get('to'), 'to')
+    if date_from and date_to and date_from > date_to:
+        raise ExportError('from must not be after to')
+
+    return {'format': export_format, 'date_from': date_from, 'date_to': date_to, 'statuses': statuses}
+
+
+# ========================================
+# QUERIES
+# ========================================
+
+def bookings_query(date_from=None, date_to=None, statuses=None):
+    """
+    Bookings with customer and service fields, filtered on booking date and
+    status. A booking's span starts on its booking date, so the date range is
+    a range of span_start and rows come back in ix_booking_span order; only
+    bookings starting at the same minute are sorted, by id.
+    """
+    query = (
+        select(
+            Booking.id.label('booking_id'),
+            Booking.booking_date,
+            Booking.start_time,
+            Booking.end_time,
+            Booking.status,
+            ServiceType.name.label('service_name'),
+            ServiceType.category.label('service_category'),
+            User.id.label('customer_id'),
+            User.first_name,
+            User.last_name,
+            User.email,
+            User.phone,
+            User.address,
+            Booking.custom_description,
+            Booking.admin_notes,
+            Booking.created_at,
+        )
+        .join(User, Booking.user_id == User.id)
+        .join(ServiceType, Booking.service_type_id == ServiceType.id)
+        .order_by(Booking.span_start, Booking.id)
+    )
+    if date_from:
+        query = query.where(Booking.span_start >= day_window(date_from)[0])
+    if date_to:
+        query = query.where(Booking.span_start < day_window(date_to)[1])
+    if statuses:
+        query = query.where(Booking.status_code.in_([STATUS_CODES[status] for status in statuses]))
+    return query
+
+
+def customers_query(date_from=None, date_to=None, statuses=None):
+    """
+    Customers with booking totals. Dates filter on signup date, as a
+    half-open range of created_at so it stays a plain column comparison;
+    statuses limit which bookings are counted.
+    """
+    booking_filter = true()
+    if statuses:
+        booking_filter = Booking.status_code.in_([STATUS_CODES[status] for status in statuses])
+    totals = (
+        select(
+            Booking.user_id,
+            func.count().label('total_bookings'),
+            func.sum(case((Booking.status_code == COMPLETED, 1), else_=0)).label('completed_bookings'),
+            func.max(Booking.booking_date).label('last_booking'),
+        )
+        .where(booking_filter)
+        .group_by(Booking.user_id)
+        .subquery()
+    )
+    query = (
+        select(
+            User.id.label('customer_id'),
+            User.first_name,
+            User.last_name,
+            User.email,
+            User.phone,
+            User.address,
+            User.created_at,
+            func.coalesce(totals.c.total_bookings, 0).label('total_bookings'),
+            func.coalesce(totals.c.completed_bookings, 0).label('completed_bookings'),
+            totals.c.last_booking,
+        )
+        .outerjoin(totals, totals.c.user_id == User.id)
+        .where(User.is_admin.is_(False))
+        .order_by(User.id)
+    )
+    conditions = []
+    if date_from:
+        conditions.append(User.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        conditions.append(User.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    if conditions:
+        query = query.where(and_(*conditions))
+    return query
+
+
+# ========================================
+# SERIALIZATION
+# ========================================
+
+def _plain(value):
+    """JSON/CSV friendly value: dates ISO formatted, times as HH:MM"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, 'hour') and not hasattr(value, 'year'):
+        return value.strftime('%H:%M')
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_cell(value):
+    """
+    _plain() for a CSV cell. Text that a spreadsheet would run as a formula
+    (a customer named "=HYPERLINK(...)") gets a leading apostrophe so it
+    opens as text; NDJSON keeps values as they are.
+    """
+    value = _plain(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([[_csv_cell(v) for v in row] for row in rows])
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(columns, rows):
+    return ''.join(
+        json.dumps(dict(zip(columns, (_plain(v) for v in row))), ensure_ascii=False) + '\n'
+        for row in rows
+    )
+
+
+def stream_export(engine, query, export_format, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Generate the export body in chunks of `batch_size` rows.
+
+    The connection is held only while the generator runs and is released
+    when the client finishes or disconnects.
+
+    Args:
+        engine: Engine to read from (primary or replica)
+        query (Select): bookings_query() or customers_query()
+        export_format (str): 'csv' or 'ndjson'
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        columns = list(result.keys())
+        if export_format == 'csv':
+            yield _csv_chunk([columns])
+        for partition in result.partitions():
+            if export_format == 'csv':
+                yield _csv_chunk(partition)
+            else:
+                yield _ndjson_chunk(columns, partition)
@@ -0,0 +1,345 @@
+"""
+Booking Intervals
+=================
+
+Every booking also stores the time it occupies as a half-open interval of
+minutes since 1970-01-01 (span_start, span_end), filled from booking_date,
+start_time and end_time whenever the ORM writes a booking. Overlap tests
+become integer comparisons the database can answer from one index:
+
+    ix_booking_span (span_start, span_end, status_code, service_type_id, crew_id)
+
+A booking never lasts longer than MAX_BOOKING_MINUTES, so "overlaps the
+window [a, b)" is the bounded range scan
+
+    span_start > a - MAX_BOOKING_MINUTES AND span_start < b AND span_end > a
+
+served entirely from the covering index (busy_spans()), the same on every
+database.
+
+The overlap guard makes double booking impossible at the database level:
+a non-cancelled booking may not overlap another non-cancelled booking of
+the same crew. Bookings without a crew (crew_id NULL, i.e. before any
+crews are set up) count as one crew, so they may not overlap each other.
+The first crew of a category takes over that category's bookings without
+a crew (assign_uncrewed_bookings()); otherwise the guard, comparing crew
+ids, would let a new booking of the crew land on top of one of them.
+
+- PostgreSQL: a generated `during tsrange` column and the exclusion
+              constraint booking_no_overlap (GiST index on the crew and
+              `during`; needs the btree_gist extension)
+- SQLite:     BEFORE INSERT / UPDATE triggers that abort with
+              'booking_no_overlap', each a single probe of ix_booking_span
+
+Both compare the small-int status_code (booking_status.py) rather than
+the status name.
+
+install_interval_schema() (`flask install-booking-guard`, and
+init_database() for new installs) adds the columns to an existing
+database, fills them, (re)creates the booking indexes and installs the
+guard once no overlapping bookings are left. Databases created with plain
+db.create_all() (benchmarks, synthetic datasets) get the columns and index
+but no guard.
+"""
+
+from datetime import date
+
+from sqlalchemy import bindparam, case, event, func, inspect, select, text, update
+
+from booking_status import CANCELLED, STATUS_CODE_CHECK, STATUS_CODE_CHECK_NAME, STATUS_CODES, status_code_check
+
+EPOCH = date(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+
+# Longest possible booking; bounds every overlap range scan
+MAX_BOOKING_MINUTES = MINUTES_PER_DAY
+
+GUARD_NAME = 'booking_no_overlap'
+
+
+def minute_of(day, clock):
+    """Minutes since 1970-01-01 00:00 of `clock` (a time) on `day` (a date)"""
+    return (day - EPOCH).days * MINUTES_PER_DAY + clock.hour * 60 + clock.minute
+
+
+def booking_span(booking_date, start_time, end_time):
+    """
+    Returns:
+        tuple: (span_start, span_end) minutes for a booking
+    """
+    start = minute_of(booking_date, start_time)
+    end = minute_of(booking_date, end_time)
+    if end <= start:
+        # Ends at or after midnight
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def day_window(day):
+    """(start, end) minutes covering the whole of `day`"""
+    start = (day - EPOCH).days * MINUTES_PER_DAY
+    return start, start + MINUTES_PER_DAY
+
+
+def is_overlap_violation(error):
+    """True if a DB error (IntegrityError) came from the overlap guard"""
+    return GUARD_NAME in str(getattr(error, 'orig', error))
+
+
+def track_booking_spans(booking_class):
+    """Keep span_start / span_end in step with the booking's date and times on every ORM write"""
+    def set_span(mapper, connection, target):
+        if target.booking_date and target.start_time and target.end_time:
+            target.span_start, target.span_end = booking_span(
+                target.booking_date, target.start_time, target.end_time)
+
+    event.listen(booking_class, 'before_insert', set_span)
+    event.listen(booking_class, 'before_update', set_span)
+
+
+# ========================================
+# QUERIES
+# ========================================
+
+def _overlapping(booking_table, window_start, window_end):
+    c = booking_table.c
+    return (
+        c.span_start > window_start - MAX_BOOKING_MINUTES,
+        c.span_start < window_end,
+        c.span_end > window_start,
+        c.status_code != CANCELLED,
+    )
+
+
+def busy_spans(conn, booking_table, window_start, window_end, service_type_ids=None):
+    """
+    Intervals held by non-cancelled bookings that overlap [window_start, window_end).
+
+    Args:
+        conn: Connection or Session to read from
+        booking_table (Table): booking
+        window_start (int): Window start, minutes since the epoch
+        window_end (int): Window end (exclusive)
+        service_type_ids (list): Only bookings of these services (one crew
+            pool); None for all
+
+    Returns:
+        list: (span_start, span_end) tuples ordered by start
+    """
+    c = booking_table.c
+    statement = select(c.span_start, c.span_end).where(*_overlapping(booking_table, window_start, window_end))
+    if service_type_ids is not None:
+        statement = statement.where(c.service_type_id.in_(service_type_ids))
+    rows = conn.execute(statement.order_by(c.span_start)).all()
+    return [tuple(row) for row in rows]
+
+
+def busy_crews(conn, booking_table, span_start, span_end, crew_ids):
+    """
+    Which of `crew_ids` have an active booking overlapping [span_start, span_end).
+
+    Returns:
+        set: Crew ids that are busy
+    """
+    c = booking_table.c
+    rows = conn.execute(
+        select(c.crew_id).distinct()
+        .where(*_overlapping(booking_table, span_start, span_end), c.crew_id.in_(crew_ids))
+    ).all()
+    return {row[0] for row in rows}
+
+
+def assign_uncrewed_bookings(conn, booking_table, crew_id, service_type_ids):
+    """
+    Give `crew_id` every booking of the services that has no crew yet.
+
+    Bookings without a crew never overlap each other (the guard treats them
+    as one crew), so one crew can take them all. Run it when a category
+    gets its first crew, in the same transaction.
+
+    Returns:
+        int: Bookings assigned
+    """
+    c = booking_table.c
+    return conn.execute(
+        update(booking_table)
+        .where(c.crew_id.is_(None), c.service_type_id.in_(service_type_ids))
+        .values(crew_id=crew_id)
+    ).rowcount
+
+
+def overlaps(spans, start, end):
+    """True if [start, end) overlaps any interval in `spans`"""
+    return any(start < busy_end and end > busy_start for busy_start, busy_end in spans)
+
+
+def count_overlapping_pairs(conn, booking_table):
+    """Number of pairs of non-cancelled bookings of one crew that overlap (the guard needs zero)"""
+    c = booking_table.c
+    other = booking_table.alias('other')
+    o = other.c
+    return conn.execute(
+        select(func.count()).select_from(booking_table.join(other, o.id > c.id))
+        .where(c.status_code != CANCELLED, o.status_code != CANCELLED, o.crew_id.is_not_distinct_from(c.crew_id),
+               o.span_start > c.span_start - MAX_BOOKING_MINUTES,
+               o.span_start < c.span_end, o.span_end > c.span_start)
+    ).scalar()
+
+
+# ========================================
+# SCHEMA
+# ========================================
+
+def _sqlite_guard_ddl(table):
+    # IS NOT: a NULL status_code (a status the migration didn't know) counts as not cancelled
+    probe = (f"SELECT 1 FROM {table} b WHERE b.span_start > NEW.span_start - {MAX_BOOKING_MINUTES} "
+             f"AND b.span_start < NEW.span_end AND b.span_end > NEW.span_start "
+             f"AND b.status_code IS NOT {CANCELLED} AND b.crew_id IS NEW.crew_id")
+    # Dropped first, so installing again replaces an older definition
+    return [
+        f'DROP TRIGGER IF EXISTS {GUARD_NAME}_insert',
+        f'DROP TRIGGER IF EXISTS {GUARD_NAME}_update',
+        f"""CREATE TRIGGER {GUARD_NAME}_insert BEFORE INSERT ON {table}
+            WHEN NEW.status_code IS NOT {CANCELLED} AND EXISTS ({probe})
+            BEGIN SELECT RAISE(ABORT, '{GUARD_NAME}'); END""",
+        f"""CREATE TRIGGER {GUARD_NAME}_update
+            BEFORE UPDATE OF span_start, span_end, status_code, crew_id ON {table}
+            WHEN NEW.status_code IS NOT {CANCELLED} AND EXISTS ({probe} AND b.id != NEW.id)
+            BEGIN SELECT RAISE(ABORT, '{GUARD_NAME}'); END""",
+    ]
+
+
+def _postgres_guard_ddl(table):
+    return [
+        f"""ALTER TABLE {table} ADD COLUMN IF NOT EXISTS during tsrange
+            GENERATED ALWAYS AS (tsrange(timestamp '1970-01-01' + make_interval(mins => span_start),
+                                         timestamp '1970-01-01' + make_interval(mins => span_end)))
+            STORED""",
+        # Integer equality inside a GiST exclusion constraint
+        'CREATE EXTENSION IF NOT EXISTS btree_gist',
+        f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {GUARD_NAME}',
+        f"""ALTER TABLE {table} ADD CONSTRAINT {GUARD_NAME}
+            EXCLUDE USING gist ((coalesce(crew_id, 0)) WITH =, during WITH &&)
+            WHERE (status_code IS DISTINCT FROM {CANCELLED})""",
+    ]
+
+
+def guard_installed(conn):
+    """True if the overlap guard exists in the connection's database"""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        statement = text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name")
+        return conn.execute(statement, {'name': f'{GUARD_NAME}_insert'}).first() is not None
+    if dialect == 'postgresql':
+        statement = text('SELECT 1 FROM pg_constraint WHERE conname = :name')
+        return conn.execute(statement, {'name': GUARD_NAME}).first() is not None
+    return False
+
+
+def _sync_indexes(conn, booking_table, log):
+    """Create the table's indexes, replacing any of the same name on other columns"""
+    existing = {index['name']: index['column_names'] for index in inspect(conn).get_indexes(booking_table.name)}
+    for index in booking_table.indexes:
+        columns = [column.name for column in index.columns]
+        if index.name in existing and existing[index.name] != columns:
+            index.drop(conn)
+            log(f'  rebuilding {index.name}')
+        if existing.get(index.name) != columns:
+            index.create(conn)
+
+
+def _install_status_check(conn, booking_table, table_name, log):
+    """
+    Tie status_code to status (STATUS_CODE_CHECK) on a table created
+    without the check: a constraint on PostgreSQL; on SQLite, which can't
+    add one to an existing table, triggers that abort the same way.
+    """
+    checks = {check['name'] for check in inspect(conn).get_check_constraints(booking_table.name)}
+    if STATUS_CODE_CHECK_NAME in checks:
+        return
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(f'ALTER TABLE {table_name} ADD CONSTRAINT {STATUS_CODE_CHECK_NAME} '
+                          f'CHECK ({STATUS_CODE_CHECK})'))
+    elif conn.dialect.name == 'sqlite':
+        abort = f"BEGIN SELECT RAISE(ABORT, '{STATUS_CODE_CHECK_NAME}'); END"
+        for statement in (
+            f'DROP TRIGGER IF EXISTS {STATUS_CODE_CHECK_NAME}_insert',
+            f'DROP TRIGGER IF EXISTS {STATUS_CODE_CHECK_NAME}_update',
+            f"""CREATE TRIGGER {STATUS_CODE_CHECK_NAME}_insert BEFORE INSERT ON {table_name}
+                WHEN NOT ({status_code_check('NEW.')}) {abort}""",
+            f"""CREATE TRIGGER {STATUS_CODE_CHECK_NAME}_update BEFORE UPDATE OF status, status_code ON {table_name}
+                WHEN NOT ({status_code_check('NEW.')}) {abort}""",
+        ):
+            conn.execute(text(statement))
+    else:
+        return
+    log('  status_code tied to status')
+
+
+def install_interval_schema(conn, booking_table, guard=True, log=None):
+    """
+    Bring an existing booking table up to date: span, crew and status_code
+    columns, span and status_code values, the check tying status_code to
+    status, the booking indexes and (optionally) the overlap guard. The crew table must exist already
+    (db.create_all()).
+
+    Args:
+        conn: Connection inside the migration transaction
+        booking_table (Table): booking
+        guard (bool): Install the overlap guard as well
+        log (callable): Optional progress callback taking a message string
+
+    Returns:
+        dict: filled (rows given spans), coded (rows whose status_code was set),
+            overlapping (pairs of active
+            bookings that overlap; the guard is only installed when 0),
+            guard (True if installed)
+    """
+    log = log or (lambda message: None)
+    table_name = conn.dialect.identifier_preparer.format_table(booking_table)
+    columns = {column['name'] for column in inspect(conn).get_columns(booking_table.name)}
+    for name in ('span_start', 'span_end'):
+        if name not in columns:
+            conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {name} INTEGER'))
+    if 'crew_id' not in columns:
+        conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN crew_id INTEGER REFERENCES crew (id)'))
+    if 'status_code' not in columns:
+        conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN status_code SMALLINT'))
+
+    c = booking_table.c
+    missing = conn.execute(
+        select(c.id, c.booking_date, c.start_time, c.end_time)
+        .where((c.span_start.is_(None)) | (c.span_end.is_(None)))
+    ).all()
+    if missing:
+        conn.execute(
+            update(booking_table).where(c.id == bindparam('booking_id'))
+            .values(span_start=bindparam('start'), span_end=bindparam('end')),
+            [dict(zip(('start', 'end'), booking_span(row.booking_date, row.start_time, row.end_time)),
+                  booking_id=row.id) for row in missing],
+        )
+        log(f'  filled spans for {len(missing)} bookings')
+    # Missing or stale codes are set from the status; statuses outside
+    # BOOKING_STATUSES get a NULL code
+    expected = case(STATUS_CODES, value=c.status)
+    coded = conn.execute(
+        update(booking_table).where(c.status_code.is_distinct_from(expected))
+        .values(status_code=expected)
+    ).rowcount
+    if coded:
+        log(f'  filled status codes for {coded} bookings')
+    _install_status_check(conn, booking_table, table_name, log)
+    _sync_indexes(conn, booking_table, log)
+
+    result = {'filled': len(missing), 'coded': coded, 'overlapping': 0, 'guard': False}
+    if not guard or conn.dialect.name not in ('sqlite', 'postgresql'):
+        return result
+
+    result['overlapping'] = count_overlapping_pairs(conn, booking_table)
+    if result['overlapping']:
+        return result
+    ddl = _sqlite_guard_ddl(table_name) if conn.dialect.name == 'sqlite' else _postgres_guard_ddl(table_name)
+    for statement in ddl:
+        conn.execute(text(statement))
+    result['guard'] = True
+    return result
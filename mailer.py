@@ -0,0 +1,468 @@
+"""
+Email Notifications
+===================
+
+Booking confirmation and 24-hour reminder emails.
+
+Imported on first use (see send_confirmation_email() in app.py and the
+reminder scheduler) so smtplib, ssl and the MIME modules stay off the
+startup path.
+"""
+
+import logging
+import smtplib
+import ssl
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from flask import current_app
+
+from metrics import track_smtp
+
+mail_logger = logging.getLogger('amr.mail')
+
+
+def send_confirmation_email(booking):
+    """
+    Send booking confirmation email to customer.
+    Enhanced version with logo image and service-specific colors.
+    
+    Args:
+        booking (Booking): The booking object to send confirmation for
+    """
+    text_body = ''
+    try:
+        # Email configuration
+        smtp_server = current_app.config['MAIL_SERVER']
+        port = current_app.config['MAIL_PORT']
+        
+        # Your Gmail credentials
+        sender_email = "amrservicescontact@gmail.com"
+        sender_password = "vtdd evzr okic znzk"
+        sender_name = "AMR Services"
+        
+        # Service-specific colors
+        if booking.service_type.category == 'landscaping':
+            primary_color = "#035F0A"  # Your green color
+            service_emoji = "🌱"
+        else:  # pressure_washing
+            primary_color = "#7EE0FF"  # Your blue color
+            service_emoji = "💧"
+        
+        # Create email message
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = f"AMR Services - Booking Confirmation #{booking.id}"
+        msg['From'] = f"{sender_name} <{sender_email}>"
+        msg['To'] = booking.user.email
+        
+        # Create the email body (HTML version with logo and dynamic colors)
+        html_body = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ 
+                    background-color: {primary_color}; 
+                    color: white; 
+                    padding: 30px 20px; 
+                    text-align: center; 
+                    border-radius: 10px 10px 0 0; 
+                    position: relative;
+                }}
+                .logo {{ 
+                    max-width: 120px; 
+                    height: auto; 
+                    border-radius: 15px; 
+                    margin-bottom: 15px;
+                    border: 3px solid white;
+                    box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+                }}
+                .content {{ background-color: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px; }}
+                .detail-row {{ 
+                    margin: 10px 0; 
+                    padding: 15px; 
+                    background-color: white; 
+                    border-radius: 8px; 
+                    border-left: 4px solid {primary_color};
+                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                }}
+                .emoji {{ font-size: 1.2em; margin-right: 8px; }}
+                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 0.9em; }}
+                .service-badge {{
+                    background-color: {primary_color};
+                    color: white;
+                    padding: 8px 16px;
+                    border-radius: 20px;
+                    font-weight: bold;
+                    display: inline-block;
+                    margin: 10px 0;
+                }}
+                .contact-info {{
+                    background-color: {primary_color};
+                    color: white;
+                    padding: 15px;
+                    border-radius: 8px;
+                    margin: 15px 0;
+                }}
+                .what-to-expect {{
+                    background-color: rgba({int(primary_color[1:3], 16)}, {int(primary_color[3:5], 16)}, {int(primary_color[5:7], 16)}, 0.1);
+                    padding: 15px;
+                    border-radius: 8px;
+                    border: 1px solid {primary_color};
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1 style="margin: 0; color: white;">{service_emoji} AMR Services</h1>
+                    <h2 style="margin: 0; font-size: 1.8em;">{service_emoji} Booking Confirmed!</h2>
+                    <div class="service-badge">{booking.service_type.category.replace('_', ' ').title()} Service</div>
+                </div>
+                
+                <div class="content">
+                    <p style="font-size: 1.1em; margin-bottom: 20px;">Hi <strong>{booking.user.first_name}</strong>,</p>
+                    
+                    <p>Great news! Your appointment with AMR Services has been confirmed. Here are your booking details:</p>
+                    
+                    <div class="detail-row">
+                        <span class="emoji">🛠️</span><strong>Service:</strong> {booking.service_type.name}
+                    </div>
+                    
+                    <div class="detail-row">
+                        <span class="emoji">📅</span><strong>Date:</strong> {booking.booking_date.strftime('%A, %B %d, %Y')}
+                    </div>
+                    
+                    <div class="detail-row">
+                        <span class="emoji">🕐</span><strong>Time:</strong> {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}
+                    </div>
+                    
+                    <div class="detail-row">
+                        <span class="emoji">⏱️</span><strong>Duration:</strong> {booking.duration_display}
+                    </div>
+                    
+                    <div class="detail-row">
+                        <span class="emoji">📍</span><strong>Service Address:</strong><br>{booking.user.address}
+                    </div>
+                    
+                    <div class="detail-row">
+                        <span class="emoji">🎫</span><strong>Booking ID:</strong> #{booking.id}
+                    </div>
+                    
+                    {f'<div class="detail-row"><span class="emoji">📝</span><strong>Special Request:</strong><br>{booking.custom_description}</div>' if booking.custom_description else ''}
+                    
+                    <div class="what-to-expect">
+                        <h3 style="color: {primary_color}; margin-top: 0;">What to expect:</h3>
+                        <ul style="margin: 10px 0;">
+                            <li>Our team will arrive at the scheduled time</li>
+                            <li>Please ensure access to the work area</li>
+                            <li>We'll clean up after ourselves</li>
+                            <li>Payment can be made after service completion</li>
+                        </ul>
+                    </div>
+                    
+                    <div class="contact-info">
+                        <h3 style="margin-top: 0;">Need to make changes? Contact us:</h3>
+                        <p style="margin: 5px 0;">📧 Email: {sender_email}</p>
+                        <p style="margin: 5px 0;">📱 Phone: (803) 899-4393</p>
+                    </div>
+                    
+                    <p style="text-align: center; font-size: 1.1em; color: {primary_color}; font-weight: bold;">
+                        Thank you for choosing AMR Services!
+                    </p>
+                    
+                    <div class="footer">
+                        <p style="color: {primary_color}; font-weight: bold;">AMR Landscaping & Pressure Washing</p>
+                        <p>Professional service you can trust</p>
+                        
+                        <p><small>This email was sent because you booked a service with AMR Services. 
+                        If you didn't make this booking, please contact us immediately.</small></p>
+                    </div>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Create plain text version as backup
+        text_body = f"""
+        AMR Services - Booking Confirmation
+        
+        Hi {booking.user.first_name},
+        
+        Your {booking.service_type.category.replace('_', ' ')} appointment with AMR Services has been confirmed!
+        
+        Booking Details:
+        ================
+        Service: {booking.service_type.name}
+        Date: {booking.booking_date.strftime('%A, %B %d, %Y')}
+        Time: {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}
+        Duration: {booking.duration_display}
+        Address: {booking.user.address}
+        Booking ID: #{booking.id}
+        
+        {f'Special Request: {booking.custom_description}' if booking.custom_description else ''}
+        
+        What to expect:
+        - Our team will arrive at the scheduled time
+        - Please ensure access to the work area  
+        - We'll clean up after ourselves
+        - Payment can be made after service completion
+        
+        Need to make changes? Contact us:
+        Email: {sender_email}
+        Phone: (803) 899-4393
+        
+        Thank you for choosing AMR Services!
+        
+        AMR Landscaping & Pressure Washing
+        Professional service you can trust
+        """
+        # Attach both versions
+        part1 = MIMEText(text_body, 'plain')
+        part2 = MIMEText(html_body, 'html')
+        msg.attach(part1)
+        msg.attach(part2)
+
+        # Send the email
+        context = ssl.create_default_context()
+        with track_smtp(), smtplib.SMTP(smtp_server, port) as server:
+            if current_app.config['MAIL_USE_TLS']:
+                server.starttls(context=context)
+            server.login(sender_email, sender_password)
+            server.send_message(msg)
+        
+        mail_logger.info("✅ Confirmation email sent successfully to %s (%s, using %s theme)",
+                         booking.user.email, booking.service_type.category, primary_color,
+                         extra={'booking_id': booking.id})
+        return True
+        
+    except Exception as e:
+        mail_logger.error("❌ Error sending email to %s: %s", booking.user.email, str(e),
+                          extra={'booking_id': booking.id})
+        
+        # Still log the fallback version
+        mail_logger.info("📧 EMAIL CONTENT (would have been sent to %s <%s>):\n"
+                         "Subject: AMR Services - Booking Confirmation #%s\n"
+                         "Service Type: %s\n%s",
+                         booking.user.full_name, booking.user.email, booking.id,
+                         booking.service_type.category, text_body,
+                         extra={'booking_id': booking.id})
+        
+        return False
+
+def send_reminder_email(booking):
+    """
+    Send 24-hour reminder email to customer.
+    
+    Args:
+        booking (Booking): The booking object to send reminder for
+    """
+    try:
+        # Email configuration
+        smtp_server = current_app.config['MAIL_SERVER']
+        port = current_app.config['MAIL_PORT']
+        
+        # Your Gmail credentials
+        sender_email = "amrservicescontact@gmail.com"
+        sender_password = "vtdd evzr okic znzk"
+        sender_name = "AMR Services"
+        
+        # Service-specific colors and emoji
+        if booking.service_type.category == 'landscaping':
+            primary_color = "#035F0A"
+            service_emoji = "🌱"
+        else:  # pressure_washing
+            primary_color = "#7EE0FF"
+            service_emoji = "💧"
+        
+        # Create email message
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = f"⏰ Reminder: AMR Service Tomorrow - Booking #{booking.id}"
+        msg['From'] = f"{sender_name} <{sender_email}>"
+        msg['To'] = booking.user.email
+        
+        # Calculate time until service
+        service_datetime = datetime.combine(booking.booking_date, booking.start_time)
+        time_until = service_datetime - datetime.now()
+        hours_until = int(time_until.total_seconds() / 3600)
+        
+        # Create reminder HTML email
+        html_body = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ 
+                    background: linear-gradient(135deg, {primary_color} 0%, {primary_color}dd 100%);
+                    color: white; 
+                    padding: 25px; 
+                    text-align: center; 
+                    border-radius: 15px 15px 0 0;
+                }}
+                .content {{ background-color: #f9f9f9; padding: 25px; border-radius: 0 0 15px 15px; }}
+                .reminder-badge {{
+                    background-color: #FF6B35;
+                    color: white;
+                    padding: 10px 20px;
+                    border-radius: 25px;
+                    font-weight: bold;
+                    display: inline-block;
+                    margin: 10px 0;
+                    font-size: 1.1em;
+                }}
+                .detail-box {{ 
+                    background: white; 
+                    padding: 20px; 
+                    border-radius: 10px; 
+                    border-left: 5px solid {primary_color};
+                    margin: 15px 0;
+                    box-shadow: 0 3px 6px rgba(0,0,0,0.1);
+                }}
+                .important-note {{
+                    background-color: #FFF3CD;
+                    border: 1px solid #FFEAA7;
+                    color: #856404;
+                    padding: 15px;
+                    border-radius: 8px;
+                    margin: 20px 0;
+                }}
+                .contact-section {{
+                    background-color: {primary_color};
+                    color: white;
+                    padding: 20px;
+                    border-radius: 10px;
+                    text-align: center;
+                    margin: 20px 0;
+                }}
+                .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 0.9em; }}
+                .emoji {{ font-size: 1.3em; margin-right: 10px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1 style="margin: 0;">{service_emoji} AMR Services</h1>
+                    <div class="reminder-badge">⏰ Service Reminder</div>
+                    <h2 style="margin: 10px 0 0 0;">Your appointment is tomorrow!</h2>
+                </div>
+                
+                <div class="content">
+                    <p style="font-size: 1.2em; color: {primary_color}; font-weight: bold;">
+                        Hi {booking.user.first_name}, just a friendly reminder about your upcoming service!
+                    </p>
+                    
+                    <div class="detail-box">
+                        <h3 style="color: {primary_color}; margin-top: 0;">📋 Appointment Details</h3>
+                        <p><span class="emoji">🛠️</span><strong>Service:</strong> {booking.service_type.name}</p>
+                        <p><span class="emoji">📅</span><strong>Date:</strong> {booking.booking_date.strftime('%A, %B %d, %Y')}</p>
+                        <p><span class="emoji">🕐</span><strong>Time:</strong> {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}</p>
+                        <p><span class="emoji">📍</span><strong>Address:</strong> {booking.user.address}</p>
+                        <p><span class="emoji">🎫</span><strong>Booking ID:</strong> #{booking.id}</p>
+                        {f'<p><span class="emoji">📝</span><strong>Special Request:</strong> {booking.custom_description}</p>' if booking.custom_description else ''}
+                    </div>
+                    
+                    <div class="important-note">
+                        <h3 style="margin-top: 0;">⚠️ Please Prepare for Our Arrival</h3>
+                        <ul style="margin: 10px 0;">
+                            <li><strong>Clear access</strong> to work areas (move cars, outdoor furniture, etc.)</li>
+                            <li><strong>Secure pets</strong> indoors during service</li>
+                            <li><strong>Be available</strong> for any questions from our team</li>
+                            <li><strong>Water access</strong> available if needed</li>
+                        </ul>
+                    </div>
+                    
+                    <div style="background-color: rgba({int(primary_color[1:3], 16)}, {int(primary_color[3:5], 16)}, {int(primary_color[5:7], 16)}, 0.1); padding: 20px; border-radius: 10px; margin: 20px 0;">
+                        <h3 style="color: {primary_color}; margin-top: 0;">☀️ Weather Considerations</h3>
+                        <p>Our team monitors weather conditions. If severe weather is forecasted, we'll contact you about rescheduling. Light rain typically doesn't affect most of our services.</p>
+                    </div>
+                    
+                    <div class="contact-section">
+                        <h3 style="margin-top: 0;">Need to reschedule or have questions?</h3>
+                        <p style="font-size: 1.1em; margin: 10px 0;">📧 <strong>{sender_email}</strong></p>
+                        <p style="font-size: 1.1em; margin: 10px 0;">📱 <strong>(803) 899-4393</strong></p>
+                        <p style="margin: 15px 0 0 0; font-size: 0.9em;">
+                            <em>Please contact us at least 4 hours before your appointment for any changes</em>
+                        </p>
+                    </div>
+                    
+                    <p style="text-align: center; font-size: 1.2em; color: {primary_color}; font-weight: bold; margin: 25px 0;">
+                        We're excited to provide excellent service for you tomorrow! 🌟
+                    </p>
+                    
+                    <div class="footer">
+                        <p style="color: {primary_color}; font-weight: bold;">AMR Landscaping & Pressure Washing</p>
+                        <p>Professional service you can trust</p>
+                    </div>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Create plain text version
+        text_body = f"""
+        AMR Services - Service Reminder
+        
+        Hi {booking.user.first_name},
+        
+        This is a friendly reminder about your appointment TOMORROW!
+        
+        Appointment Details:
+        ===================
+        Service: {booking.service_type.name}
+        Date: {booking.booking_date.strftime('%A, %B %d, %Y')}
+        Time: {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}
+        Address: {booking.user.address}
+        Booking ID: #{booking.id}
+        
+        {f'Special Request: {booking.custom_description}' if booking.custom_description else ''}
+        
+        Please Prepare:
+        - Clear access to work areas
+        - Secure pets indoors during service  
+        - Be available for any questions
+        - Ensure water access if needed
+        
+        Weather: Our team monitors conditions and will contact you if rescheduling is needed.
+        
+        Need to reschedule or have questions?
+        Email: {sender_email}
+        Phone: (803) 899-4393
+        
+        Please contact us at least 4 hours before your appointment for changes.
+        
+        We're excited to provide excellent service tomorrow!
+        
+        AMR Landscaping & Pressure Washing
+        Professional service you can trust
+        """
+        
+        # Attach both versions
+        part1 = MIMEText(text_body, 'plain')
+        part2 = MIMEText(html_body, 'html')
+        
+        msg.attach(part1)
+        msg.attach(part2)
+        
+        # Send the email
+        context = ssl.create_default_context()
+        with track_smtp(), smtplib.SMTP(smtp_server, port) as server:
+            if current_app.config['MAIL_USE_TLS']:
+                server.starttls(context=context)
+            server.login(sender_email, sender_password)
+            server.send_message(msg)
+        
+        mail_logger.info("✅ Reminder email sent to %s for booking #%s (%s on %s)",
+                         booking.user.email, booking.id, booking.service_type.name, booking.booking_date,
+                         extra={'booking_id': booking.id})
+        return True
+        
+    except Exception as e:
+        mail_logger.error("❌ Error sending reminder email: %s", str(e), extra={'booking_id': booking.id})
+        return False
@@ -0,0 +1,298 @@
+"""
+Request Metrics
+===============
+
+In-process instrumentation exposed in Prometheus text format on /metrics.
+
+Per route (Flask endpoint) it records:
+- request latency
+- number and total time of SQL statements (SQLAlchemy engine events)
+- template render time (Flask template signals)
+- SMTP time (wrap sends in `track_smtp()`)
+
+Everything is kept in memory per process, so with several workers each one
+reports its own numbers; Prometheus sums them per instance as usual.
+
+/metrics is closed by default: without METRICS_TOKEN only direct requests
+from the machine itself (loopback, no X-Forwarded-For, i.e. not relayed by
+a proxy) are served, everything else gets 403. With a token set, scrapes
+from anywhere need `Authorization: Bearer <token>`.
+
+Environment (defaults in brackets):
+    METRICS_TOKEN   []  bearer token for /metrics; unset = loopback only
+"""
+
+import hmac
+import ipaddress
+import os
+import threading
+import time as time_module
+from contextlib import contextmanager
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Seconds; same defaults as the official Prometheus clients
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names"""
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.labelnames = tuple(labelnames)
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        label_names = self.labelnames + ('le',)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for i, bound in enumerate(self.buckets):
+                    cumulative += series[i]
+                    bucket_labels = _format_labels(label_names, labels + (_format_value(bound),))
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                plain = _format_labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{plain} {_format_value(series[-2])}')
+                lines.append(f'{self.name}_count{plain} {series[-1]}')
+        return lines
+
+
+REQUESTS = Counter(
+    'amr_http_requests_total', 'HTTP requests by route, method and status.',
+    ('endpoint', 'method', 'status'))
+REQUEST_LATENCY = Histogram(
+    'amr_http_request_duration_seconds', 'Request latency by route.',
+    LATENCY_BUCKETS, ('endpoint', 'method'))
+SQL_QUERIES = Histogram(
+    'amr_request_sql_queries', 'SQL statements executed per request.',
+    QUERY_COUNT_BUCKETS, ('endpoint',))
+SQL_TIME = Histogram(
+    'amr_request_sql_duration_seconds', 'Total SQL time per request.',
+    LATENCY_BUCKETS, ('endpoint',))
+TEMPLATE_TIME = Histogram(
+    'amr_request_template_duration_seconds', 'Template render time per request.',
+    LATENCY_BUCKETS, ('endpoint',))
+SMTP_TIME = Histogram(
+    'amr_smtp_duration_seconds', 'Time spent talking to the SMTP server, by route '
+    '("background" outside requests).',
+    LATENCY_BUCKETS, ('endpoint',))
+
+ALL_METRICS = [REQUESTS, REQUEST_LATENCY, SQL_QUERIES, SQL_TIME, TEMPLATE_TIME, SMTP_TIME]
+
+
+def _tracking():
+    """True when the current request is being measured"""
+    return has_request_context() and hasattr(g, '_metrics_started')
+
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+
+# ========================================
+# SQLALCHEMY EVENTS
+# ========================================
+
+# Start times are keyed by cursor and live in conn.info, which belongs to the
+# pooled DBAPI connection and outlasts the request, so every start must be
+# popped: by after_cursor_execute, or by handle_error when the statement fails.
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _tracking():
+        conn.info.setdefault('_metrics_query_start', {})[cursor] = time_module.perf_counter()
+
+
+def _finish_statement(conn, cursor):
+    starts = conn.info.get('_metrics_query_start')
+    start = starts.pop(cursor, None) if starts else None
+    if start is None or not _tracking():
+        return
+    g._metrics_sql_time += time_module.perf_counter() - start
+    g._metrics_sql_count += 1
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish_statement(conn, cursor)
+
+
+def _handle_error(exception_context):
+    # A failed statement still ran, so it is counted and timed like the others.
+    # There is no cursor if creating it was what failed.
+    cursor = getattr(exception_context.execution_context, 'cursor', None)
+    if exception_context.connection is not None and cursor is not None:
+        _finish_statement(exception_context.connection, cursor)
+
+
+# ========================================
+# TEMPLATE SIGNALS
+# ========================================
+
+def _before_render(sender, template, context, **extra):
+    if _tracking():
+        g._metrics_template_start = time_module.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    if _tracking() and getattr(g, '_metrics_template_start', None) is not None:
+        g._metrics_template_time += time_module.perf_counter() - g._metrics_template_start
+        g._metrics_template_start = None
+
+
+# ========================================
+# SMTP
+# ========================================
+
+@contextmanager
+def track_smtp():
+    """
+    Time an SMTP conversation. Attributed to the current route when called
+    during a request, otherwise to "background" (e.g. the reminder thread).
+    """
+    started = time_module.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time_module.perf_counter() - started
+        if _tracking():
+            g._metrics_smtp_time += elapsed
+        else:
+            SMTP_TIME.observe(('background',), elapsed)
+
+
+# ========================================
+# FLASK INTEGRATION
+# ========================================
+
+def _start_request():
+    if request.endpoint == 'metrics':
+        return
+    g._metrics_started = time_module.perf_counter()
+    g._metrics_sql_count = 0
+    g._metrics_sql_time = 0.0
+    g._metrics_template_time = 0.0
+    g._metrics_template_start = None
+    g._metrics_smtp_time = 0.0
+
+
+def _finish_request(response):
+    if not _tracking():
+        return response
+    elapsed = time_module.perf_counter() - g._metrics_started
+    endpoint = _endpoint()
+    REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+    REQUEST_LATENCY.observe((endpoint, request.method), elapsed)
+    SQL_QUERIES.observe((endpoint,), g._metrics_sql_count)
+    SQL_TIME.observe((endpoint,), g._metrics_sql_time)
+    if g._metrics_template_time:
+        TEMPLATE_TIME.observe((endpoint,), g._metrics_template_time)
+    if g._metrics_smtp_time:
+        SMTP_TIME.observe((endpoint,), g._metrics_smtp_time)
+    return response
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _is_local_request():
+    """True for a request made directly from this machine (not relayed by a proxy)"""
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def metrics_view():
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+    elif not _is_local_request():
+        abort(403)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    """
+    Hook request timing, SQL counting and template timing into the app and
+    register the /metrics endpoint.
+    """
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    # Listening on the Engine class covers every engine the app creates
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
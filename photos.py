@@ -0,0 +1,45 @@
+"""
+Photo Uploads
+=============
+
+Saves customer photos for custom landscaping requests.
+Imported on first upload so it stays off the startup path.
+"""
+
+import os
+from datetime import datetime
+
+from werkzeug.utils import secure_filename
+
+
+def save_uploaded_photos(photos, upload_folder):
+    """
+    Save uploaded files under upload_folder with timestamped, sanitized names.
+    
+    Args:
+        photos (list): werkzeug FileStorage objects from request.files
+        upload_folder (str): Directory to save into (must exist)
+        
+    Returns:
+        list: Dicts with filename, original_name and url for each saved file
+    """
+    uploaded_files = []
+    
+    for photo in photos:
+        if photo.filename != '' and photo:
+            # Generate secure filename
+            filename = secure_filename(photo.filename)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
+            filename = timestamp + filename
+            
+            # Save file
+            file_path = os.path.join(upload_folder, filename)
+            photo.save(file_path)
+            
+            uploaded_files.append({
+                'filename': filename,
+                'original_name': photo.filename,
+                'url': f'/static/uploads/{filename}'
+            })
+    
+    return uploaded_files
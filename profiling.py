@@ -0,0 +1,228 @@
+"""
+SQL Profiling (development / staging)
+=====================================
+
+Opt-in per-request watcher for SQLAlchemy statements. Enable with
+SQL_PROFILING=1 (or app.config['SQL_PROFILING'] = True).
+
+For every request it:
+- flags N+1 patterns: the same statement shape run N_PLUS_ONE_THRESHOLD or
+  more times (lazy loads inside loops)
+- logs statements slower than SLOW_QUERY_MS together with their EXPLAIN plan
+- checks SQL_QUERY_BUDGETS ({endpoint: max statements}); with
+  SQL_PROFILING_RAISE on, a route over budget raises QueryBudgetExceeded,
+  which fails the request (and the test that made it)
+
+`assert_max_queries(n)` gives tests the same check for any block of code.
+"""
+
+import logging
+import os
+import re
+import time as time_module
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('amr.sql')
+
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:[^()]*)\)', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or code block ran more SQL statements than allowed"""
+
+
+def statement_shape(statement):
+    """
+    Normalize a statement so repeated executions with different parameters
+    (or inlined literals) compare equal.
+    """
+    shape = _WHITESPACE_RE.sub(' ', statement).strip()
+    shape = _LITERAL_RE.sub('?', shape)
+    return _IN_LIST_RE.sub('IN (...)', shape)
+
+
+def _env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+# ========================================
+# STATEMENT RECORDING
+# ========================================
+
+class StatementLog:
+    """Statements seen during one request (or one assert_max_queries block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = Counter()
+        self.slow = []      # (elapsed_ms, statement, parameters, engine)
+
+    def record(self, statement, parameters, elapsed_ms, engine, slow_ms):
+        self.count += 1
+        self.shapes[statement_shape(statement)] += 1
+        if slow_ms is not None and elapsed_ms >= slow_ms:
+            self.slow.append((elapsed_ms, statement, parameters, engine))
+
+
+# Blocks wrapped in assert_max_queries(), innermost last
+_block_logs = []
+
+
+def _active_logs():
+    logs = list(_block_logs)
+    if has_request_context() and getattr(g, '_profiling_log', None) is not None \
+            and not getattr(g, '_profiling_paused', False):
+        logs.append(g._profiling_log)
+    return logs
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profiling_start = time_module.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = _active_logs()
+    if not logs:
+        return
+    started = getattr(context, '_profiling_start', None)
+    elapsed_ms = (time_module.perf_counter() - started) * 1000.0 if started else 0.0
+    slow_ms = g.get('_profiling_slow_ms') if has_request_context() else None
+    for statement_log in logs:
+        statement_log.record(statement, parameters, elapsed_ms, conn.engine, slow_ms)
+
+
+def _install_engine_listeners():
+    if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail with QueryBudgetExceeded if the block runs more than `limit` statements.
+
+    Usage:
+        with assert_max_queries(3):
+            client.get('/api/customer/bookings')
+    """
+    _install_engine_listeners()
+    statement_log = StatementLog()
+    _block_logs.append(statement_log)
+    try:
+        yield statement_log
+    finally:
+        _block_logs.remove(statement_log)
+    if statement_log.count > limit:
+        worst = ', '.join(f'{n}x {shape[:80]}' for shape, n in statement_log.shapes.most_common(3))
+        raise QueryBudgetExceeded(
+            f'Expected at most {limit} statements, ran {statement_log.count} (most repeated: {worst})'
+        )
+
+
+# ========================================
+# EXPLAIN
+# ========================================
+
+def explain(engine, statement, parameters):
+    """
+    Return the query plan for a SELECT as text, or None if it can't be explained.
+    Runs on its own connection so it never disturbs the request's transaction.
+    """
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    try:
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    except Exception as e:
+        return f'(EXPLAIN failed: {e})'
+    if engine.dialect.name == 'sqlite':
+        # (id, parent, notused, detail)
+        return '\n'.join(f'  {row[-1]}' for row in rows)
+    return '\n'.join(f'  {row[0]}' for row in rows)
+
+
+# ========================================
+# FLASK INTEGRATION
+# ========================================
+
+def _start_request():
+    g._profiling_log = StatementLog()
+    g._profiling_slow_ms = g._profiling_config['slow_ms']
+
+
+def _finish_request(response):
+    statement_log = getattr(g, '_profiling_log', None)
+    if statement_log is None:
+        return response
+    config = g._profiling_config
+    endpoint = request.endpoint or 'unmatched'
+
+    for shape, count in statement_log.shapes.most_common():
+        if count < config['n_plus_one_threshold']:
+            break
+        logger.warning('N+1 suspected in %s: %d executions of %s', endpoint, count, shape)
+
+    # EXPLAIN runs SQL of its own; keep it out of this request's numbers
+    g._profiling_paused = True
+    for elapsed_ms, statement, parameters, engine in statement_log.slow:
+        logger.warning('Slow query in %s (%.1f ms): %s\n%s', endpoint, elapsed_ms,
+                       _WHITESPACE_RE.sub(' ', statement).strip(),
+                       explain(engine, statement, parameters) or '  (no plan)')
+
+    budget = config['budgets'].get(endpoint)
+    if budget is not None and statement_log.count > budget:
+        message = f'{endpoint} ran {statement_log.count} SQL statements (budget {budget})'
+        if config['raise']:
+            raise QueryBudgetExceeded(message)
+        logger.warning('Query budget exceeded: %s', message)
+    return response
+
+
+def init_profiling(app):
+    """
+    Install the profiler if SQL_PROFILING is enabled in the environment or config.
+
+    Config keys (environment variables in brackets):
+        SQL_PROFILING [SQL_PROFILING]             enable the profiler
+        SLOW_QUERY_MS [SLOW_QUERY_MS]             slow query threshold, default 100
+        N_PLUS_ONE_THRESHOLD [N_PLUS_ONE_THRESHOLD] repeats that count as N+1, default 5
+        SQL_QUERY_BUDGETS                         {endpoint: max statements}
+        SQL_PROFILING_RAISE [SQL_PROFILING_RAISE] raise QueryBudgetExceeded over budget
+    """
+    app.config.setdefault('SQL_PROFILING', _env_flag('SQL_PROFILING'))
+    if not app.config['SQL_PROFILING']:
+        return False
+
+    app.config.setdefault('SLOW_QUERY_MS', float(os.environ.get('SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)))
+    app.config.setdefault('N_PLUS_ONE_THRESHOLD',
+                          int(os.environ.get('N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)))
+    app.config.setdefault('SQL_QUERY_BUDGETS', {})
+    app.config.setdefault('SQL_PROFILING_RAISE', _env_flag('SQL_PROFILING_RAISE'))
+
+    def start_request():
+        # Read config per request so tests can tweak budgets on the fly
+        g._profiling_config = {
+            'slow_ms': app.config['SLOW_QUERY_MS'],
+            'n_plus_one_threshold': app.config['N_PLUS_ONE_THRESHOLD'],
+            'budgets': app.config['SQL_QUERY_BUDGETS'],
+            'raise': app.config['SQL_PROFILING_RAISE'],
+        }
+        _start_request()
+
+    app.before_request(start_request)
+    app.after_request(_finish_request)
+    _install_engine_listeners()
+    return True
@@ -0,0 +1,97 @@
+"""
+Reminder Scheduler
+==================
+
+Background thread that sends 24-hour reminder emails once a day.
+
+Imported lazily when the scheduler is started, after the server is already
+accepting requests (see start_background_reminders() in app.py).
+"""
+
+import logging
+import threading
+import time as time_module
+from datetime import datetime, date, timedelta
+
+from app import Booking
+from booking_status import CONFIRMED
+from mailer import send_reminder_email
+
+scheduler_logger = logging.getLogger('amr.scheduler')
+
+
+def check_and_send_reminders(app):
+    """
+    Check for bookings that need 24-hour reminders and send them.
+    This function runs in a background thread.
+    
+    Args:
+        app (Flask): The application whose database should be checked
+    """
+    with app.app_context():
+        try:
+            # Calculate tomorrow's date
+            tomorrow = date.today() + timedelta(days=1)
+            
+            # Find all confirmed bookings for tomorrow that haven't been reminded
+            bookings_tomorrow = Booking.query.filter(
+                Booking.booking_date == tomorrow,
+                Booking.status_code == CONFIRMED
+            ).all()
+            
+            reminders_sent = 0
+            
+            for booking in bookings_tomorrow:
+                # Check if reminder was already sent (you might want to add a reminder_sent field to Booking model)
+                # For now, we'll send reminders for all confirmed bookings
+                
+                success = send_reminder_email(booking)
+                if success:
+                    reminders_sent += 1
+                    
+                    # Optional: Mark that reminder was sent
+                    # booking.reminder_sent = True
+                    # db.session.commit()
+            
+            if reminders_sent > 0:
+                scheduler_logger.info("📧 Sent %d reminder email(s) for tomorrow's appointments", reminders_sent)
+            else:
+                scheduler_logger.info("📅 No reminders needed - %d bookings tomorrow", len(bookings_tomorrow))
+                
+        except Exception as e:
+            scheduler_logger.exception("❌ Error in reminder check: %s", str(e))
+
+
+def start_reminder_scheduler(app):
+    """
+    Start the background reminder scheduler.
+    Checks for reminders every hour.
+    
+    Args:
+        app (Flask): The application to run reminder checks against
+    """
+    def reminder_loop():
+        while True:
+            try:
+                # Check current time
+                now = datetime.now()
+                
+                # Send reminders at 9 AM daily (you can adjust this)
+                if now.hour == 9 and now.minute < 5:  # 9:00-9:05 AM window
+                    scheduler_logger.info("🕘 Daily reminder check at %s", now.strftime('%I:%M %p'))
+                    check_and_send_reminders(app)
+                    
+                    # Sleep for 10 minutes to avoid duplicate sends in the same hour
+                    time_module.sleep(600)  # 10 minutes
+                else:
+                    # Check every hour
+                    time_module.sleep(3600)  # 1 hour
+                    
+            except Exception as e:
+                scheduler_logger.exception("❌ Error in reminder scheduler: %s", str(e))
+                time_module.sleep(300)  # 5 minutes before retrying
+    
+    # Start reminder thread
+    reminder_thread = threading.Thread(target=reminder_loop, daemon=True)
+    reminder_thread.start()
+    scheduler_logger.info("📧 Email reminder scheduler started - will check daily at 9 AM")
@@ -0,0 +1,169 @@
+"""
+Booking Rollups
+===============
+
+Pre-aggregated booking counts for the admin dashboard:
+
+- booking_daily_stat:   bookings per (booking_date, service_type_id, status)
+- booking_status_total: bookings per status across all time
+
+Both are maintained incrementally from an after_flush listener, on the same
+connection and in the same transaction as the booking change itself, so the
+counts can never drift from a committed booking (a rollback undoes both).
+Writes that bypass the ORM (bulk seeding, set-based UPDATEs) pass their own
+deltas to apply_deltas(), and `flask rebuild-rollups` recomputes everything
+from the booking table for backfills or after manual SQL.
+"""
+
+from collections import Counter
+
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Booking attributes a rollup row is keyed on
+ROLLUP_ATTRS = ('booking_date', 'service_type_id', 'status')
+
+
+def _key(values):
+    return tuple(values[attr] for attr in ROLLUP_ATTRS)
+
+
+def booking_deltas(session, booking_cls):
+    """
+    Count changes implied by the pending flush of `session`.
+
+    Must run before the flush finishes (after_flush still sees the pre-flush
+    new/dirty/deleted sets and attribute history).
+
+    Returns:
+        Counter: {(booking_date, service_type_id, status): +/- count}
+    """
+    deltas = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, booking_cls):
+            deltas[_key({attr: getattr(obj, attr) for attr in ROLLUP_ATTRS})] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, booking_cls):
+            old = {}
+            for attr in ROLLUP_ATTRS:
+                history = inspect(obj).attrs[attr].history
+                old[attr] = history.deleted[0] if history.deleted else getattr(obj, attr)
+            deltas[_key(old)] -= 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, booking_cls) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[attr].history.has_changes() for attr in ROLLUP_ATTRS):
+            continue
+        old, new = {}, {}
+        for attr in ROLLUP_ATTRS:
+            history = state.attrs[attr].history
+            new[attr] = getattr(obj, attr)
+            old[attr] = history.deleted[0] if history.deleted else new[attr]
+        if old != new:
+            deltas[_key(old)] -= 1
+            deltas[_key(new)] += 1
+
+    return Counter({key: n for key, n in deltas.items() if n})
+
+
+def _upsert_increment(conn, table, key_columns, rows):
+    """
+    Add rows' booking_count onto existing rows, inserting missing ones.
+    Uses INSERT .. ON CONFLICT on SQLite/Postgres and UPDATE-then-INSERT elsewhere.
+    """
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = dialect_insert(table)
+        # One executemany round trip for all rows
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={'booking_count': table.c.booking_count + statement.excluded.booking_count},
+        ), rows)
+        return
+
+    for row in rows:
+        match = [table.c[column] == row[column] for column in key_columns]
+        result = conn.execute(update(table).where(*match)
+                              .values(booking_count=table.c.booking_count + row['booking_count']))
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(**row))
+
+
+def apply_deltas(conn, daily_table, totals_table, deltas):
+    """
+    Apply booking_deltas()-style counts to both rollup tables.
+
+    Args:
+        conn: Connection inside the transaction that made the booking changes
+        daily_table (Table): booking_daily_stat
+        totals_table (Table): booking_status_total
+        deltas (Counter): {(booking_date, service_type_id, status): +/- count}
+    """
+    if not deltas:
+        return
+
+    # Fixed row order so concurrent transactions lock rollup rows in the same order
+    daily_rows = [
+        {'booking_date': booking_date, 'service_type_id': service_type_id,
+         'status': status, 'booking_count': count}
+        for (booking_date, service_type_id, status), count in sorted(deltas.items(), key=repr)
+    ]
+    status_totals = Counter()
+    for (_, _, status), count in deltas.items():
+        status_totals[status] += count
+    total_rows = [{'status': status, 'booking_count': count}
+                  for status, count in sorted(status_totals.items(), key=repr) if count]
+
+    _upsert_increment(conn, daily_table, ROLLUP_ATTRS, daily_rows)
+    _upsert_increment(conn, totals_table, ('status',), total_rows)
+
+
+def rebuild_rollups(conn, booking_table, daily_table, totals_table):
+    """
+    Recompute both rollup tables from the booking table.
+
+    Returns:
+        int: Number of daily rollup rows written
+    """
+    conn.execute(delete(daily_table))
+    conn.execute(delete(totals_table))
+
+    grouped = (
+        select(booking_table.c.booking_date, booking_table.c.service_type_id,
+               booking_table.c.status, func.count())
+        .group_by(booking_table.c.booking_date, booking_table.c.service_type_id, booking_table.c.status)
+    )
+    result = conn.execute(insert(daily_table).from_select(
+        ['booking_date', 'service_type_id', 'status', 'booking_count'], grouped))
+    conn.execute(insert(totals_table).from_select(
+        ['status', 'booking_count'],
+        select(daily_table.c.status, func.sum(daily_table.c.booking_count)).group_by(daily_table.c.status),
+    ))
+    return result.rowcount
+
+
+def _ignore_set(target, value, oldvalue, initiator):
+    return value
+
+
+def track_booking_rollups(session_class, booking_cls, daily_table, totals_table):
+    """Keep the rollup tables in step with every ORM flush of `session_class`"""
+
+    # Without active history, assigning to an expired attribute (e.g. after a
+    # commit) records no old value and the change would look like a no-op
+    for attr in ROLLUP_ATTRS:
+        event.listen(getattr(booking_cls, attr), 'set', _ignore_set, active_history=True, retval=True)
+
+    @event.listens_for(session_class, 'after_flush')
+    def _update_rollups(session, flush_context):
+        deltas = booking_deltas(session, booking_cls)
+        if deltas:
+            conn = session.connection(bind_arguments={'mapper': booking_cls})
+            apply_deltas(conn, daily_table, totals_table, deltas)
@@ -0,0 +1,195 @@
+"""
+Customer Search
+===============
+
+Substring search over customer name, email, phone and address for the
+admin panel, backed by an index on each database:
+
+- SQLite:     an FTS5 table using the trigram tokenizer (user_search),
+              external content on the user table, kept in sync by triggers
+- PostgreSQL: a pg_trgm GIN index on the concatenated columns, which the
+              database maintains itself
+
+Both accelerate any substring of 3+ characters, so "smi", "mith", "gmail"
+and "0123" all hit the index. Every whitespace-separated term must match.
+Terms shorter than 3 characters can't use a trigram index and are matched
+as prefixes instead.
+
+Results come newest customer first rather than by relevance score: every
+match already contains every term, and ranking would score all of them
+(tens of ms for a common street name at 100k customers) where walking the
+index backwards stops after `limit` rows.
+
+The index is created together with the user table (db.create_all()). For an
+existing database run `flask rebuild-search-index`. If the database can't
+build it (pg_trgm not allowed for the app's role, an SQLite without FTS5 or
+the trigram tokenizer), create_all() still succeeds with a logged warning
+and searches fall back to unindexed, case-insensitive LIKE.
+"""
+
+import logging
+import re
+
+from sqlalchemy import DateTime, event, text
+from sqlalchemy.exc import DBAPIError
+
+SEARCH_COLUMNS = ('first_name', 'last_name', 'email', 'phone', 'address')
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Shortest term a trigram index can serve
+MIN_TRIGRAM_TERM = 3
+
+logger = logging.getLogger('amr.search')
+
+# Columns returned for every match
+_RESULT_COLUMNS = 'u.id, u.first_name, u.last_name, u.email, u.phone, u.address, u.created_at'
+
+
+def _pg_search_expression(alias=''):
+    """Postgres: the indexed expression; queries must use the same one to hit the index"""
+    return " || ' ' || ".join(f"coalesce({alias}{column}, '')" for column in SEARCH_COLUMNS)
+
+
+def _like_escape(term):
+    return re.sub(r'([\\%_])', r'\\\1', term)
+
+
+def _any_column_like(param):
+    """Any column containing the (lower-cased) pattern, ignoring case on every database"""
+    return '(' + ' OR '.join(f"lower(u.{column}) LIKE :{param} ESCAPE '\\'" for column in SEARCH_COLUMNS) + ')'
+
+
+def _like_pattern(term, prefix_only=False):
+    return ('' if prefix_only else '%') + _like_escape(term.lower()) + '%'
+
+
+# ========================================
+# INDEX DDL
+# ========================================
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(
+        {', '.join(SEARCH_COLUMNS)}, content='user', content_rowid='id', tokenize='trigram')""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_insert AFTER INSERT ON user BEGIN
+        INSERT INTO user_search(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + column for column in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_delete AFTER DELETE ON user BEGIN
+        INSERT INTO user_search(user_search, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + column for column in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_update
+        AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)} ON user BEGIN
+        INSERT INTO user_search(user_search, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + column for column in SEARCH_COLUMNS)});
+        INSERT INTO user_search(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + column for column in SEARCH_COLUMNS)});
+    END""",
+]
+
+_POSTGRES_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS ix_user_search_trgm ON "user" USING gin (({_pg_search_expression()}) gin_trgm_ops)',
+]
+
+
+def create_search_index(conn):
+    """Create the search index for the connection's dialect (no-op elsewhere)"""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        for statement in _SQLITE_DDL:
+            conn.execute(text(statement))
+    elif dialect == 'postgresql':
+        for statement in _POSTGRES_DDL:
+            conn.execute(text(statement))
+
+
+def rebuild_search_index(conn):
+    """Create the index if missing and (SQLite) refill it from the user table"""
+    create_search_index(conn)
+    if conn.dialect.name == 'sqlite':
+        conn.execute(text("INSERT INTO user_search(user_search) VALUES ('rebuild')"))
+
+
+def drop_search_index(conn):
+    if conn.dialect.name == 'sqlite':
+        # The triggers go with the user table; the FTS table would be left stale
+        conn.execute(text('DROP TABLE IF EXISTS user_search'))
+
+
+def _create_search_index_or_warn(connection):
+    """
+    create_search_index() in a SAVEPOINT, so a database that can't build the
+    index leaves the user table (and the rest of create_all) in place
+    """
+    try:
+        with connection.begin_nested():
+            create_search_index(connection)
+    except DBAPIError as e:
+        logger.warning('Customer search index not created, searching without it: %s', e)
+
+
+def _has_sqlite_index(conn):
+    found = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_search'"))
+    return found.first() is not None
+
+
+def track_customer_search(user_table):
+    """Create / drop the search index whenever metadata creates / drops `user_table`"""
+    event.listen(user_table, 'after_create', lambda target, connection, **kw: _create_search_index_or_warn(connection))
+    event.listen(user_table, 'before_drop', lambda target, connection, **kw: drop_search_index(connection))
+
+
+# ========================================
+# QUERIES
+# ========================================
+
+def search_customers(conn, query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Find non-admin customers matching every term of `query`.
+
+    Args:
+        conn: Connection to read from
+        query (str): Free text, e.g. "smith 0123" or "gmail"
+        limit (int): Most rows returned (newest customers first)
+
+    Returns:
+        list: Rows with id, first_name, last_name, email, phone, address, created_at
+    """
+    terms = query.split()
+    if not terms:
+        return []
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_TERM]
+    params = {'limit': limit}
+    conditions = ['u.is_admin = false']
+    for i, term in enumerate(term for term in terms if len(term) < MIN_TRIGRAM_TERM):
+        params[f'prefix_{i}'] = _like_pattern(term, prefix_only=True)
+        conditions.append(_any_column_like(f'prefix_{i}'))
+
+    dialect = conn.dialect.name
+    if long_terms and dialect == 'sqlite' and _has_sqlite_index(conn):
+        # Each term is a quoted FTS5 phrase; listing them ANDs them together
+        params['match'] = ' '.join('"' + term.replace('"', '""') + '"' for term in long_terms)
+        statement = (f'SELECT {_RESULT_COLUMNS} FROM user_search JOIN user u ON u.id = user_search.rowid '
+                     f'WHERE user_search MATCH :match AND {" AND ".join(conditions)} '
+                     f'ORDER BY user_search.rowid DESC LIMIT :limit')
+    elif long_terms and dialect == 'postgresql':
+        expression = _pg_search_expression('u.')
+        for i, term in enumerate(long_terms):
+            params[f'term_{i}'] = '%' + _like_escape(term) + '%'
+            conditions.append(f"({expression}) ILIKE :term_{i} ESCAPE '\\'")
+        statement = (f'SELECT {_RESULT_COLUMNS} FROM "user" u WHERE {" AND ".join(conditions)} '
+                     f'ORDER BY u.id DESC LIMIT :limit')
+    else:
+        # Short terms only, no index or another database: unindexed, but the
+        # scan stops as soon as `limit` matches are found
+        for i, term in enumerate(long_terms):
+            params[f'term_{i}'] = _like_pattern(term)
+            conditions.append(_any_column_like(f'term_{i}'))
+        user_table = '"user"' if dialect == 'postgresql' else 'user'
+        statement = (f'SELECT {_RESULT_COLUMNS} FROM {user_table} u WHERE {" AND ".join(conditions)} '
+                     f'ORDER BY u.id DESC LIMIT :limit')
+
+    return conn.execute(text(statement).columns(created_at=DateTime), params).all()
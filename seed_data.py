@@ -0,0 +1,301 @@
+"""
+Bulk Synthetic Data Seeding
+===========================
+
+Generates realistic customers, bookings, recurring schedules and photo records
+for capacity planning and benchmarks.
+
+Rows are written with batched Core INSERTs (executemany) in a single
+transaction instead of going through the ORM unit of work, so millions of
+rows load in minutes rather than hours. The booking rollups (rollups.py)
+are bumped by the generated counts in the same transaction. Existing data is left alone; the
+default service catalogue is only inserted when the table is empty.
+
+Generated bookings overlap freely, like a business with many crews. On a
+database with the overlap guard installed (intervals.py) a booking that
+would overlap an active one is skipped instead, so fewer are created.
+
+Used by the `flask seed-data` command and benchmarks/bench_hot_paths.py.
+"""
+
+import random
+import secrets
+from collections import Counter
+from datetime import datetime, date, time, timedelta
+
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+
+from app import (db, User, ServiceType, Booking, RecurringBooking, ServicePhoto,
+                 BookingDailyStat, BookingStatusTotal,
+                 DEFAULT_SERVICES, BUSINESS_HOURS, booking_end_time, get_current_eastern_date,
+                 service_block_minutes)
+from accounts import normalize_email
+from booking_status import status_code
+from intervals import booking_span, busy_spans, day_window, guard_installed, overlaps
+from rollups import apply_deltas
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+    'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+    'Thomas', 'Sarah', 'Carlos', 'Karen', 'Daniel', 'Lisa', 'Matthew', 'Nancy',
+    'Anthony', 'Betty', 'Mark', 'Sandra', 'Aisha', 'Ashley', 'Kevin', 'Priya',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+    'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor',
+    'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White', 'Harris',
+    'Clark', 'Lewis', 'Robinson', 'Walker', 'Patel', 'Young', 'Allen', 'King',
+]
+STREETS = [
+    'Oak', 'Maple', 'Pine', 'Cedar', 'Elm', 'Willow', 'Magnolia', 'Dogwood',
+    'Providence', 'Sharon', 'Park', 'Queens', 'Selwyn', 'Colony', 'Carmel', 'Rea',
+]
+STREET_TYPES = ['St', 'Ave', 'Rd', 'Dr', 'Ln', 'Ct', 'Way']
+CITIES = [
+    ('Charlotte', 'NC', '282'), ('Matthews', 'NC', '281'), ('Huntersville', 'NC', '280'),
+    ('Fort Mill', 'SC', '297'), ('Rock Hill', 'SC', '297'), ('Indian Land', 'SC', '297'),
+]
+CUSTOM_REQUESTS = [
+    'Remove old shrubs along the front walkway and replant',
+    'Install river rock border around the flower beds',
+    'Regrade a low spot in the back yard that holds water',
+    'Clear overgrown ivy from the fence line',
+    'Plant two crepe myrtles by the driveway',
+]
+
+# Status mix for past and upcoming appointments
+PAST_STATUSES = (['completed', 'cancelled', 'confirmed'], [85, 10, 5])
+FUTURE_STATUSES = (['confirmed', 'pending', 'cancelled'], [92, 3, 5])
+FUTURE_CUSTOM_STATUSES = (['pending', 'confirmed', 'cancelled'], [70, 25, 5])
+
+# Landscaping customers pick a day/week interval, pressure washing a special one
+LANDSCAPING_FREQUENCIES = [('7', 'days'), ('1', 'weeks'), ('2', 'weeks'), ('1', 'month')]
+PRESSURE_FREQUENCIES = [('6months', 'special'), ('12months', 'special')]
+
+
+def ensure_services(conn):
+    """
+    Insert DEFAULT_SERVICES if the service table is empty.
+
+    Returns:
+        list: Active services as dicts (id, category, duration_hours, is_custom)
+    """
+    table = ServiceType.__table__
+    if not conn.execute(select(func.count()).select_from(table)).scalar():
+        conn.execute(table.insert(), [dict(service, is_active=True) for service in DEFAULT_SERVICES])
+
+    rows = conn.execute(
+        select(table.c.id, table.c.category, table.c.duration_hours, table.c.is_custom)
+        .where(table.c.is_active.is_(True))
+        .order_by(table.c.id)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _start_slots(block_minutes):
+    """All 30-minute start times for which a booking still ends within business hours"""
+    slots = []
+    current = datetime.combine(date.today(), BUSINESS_HOURS['start'])
+    close = datetime.combine(date.today(), BUSINESS_HOURS['end'])
+    while current + timedelta(minutes=block_minutes) <= close:
+        slots.append(current.time())
+        current += timedelta(minutes=30)
+    return slots
+
+
+def _max_id(conn, table):
+    return conn.execute(select(func.max(table.c.id))).scalar() or 0
+
+
+def _flush(conn, table, rows):
+    if rows:
+        conn.execute(table.insert(), rows)
+        rows.clear()
+
+
+def seed_synthetic_data(users, bookings, recurring=0, photos=0, batch_size=5000, seed=None,
+                        history_days=730, horizon_days=90, password='password123', log=None):
+    """
+    Bulk-generate synthetic data in one transaction.
+
+    Bookings are spread over `history_days` of history and `horizon_days` of
+    upcoming appointments, with fewer jobs on Sundays and a skewed customer
+    distribution so a few long-time customers have hundreds of bookings.
+
+    Args:
+        users (int): Customers to create
+        bookings (int): Bookings to create across those customers
+        recurring (int): RecurringBooking schedules to create
+        photos (int): ServicePhoto records to attach to custom landscaping bookings
+        batch_size (int): Rows per executemany batch
+        seed (int): Random seed for reproducible datasets
+        password (str): Plain-text password shared by all generated customers
+        log (callable): Optional progress callback taking a message string
+
+    Returns:
+        dict: Number of rows created per table
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    if bookings and not users:
+        raise ValueError('Bookings need at least one user')
+
+    # Unique per run, so repeated seeding never collides on User.email
+    run_tag = secrets.token_hex(3) if seed is None else f'{seed:x}'
+    today = get_current_eastern_date()
+    first_day = today - timedelta(days=history_days)
+    span_days = history_days + horizon_days
+    now = datetime.utcnow()
+
+    # One KDF hash for everyone; hashing per row would dominate the run time
+    password_hash = generate_password_hash(password)
+
+    counts = {'users': 0, 'bookings': 0, 'recurring_bookings': 0, 'photos': 0}
+
+    with db.engine.begin() as conn:
+        services = ensure_services(conn)
+        block_minutes = {s['id']: service_block_minutes(s['duration_hours'], s['is_custom']) for s in services}
+        slots_by_service = {service_id: _start_slots(minutes) for service_id, minutes in block_minutes.items()}
+        custom_ids = {s['id'] for s in services if s['is_custom']}
+
+        # ---- Users ----
+        user_table = User.__table__
+        first_user_id = _max_id(conn, user_table)
+        rows = []
+        for i in range(users):
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            city, state, zip_prefix = rng.choice(CITIES)
+            email = f'{first_name.lower()}.{last_name.lower()}+{run_tag}.{i}@example.com'
+            rows.append({
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': email,
+                'email_normalized': normalize_email(email),
+                'phone': f'({rng.randint(700, 989)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}',
+                'address': (f'{rng.randint(100, 9999)} {rng.choice(STREETS)} {rng.choice(STREET_TYPES)}, '
+                            f'{city}, {state} {zip_prefix}{rng.randint(0, 99):02d}'),
+                'password_hash': password_hash,
+                'is_admin': False,
+                'created_at': now - timedelta(days=rng.randint(0, history_days), minutes=rng.randint(0, 1439)),
+            })
+            if len(rows) >= batch_size:
+                _flush(conn, user_table, rows)
+                log(f'  users: {i + 1}/{users}')
+        _flush(conn, user_table, rows)
+        counts['users'] = users
+
+        user_ids = conn.execute(
+            select(user_table.c.id).where(user_table.c.id > first_user_id).order_by(user_table.c.id)
+        ).scalars().all()
+
+        # ---- Bookings ----
+        booking_table = Booking.__table__
+        first_booking_id = _max_id(conn, booking_table)
+        rollup_deltas = Counter()
+        # Active intervals per date, only tracked when the guard would reject overlaps
+        occupied = {} if guard_installed(conn) else None
+        skipped = 0
+        for i in range(bookings):
+            service = rng.choice(services)
+            booking_date = first_day + timedelta(days=rng.randint(0, span_days))
+            if booking_date.weekday() == 6 and rng.random() < 0.7:
+                # Most Sunday jobs get moved to Monday
+                booking_date += timedelta(days=1)
+            start_time = rng.choice(slots_by_service[service['id']])
+            end_time = booking_end_time(booking_date, start_time, block_minutes[service['id']])
+
+            if booking_date < today:
+                statuses, weights = PAST_STATUSES
+            elif service['id'] in custom_ids:
+                statuses, weights = FUTURE_CUSTOM_STATUSES
+            else:
+                statuses, weights = FUTURE_STATUSES
+            created_at = (datetime.combine(booking_date, time(8, 0))
+                          - timedelta(days=rng.randint(1, 45), minutes=rng.randint(0, 1439)))
+
+            status = rng.choices(statuses, weights)[0]
+            span_start, span_end = booking_span(booking_date, start_time, end_time)
+            if occupied is not None and status != 'cancelled':
+                if booking_date not in occupied:
+                    occupied[booking_date] = busy_spans(conn, booking_table, *day_window(booking_date))
+                if overlaps(occupied[booking_date], span_start, span_end):
+                    skipped += 1
+                    continue
+                occupied[booking_date].append((span_start, span_end))
+            rollup_deltas[(booking_date, service['id'], status)] += 1
+            rows.append({
+                # Squaring skews toward low indexes: a few customers book a lot
+                'user_id': user_ids[int(len(user_ids) * rng.random() ** 2)],
+                'service_type_id': service['id'],
+                'booking_date': booking_date,
+                'start_time': start_time,
+                'end_time': end_time,
+                'span_start': span_start,
+                'span_end': span_end,
+                'status': status,
+                'status_code': status_code(status),
+                'custom_description': rng.choice(CUSTOM_REQUESTS) if service['id'] in custom_ids else None,
+                'admin_notes': None,
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+            if len(rows) >= batch_size:
+                _flush(conn, booking_table, rows)
+                log(f'  bookings: {i + 1}/{bookings}')
+        _flush(conn, booking_table, rows)
+        apply_deltas(conn, BookingDailyStat.__table__, BookingStatusTotal.__table__, rollup_deltas)
+        counts['bookings'] = bookings - skipped
+        if skipped:
+            log(f'  bookings: skipped {skipped} that would overlap an active booking')
+
+        # ---- Recurring schedules ----
+        recurring_table = RecurringBooking.__table__
+        for i in range(recurring if user_ids else 0):
+            service = rng.choice(services)
+            if service['category'] == 'landscaping':
+                frequency_value, frequency_type = rng.choice(LANDSCAPING_FREQUENCIES)
+            else:
+                frequency_value, frequency_type = rng.choice(PRESSURE_FREQUENCIES)
+            start_date = first_day + timedelta(days=rng.randint(0, span_days))
+            rows.append({
+                'user_id': rng.choice(user_ids),
+                'service_type_id': service['id'],
+                'frequency_value': frequency_value,
+                'frequency_type': frequency_type,
+                'start_date': start_date,
+                'next_due_date': max(start_date, today + timedelta(days=rng.randint(0, 60))),
+                'is_active': rng.random() < 0.85,
+                'created_at': datetime.combine(start_date, time(8, 0)) - timedelta(days=rng.randint(1, 14)),
+            })
+            if len(rows) >= batch_size:
+                _flush(conn, recurring_table, rows)
+        _flush(conn, recurring_table, rows)
+        counts['recurring_bookings'] = recurring if user_ids else 0
+
+        # ---- Photos (only custom landscaping requests carry photos) ----
+        if photos and custom_ids:
+            custom_bookings = conn.execute(
+                select(booking_table.c.id, booking_table.c.user_id, booking_table.c.created_at)
+                .where(booking_table.c.id > first_booking_id,
+                       booking_table.c.service_type_id.in_(custom_ids))
+            ).all()
+            photo_table = ServicePhoto.__table__
+            for i in range(photos if custom_bookings else 0):
+                booking_id, user_id, created_at = rng.choice(custom_bookings)
+                filename = f'{created_at.strftime("%Y%m%d_%H%M%S_")}seed_{run_tag}_{i}.jpg'
+                rows.append({
+                    'booking_id': booking_id,
+                    'user_id': user_id,
+                    'filename': filename,
+                    'original_filename': f'IMG_{rng.randint(1000, 9999)}.jpg',
+                    'file_path': f'static/uploads/{filename}',
+                    'created_at': created_at,
+                })
+                if len(rows) >= batch_size:
+                    _flush(conn, photo_table, rows)
+            _flush(conn, photo_table, rows)
+            counts['photos'] = photos if custom_bookings else 0
+
+    return counts
@@ -0,0 +1,342 @@
+"""
+Server-Side Sessions
+====================
+
+Keeps session data (the booking funnel's service, date, time and options,
+Flask-Login state, flashed messages) in a store on the server. The cookie
+only carries a random 43 character session id, so it no longer grows with
+the funnel and nothing has to be re-signed and re-sent on every request.
+
+Values are stored as a one byte format tag followed by Flask's tagged JSON
+(tuples, datetimes, bytes and Markup round-trip as with the cookie
+session), zlib compressed once it is larger than COMPRESS_THRESHOLD bytes.
+The tag byte leaves room for another encoding, but a binary one doesn't
+pay here: a logged-in funnel session is about 350 bytes either as tagged
+JSON or as a pickle, and encodes in about 50 us. Pickle would also run code
+from anyone able to write the store, marshal can't hold datetimes or
+Markup, and msgpack would be a new dependency that still needs Flask's
+tags on top.
+
+The store is only written when the session changed, or when more than half
+of its lifetime has passed so an active visitor's session doesn't expire.
+Expired rows are swept at most once every SESSION_SWEEP_SECONDS, from
+whichever request saves a session next. The session id is rotated on login
+and on logout, so a planted or leaked cookie doesn't carry over to the next
+user of the browser.
+
+Backends (SESSION_BACKEND):
+    sqlite    (default) a separate SQLite file, SESSION_SQLITE_PATH
+              [sessions.db in the instance folder]; shared by the workers
+              of one host
+    database  the application database; use this when workers run on
+              several hosts (e.g. PostgreSQL on Render)
+    cookie    Flask's signed cookie session, as before
+
+Environment (defaults in brackets):
+    SESSION_BACKEND        [sqlite]
+    SESSION_SQLITE_PATH    [sessions.db]
+    SESSION_TTL_SECONDS    [172800] lifetime of non-permanent sessions;
+                           permanent ones use PERMANENT_SESSION_LIFETIME
+    SESSION_SWEEP_SECONDS  [300]
+"""
+
+import logging
+import os
+import re
+import secrets
+import threading
+import time as time_module
+import zlib
+
+from flask import session as flask_session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from flask_login import user_logged_in, user_logged_out
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, String, Table, create_engine, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.datastructures import CallbackDict
+
+from database import install_sqlite_pragmas
+
+logger = logging.getLogger('amr.sessions')
+
+SESSION_BACKENDS = ('sqlite', 'database', 'cookie')
+
+# Blobs above this size are zlib compressed
+COMPRESS_THRESHOLD = 256
+
+_RAW = b'\x00'
+_ZLIB = b'\x01'
+
+# secrets.token_urlsafe(32): 256 random bits, always 43 characters
+_SESSION_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{43}')
+
+metadata = MetaData()
+
+session_table = Table(
+    'server_session', metadata,
+    Column('id', String(43), primary_key=True),
+    Column('data', LargeBinary, nullable=False),
+    Column('expires_at', Integer, nullable=False, index=True),
+)
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+# ========================================
+# SERIALIZATION
+# ========================================
+
+_serializer = TaggedJSONSerializer()
+
+
+def dumps(data):
+    """Session dict -> bytes"""
+    raw = _serializer.dumps(data).encode('utf-8')
+    if len(raw) > COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(raw)
+    return _RAW + raw
+
+
+def loads(blob):
+    """bytes from dumps() -> session dict"""
+    blob = bytes(blob)
+    tag, body = blob[:1], blob[1:]
+    if tag == _ZLIB:
+        body = zlib.decompress(body)
+    elif tag != _RAW:
+        raise ValueError(f'Unknown session format {tag!r}')
+    return _serializer.loads(body.decode('utf-8'))
+
+
+# ========================================
+# STORE
+# ========================================
+
+class SessionStore:
+    """Session rows in the server_session table of `engine`"""
+
+    def __init__(self, engine, sweep_seconds=300):
+        self.engine = engine
+        self.sweep_seconds = sweep_seconds
+        self._next_sweep = 0
+        self._table_ready = False
+        self._lock = threading.Lock()
+
+    def _ensure_table(self):
+        # Created on first use, so app startup doesn't touch the store
+        if not self._table_ready:
+            with self._lock:
+                if not self._table_ready:
+                    metadata.create_all(self.engine, tables=[session_table])
+                    self._table_ready = True
+
+    def load(self, session_id, now):
+        """
+        Returns:
+            tuple: (data dict, expires_at) or None if missing or expired
+        """
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(session_table.c.data, session_table.c.expires_at)
+                .where(session_table.c.id == session_id, session_table.c.expires_at > now)
+            ).first()
+        if row is None:
+            return None
+        try:
+            return loads(row.data), row.expires_at
+        except Exception as e:
+            logger.warning('Discarding unreadable session: %s', e)
+            return None
+
+    def save(self, session_id, blob, expires_at):
+        self._ensure_table()
+        values = {'id': session_id, 'data': blob, 'expires_at': expires_at}
+        dialect = self.engine.dialect.name
+        with self.engine.begin() as conn:
+            if dialect in ('sqlite', 'postgresql'):
+                dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+                statement = dialect_insert(session_table).values(**values)
+                conn.execute(statement.on_conflict_do_update(
+                    index_elements=['id'],
+                    set_={'data': statement.excluded.data, 'expires_at': statement.excluded.expires_at},
+                ))
+            else:
+                result = conn.execute(update(session_table).where(session_table.c.id == session_id)
+                                      .values(data=blob, expires_at=expires_at))
+                if result.rowcount == 0:
+                    conn.execute(insert(session_table).values(**values))
+
+    def delete(self, session_id):
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            conn.execute(delete(session_table).where(session_table.c.id == session_id))
+
+    def sweep(self, now):
+        """
+        Delete expired sessions.
+
+        Returns:
+            int: Number of sessions removed
+        """
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            return conn.execute(delete(session_table).where(session_table.c.expires_at <= now)).rowcount
+
+    def maybe_sweep(self, now):
+        """sweep() if the last one was more than sweep_seconds ago"""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_seconds
+        try:
+            removed = self.sweep(now)
+            if removed:
+                logger.info('Swept %d expired sessions', removed)
+        except Exception as e:
+            logger.warning('Session sweep failed: %s', e)
+
+
+# ========================================
+# FLASK INTEGRATION
+# ========================================
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and when its row expires"""
+
+    def __init__(self, initial=None, session_id=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.session_id = session_id
+        self.expires_at = expires_at
+        self.new = session_id is None
+        self.modified = False
+        self.accessed = False
+        # Set on login and logout: the data moves to a fresh id so a planted cookie is useless
+        self.rotate = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by a SessionStore"""
+
+    def __init__(self, store, ttl_seconds):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+
+    def _lifetime(self, app, session):
+        if session.permanent:
+            return int(app.permanent_session_lifetime.total_seconds())
+        return self.ttl_seconds
+
+    def open_session(self, app, request):
+        session_id = request.cookies.get(self.get_cookie_name(app))
+        if session_id and _SESSION_ID_PATTERN.fullmatch(session_id):
+            record = self.store.load(session_id, int(time_module.time()))
+            if record is not None:
+                data, expires_at = record
+                return ServerSideSession(data, session_id, expires_at)
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        now = int(time_module.time())
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            # Emptied (e.g. logout after a finished booking): drop the row and the cookie
+            if session.session_id is not None and session.modified:
+                self.store.delete(session.session_id)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       httponly=self.get_cookie_httponly(app),
+                                       samesite=self.get_cookie_samesite(app))
+            return
+
+        lifetime = self._lifetime(app, session)
+        refresh_due = session.expires_at is not None and session.expires_at - now < lifetime // 2
+        if not (session.new or session.modified or refresh_due):
+            return
+
+        if session.rotate and session.session_id is not None:
+            self.store.delete(session.session_id)
+            session.session_id = None
+        if session.session_id is None:
+            session.session_id = secrets.token_urlsafe(32)
+        self.store.save(session.session_id, dumps(dict(session)), now + lifetime)
+        self.store.maybe_sweep(now)
+
+        response.set_cookie(
+            name,
+            session.session_id,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def _rotate_session_id(sender, user, **extra):
+    if isinstance(flask_session._get_current_object(), ServerSideSession):
+        flask_session.rotate = True
+
+
+def _resolve_path(path, app):
+    return path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+
+
+def init_sessions(app, db):
+    """
+    Install the session interface chosen by SESSION_BACKEND.
+
+    Returns:
+        SessionStore: The store, or None for the cookie backend
+    """
+    app.config.setdefault('SESSION_BACKEND', os.environ.get('SESSION_BACKEND', 'sqlite'))
+    app.config.setdefault('SESSION_SQLITE_PATH', os.environ.get('SESSION_SQLITE_PATH', 'sessions.db'))
+    app.config.setdefault('SESSION_TTL_SECONDS', _env_int('SESSION_TTL_SECONDS', 2 * 24 * 3600))
+    app.config.setdefault('SESSION_SWEEP_SECONDS', _env_int('SESSION_SWEEP_SECONDS', 300))
+
+    backend = app.config['SESSION_BACKEND']
+    if backend not in SESSION_BACKENDS:
+        raise RuntimeError(f'SESSION_BACKEND must be one of: {", ".join(SESSION_BACKENDS)}')
+    if backend == 'cookie':
+        return None
+
+    if backend == 'database':
+        with app.app_context():
+            engine = db.engine
+    else:
+        path = _resolve_path(app.config['SESSION_SQLITE_PATH'], app)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        engine = create_engine(f'sqlite:///{path}')
+        install_sqlite_pragmas(engine)
+
+    store = SessionStore(engine, app.config['SESSION_SWEEP_SECONDS'])
+    app.session_interface = ServerSideSessionInterface(store, app.config['SESSION_TTL_SECONDS'])
+    user_logged_in.connect(_rotate_session_id, app)
+    user_logged_out.connect(_rotate_session_id, app)
+    app.extensions['amr_sessions'] = store
+    return store
@@ -0,0 +1,143 @@
+"""
+Background Tasks
+================
+
+Side effects a customer shouldn't wait for (the booking confirmation email)
+run on worker threads once the request has committed, instead of inside it.
+
+Tasks run in their own app context after the request's session is gone, so
+they take ids and reload what they need rather than ORM objects.
+
+Modes (TASKS_MODE):
+    thread  (default) TASKS_WORKERS daemon threads per process fed by a
+            bounded queue; work still queued at exit is drained for up to
+            TASKS_DRAIN_SECONDS
+    inline  run immediately inside the request, as before (debugging)
+
+Environment (defaults in brackets):
+    TASKS_MODE           [thread]
+    TASKS_WORKERS        [2]
+    TASKS_DRAIN_SECONDS  [10]
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time as time_module
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger('amr.tasks')
+
+TASK_QUEUE_SIZE = 1000
+
+
+def _task_name(func):
+    return getattr(func, '__name__', repr(func))
+
+
+class TaskQueue:
+    """Runs submitted callables on a few worker threads, each in an app context"""
+
+    def __init__(self, app, workers=2, maxsize=TASK_QUEUE_SIZE):
+        self.app = app
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        self._start()
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+        except queue.Full:
+            # Better a slow request than a lost confirmation email
+            logger.warning('Task queue full, running %s in the request', _task_name(func))
+            self._run(func, args, kwargs)
+
+    def _start(self):
+        # Threads start with the first task, keeping them off the startup path
+        if len(self._threads) < self.workers:
+            with self._lock:
+                while len(self._threads) < self.workers:
+                    thread = threading.Thread(target=self._work, name=f'amr-tasks-{len(self._threads)}',
+                                              daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            try:
+                self._run(func, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, func, args, kwargs):
+        with self.app.app_context():
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception('Background task %s failed', _task_name(func))
+
+    def join(self, timeout=None):
+        """
+        Wait for queued tasks to finish.
+
+        Returns:
+            bool: True if the queue drained within `timeout` seconds
+        """
+        deadline = None if timeout is None else time_module.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time_module.monotonic() >= deadline:
+                logger.warning('%d background tasks still pending', self._queue.unfinished_tasks)
+                return False
+            time_module.sleep(0.01)
+        return True
+
+
+class InlineTasks:
+    """TASKS_MODE=inline: run every task immediately"""
+
+    def submit(self, func, *args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception('Task %s failed', _task_name(func))
+
+    def join(self, timeout=None):
+        return True
+
+
+def defer(func, *args, **kwargs):
+    """
+    Run `func(*args, **kwargs)` in the background. Call only after the data
+    it reads is committed. Runs inline when no task queue is set up.
+    """
+    tasks = current_app.extensions.get('amr_tasks') if has_app_context() else None
+    if tasks is None:
+        func(*args, **kwargs)
+    else:
+        tasks.submit(func, *args, **kwargs)
+
+
+def init_tasks(app):
+    """
+    Create the app's task runner from TASKS_MODE.
+
+    Returns:
+        TaskQueue | InlineTasks
+    """
+    app.config.setdefault('TASKS_MODE', os.environ.get('TASKS_MODE', 'thread'))
+    app.config.setdefault('TASKS_WORKERS', int(os.environ.get('TASKS_WORKERS', 2)))
+    app.config.setdefault('TASKS_DRAIN_SECONDS', int(os.environ.get('TASKS_DRAIN_SECONDS', 10)))
+
+    if app.config['TASKS_MODE'] == 'inline':
+        tasks = InlineTasks()
+    else:
+        tasks = TaskQueue(app, workers=app.config['TASKS_WORKERS'])
+        atexit.register(tasks.join, app.config['TASKS_DRAIN_SECONDS'])
+    app.extensions['amr_tasks'] = tasks
+    return tasks
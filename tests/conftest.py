@@ -0,0 +1,54 @@
+"""
+Shared fixtures: an app on a throwaway SQLite database, reset per test.
+
+DATABASE_URL and SESSION_SQLITE_PATH point at a temporary directory before
+app.py is imported, so nothing here touches instance/amr_bookings.db.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMP_DIR = tempfile.TemporaryDirectory(prefix='amr-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEMP_DIR.name, 'test.db')
+os.environ['SESSION_SQLITE_PATH'] = os.path.join(TEMP_DIR.name, 'sessions.db')
+sys.path.insert(0, ROOT)
+
+import app as amr  # noqa: E402
+from intervals import install_interval_schema  # noqa: E402
+
+ADMIN_EMAIL = 'admin@amrservices.com'
+ADMIN_PASSWORD = 'admin123'
+
+
+@pytest.fixture(scope='session')
+def app():
+    return amr.create_app({'TESTING': True})
+
+
+@pytest.fixture
+def db(app):
+    """Fresh tables with the overlap guard, the default services and an admin"""
+    with app.app_context():
+        amr.db.drop_all()
+        amr.db.create_all()
+        with amr.db.engine.begin() as conn:
+            install_interval_schema(conn, amr.Booking.__table__)
+        amr.db.session.add_all(amr.ServiceType(**service) for service in amr.DEFAULT_SERVICES)
+        admin = amr.User(first_name='Admin', last_name='User', email=ADMIN_EMAIL, phone='555-0123', address='1 Admin St', is_admin=True)
+        admin.set_password(ADMIN_PASSWORD)
+        amr.db.session.add(admin)
+        amr.db.session.commit()
+        app.extensions['amr_calendar'].clear()
+        yield amr.db
+        amr.db.session.remove()
+
+
+@pytest.fixture
+def admin_client(app, db):
+    client = app.test_client()
+    client.post('/api/login', json={'email': ADMIN_EMAIL, 'password': ADMIN_PASSWORD})
+    return client
@@ -0,0 +1,144 @@
+from datetime import date, time
+
+from sqlalchemy import create_engine, inspect, text
+from werkzeug.security import generate_password_hash
+
+import app as amr
+from accounts import merge_duplicate_accounts, normalize_email, placeholder_password_hash, upsert_guest_customer
+from conftest import ADMIN_EMAIL
+
+
+def guest(email, first_name='Jane'):
+    return {
+        'first_name': first_name,
+        'last_name': 'Doe',
+        'email': email,
+        'email_normalized': normalize_email(email),
+        'phone': '555-0100',
+        'address': '1 Main St',
+        'password_hash': placeholder_password_hash('guest'),
+    }
+
+
+def upsert(values):
+    conn = amr.db.session.connection(bind_arguments={'mapper': amr.User})
+    return upsert_guest_customer(conn, amr.User.__table__, values)
+
+
+def test_normalize_email():
+    assert normalize_email('  Jane.Doe@Example.COM ') == 'jane.doe@example.com'
+    assert normalize_email(None) == ''
+
+
+def test_upsert_guest_customer_folds_case(db):
+    first = upsert(guest('Jane@Example.com'))
+    again = upsert(guest(' jane@EXAMPLE.com ', first_name='Janet'))
+    amr.db.session.commit()
+
+    assert again == first
+    users = amr.User.query.filter_by(email_normalized='jane@example.com').all()
+    assert len(users) == 1
+    # The existing account is returned as is, not overwritten by the guest form
+    assert users[0].first_name == 'Jane' and users[0].email == 'Jane@Example.com'
+
+
+def test_upsert_guest_customer_matches_registered_account(db):
+    admin_id = amr.User.query.filter_by(is_admin=True).one().id
+    assert upsert(guest('ADMIN@amrservices.com')) == admin_id
+
+
+def test_upsert_guest_customer_new_address(db):
+    first = upsert(guest('jane@example.com'))
+    other = upsert(guest('john@example.com'))
+    amr.db.session.commit()
+    assert other != first
+    assert amr.User.query.count() == 3
+
+
+def legacy_accounts(path):
+    """A pre-migration database: no email_normalized, case-only duplicates"""
+    engine = create_engine(f'sqlite:///{path}')
+    own = generate_password_hash('own-password')
+    placeholder = generate_password_hash(amr.GUEST_PLACEHOLDER_PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE "user" (id INTEGER PRIMARY KEY, email VARCHAR(120), '
+                          'is_admin BOOLEAN, password_hash VARCHAR(200))'))
+        conn.execute(text('CREATE TABLE booking (id INTEGER PRIMARY KEY, user_id INTEGER, updated_at DATETIME)'))
+        for table in ('recurring_booking', 'service_photo'):
+            conn.execute(text(f'CREATE TABLE {table} (id INTEGER PRIMARY KEY, user_id INTEGER)'))
+        conn.execute(text('INSERT INTO "user" VALUES (:id, :email, :is_admin, :password_hash)'), [
+            {'id': 1, 'email': 'Jane@Example.com', 'is_admin': False, 'password_hash': placeholder},
+            {'id': 2, 'email': ' jane@example.com', 'is_admin': False, 'password_hash': own},
+            {'id': 3, 'email': 'JANE@EXAMPLE.COM ', 'is_admin': False, 'password_hash': placeholder},
+            {'id': 4, 'email': 'boss@example.com', 'is_admin': False, 'password_hash': own},
+            {'id': 5, 'email': 'Boss@Example.com', 'is_admin': True, 'password_hash': own},
+            {'id': 6, 'email': 'solo@example.com', 'is_admin': False, 'password_hash': placeholder},
+        ])
+        conn.execute(text('INSERT INTO booking (id, user_id) VALUES (:id, :user_id)'),
+                     [{'id': 1, 'user_id': 1}, {'id': 2, 'user_id': 3}, {'id': 3, 'user_id': 4},
+                      {'id': 4, 'user_id': 6}])
+        conn.execute(text('INSERT INTO recurring_booking VALUES (1, 3)'))
+        conn.execute(text('INSERT INTO service_photo VALUES (1, 1)'))
+    return engine
+
+
+def merge(conn, dry_run=False):
+    return merge_duplicate_accounts(
+        conn, amr.User.__table__,
+        [amr.Booking.__table__, amr.RecurringBooking.__table__, amr.ServicePhoto.__table__],
+        amr.GUEST_PLACEHOLDER_PASSWORD, dry_run=dry_run,
+    )
+
+
+def test_merge_duplicate_accounts(tmp_path):
+    engine = legacy_accounts(tmp_path / 'legacy.db')
+    with engine.begin() as conn:
+        assert merge(conn, dry_run=True) == {'groups': 2, 'merged': 3}
+        assert conn.execute(text('SELECT count(*) FROM "user"')).scalar() == 6
+        assert merge(conn) == {'groups': 2, 'merged': 3}
+
+    with engine.connect() as conn:
+        # The account with its own password beats older guest accounts; an admin beats both
+        assert conn.execute(text('SELECT id, email_normalized FROM "user" ORDER BY id')).all() == [
+            (2, 'jane@example.com'), (5, 'boss@example.com'), (6, 'solo@example.com')]
+        assert conn.execute(text('SELECT id, user_id FROM booking ORDER BY id')).all() == [
+            (1, 2), (2, 2), (3, 5), (4, 6)]
+        assert conn.execute(text('SELECT user_id FROM recurring_booking')).scalar() == 2
+        assert conn.execute(text('SELECT user_id FROM service_photo')).scalar() == 2
+        indexes = {index['name']: index for index in inspect(conn).get_indexes('user')}
+        assert indexes['ix_user_email_normalized']['column_names'] == ['email_normalized']
+        assert indexes['ix_user_email_normalized']['unique']
+
+    # Running it again finds nothing to do
+    with engine.begin() as conn:
+        assert merge(conn) == {'groups': 0, 'merged': 0}
+        assert conn.execute(text('SELECT count(*) FROM "user"')).scalar() == 3
+
+
+def test_normalize_emails_command(app, db):
+    # An account left over from before the unique index, differing only in case
+    amr.db.session.execute(text('DROP INDEX ix_user_email_normalized'))
+    duplicate = amr.User(first_name='Admin', last_name='Copy', email='Admin@AMRServices.com ',
+                         email_normalized='pending', phone='555-0100', address='1 Main St')
+    duplicate.set_password(amr.GUEST_PLACEHOLDER_PASSWORD)
+    amr.db.session.add(duplicate)
+    amr.db.session.flush()
+    amr.db.session.add(amr.Booking(user_id=duplicate.id, service_type_id=1, booking_date=date(2026, 6, 2),
+                                   start_time=time(9), end_time=time(11)))
+    amr.db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['normalize-emails', '--dry-run'])
+    assert result.exit_code == 0 and 'Would merge 1 accounts in 1 duplicate groups' in result.output
+    assert amr.User.query.count() == 2
+
+    result = runner.invoke(args=['normalize-emails'])
+    assert result.exit_code == 0 and 'Merged 1 accounts in 1 duplicate groups' in result.output
+    amr.db.session.expire_all()
+    admin = amr.User.query.one()
+    assert admin.is_admin and admin.email_normalized == ADMIN_EMAIL
+    assert [booking.user_id for booking in amr.Booking.query.all()] == [admin.id]
+    assert 'ix_user_email_normalized' in {index['name'] for index in inspect(amr.db.engine).get_indexes('user')}
+
+    result = runner.invoke(args=['normalize-emails'])
+    assert result.exit_code == 0 and 'Merged 0 accounts in 0 duplicate groups' in result.output
@@ -0,0 +1,86 @@
+from datetime import date, time, timedelta
+
+from sqlalchemy import event
+
+import app as amr
+
+
+def add_customer(email, bookings):
+    customer = amr.User(first_name='Jane', last_name='Doe', email=email, phone='555-0100', address='1 Main St')
+    customer.set_password('secret')
+    amr.db.session.add(customer)
+    amr.db.session.flush()
+    for hour, (booking_date, status) in enumerate(bookings, start=8):
+        amr.db.session.add(amr.Booking(user_id=customer.id, service_type_id=1, booking_date=booking_date,
+                                       start_time=time(hour), end_time=time(hour + 1), status=status))
+    amr.db.session.commit()
+    return customer.id
+
+
+def count_queries(app, request):
+    statements = []
+
+    def count(*args):
+        statements.append(args)
+
+    with app.app_context():
+        engine = amr.db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return response, len(statements)
+
+
+def test_customers_totals(admin_client, db):
+    busy = add_customer('busy@example.com', [(date(2026, 3, 1), 'completed'), (date(2026, 5, 1), 'completed'),
+                                             (date(2026, 4, 1), 'cancelled')])
+    idle = add_customer('idle@example.com', [])
+
+    response = admin_client.get('/api/admin/customers')
+
+    customers = {customer['id']: customer for customer in response.get_json()['customers']}
+    assert customers[busy]['total_bookings'] == 3
+    assert customers[busy]['completed_bookings'] == 2
+    assert customers[busy]['last_booking'] == '2026-05-01'
+    assert (customers[idle]['total_bookings'], customers[idle]['last_booking']) == (0, None)
+
+
+def test_admin_lists_take_constant_queries(app, admin_client, db):
+    today = amr.get_current_eastern_date()
+    for n in range(2):
+        add_customer(f'first{n}@example.com', [(today + timedelta(days=n), 'pending')])
+    _, few = count_queries(app, lambda: admin_client.get('/api/admin/dashboard'))
+    _, few_customers = count_queries(app, lambda: admin_client.get('/api/admin/customers'))
+    for n in range(8):
+        add_customer(f'more{n}@example.com', [(today + timedelta(days=n + 2), 'pending')])
+    response, many = count_queries(app, lambda: admin_client.get('/api/admin/dashboard'))
+    _, many_customers = count_queries(app, lambda: admin_client.get('/api/admin/customers'))
+
+    assert len(response.get_json()['data']['pending_bookings']) == 10
+    assert many == few
+    assert many_customers == few_customers
+
+
+def test_bulk_status_rejects_non_string_notes(admin_client, db):
+    day = date(2026, 6, 2)
+    customer_id = add_customer('jane@example.com', [(day, 'pending'), (day, 'pending'), (day, 'pending')])
+    ids = [booking.id for booking in amr.Booking.query.filter_by(user_id=customer_id).order_by(amr.Booking.id)]
+
+    response = admin_client.post('/api/admin/bookings/status', json={'updates': [
+        {'id': ids[0], 'status': 'confirmed', 'admin_notes': ['call first']},
+        {'id': ids[1], 'status': 'confirmed', 'admin_notes': {'note': 'gate code'}},
+        {'id': ids[2], 'status': 'confirmed', 'admin_notes': 'gate code 1234'},
+    ]})
+
+    assert response.status_code == 200
+    assert response.get_json()['results'] == [
+        {'id': ids[0], 'success': False, 'message': 'admin_notes must be a string'},
+        {'id': ids[1], 'success': False, 'message': 'admin_notes must be a string'},
+        {'id': ids[2], 'success': True, 'status': 'confirmed'},
+    ]
+    amr.db.session.expire_all()
+    bookings = [amr.db.session.get(amr.Booking, booking_id) for booking_id in ids]
+    assert [(booking.status, booking.admin_notes) for booking in bookings] == [
+        ('pending', None), ('pending', None), ('confirmed', 'gate code 1234')]
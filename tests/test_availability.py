@@ -0,0 +1,190 @@
+from datetime import date, time, timedelta
+
+import pytest
+from flask import url_for
+
+import app as amr
+from availability import CELLS_PER_DAY, SLOT_MINUTES, next_open_slots, open_slots, run_starts, slots_by_day
+from business_calendar import CLOSED, hours_mask
+from intervals import booking_span, day_window
+
+DAY = date(2026, 6, 2)
+NINE_TO_FIVE = hours_mask(9 * 60, 17 * 60)
+WHOLE_DAY = hours_mask(0, 24 * 60)
+
+
+def span(day, start, end):
+    return booking_span(day, start, end)
+
+
+def test_run_starts():
+    assert run_starts(0b111, 1) == 0b111
+    assert run_starts(0b111, 3) == 0b001
+    assert run_starts(0b111, 4) == 0
+    assert run_starts(0b1101111, 3) == 0b11
+    assert run_starts(0, 2) == 0
+
+
+def test_run_starts_at_end_of_day():
+    last_two = 0b11 << (CELLS_PER_DAY - 2)
+    assert run_starts(last_two, 2) == 1 << (CELLS_PER_DAY - 2)
+    assert run_starts(last_two, 3) == 0
+
+
+def test_open_slots_within_hours():
+    slots = open_slots(DAY, time(0), NINE_TO_FIVE, 120, [])
+    assert slots[0] == time(9) and slots[-1] == time(15)
+    assert len(slots) == (17 - 9) * 60 // SLOT_MINUTES - 120 // SLOT_MINUTES + 1
+
+
+def test_open_slots_block_longer_than_window():
+    assert open_slots(DAY, time(0), hours_mask(9 * 60, 11 * 60), 150, []) == []
+    assert open_slots(DAY, time(0), hours_mask(9 * 60, 11 * 60), 120, []) == [time(9)]
+
+
+def test_open_slots_closed_day():
+    assert open_slots(DAY, time(0), CLOSED, 60, []) == []
+
+
+def test_open_slots_earliest_rounds_up():
+    slots = open_slots(DAY, time(9, 10), NINE_TO_FIVE, 60, [])
+    assert slots[0] == time(9, 30)
+
+
+def test_open_slots_booking_from_previous_day():
+    previous = DAY - timedelta(days=1)
+    busy = [span(previous, time(23), time(2))]
+    slots = open_slots(DAY, time(0), WHOLE_DAY, 60, busy)
+    assert slots[0] == time(2)
+
+
+def test_open_slots_booking_into_next_day():
+    busy = [span(DAY, time(23), time(2))]
+    slots = open_slots(DAY, time(0), WHOLE_DAY, 60, busy)
+    assert slots[-1] == time(22)
+
+
+def test_open_slots_capacity():
+    busy = [span(DAY, time(10), time(12))]
+    assert time(10) not in open_slots(DAY, time(0), NINE_TO_FIVE, 60, busy, capacity=1)
+    assert time(10) in open_slots(DAY, time(0), NINE_TO_FIVE, 60, busy, capacity=2)
+    busy.append(span(DAY, time(11), time(13)))
+    slots = open_slots(DAY, time(0), NINE_TO_FIVE, 60, busy, capacity=2)
+    assert time(10) in slots and time(11) not in slots and time(12) in slots
+    assert open_slots(DAY, time(0), NINE_TO_FIVE, 60, [], capacity=0) == []
+
+
+def test_slots_by_day_matches_open_slots():
+    last = DAY + timedelta(days=2)
+    busy = sorted([span(DAY, time(23), time(3)), span(DAY + timedelta(days=2), time(9), time(10))])
+    result = slots_by_day(DAY, last, lambda day: time(0), {day: WHOLE_DAY for day in _days(DAY, last)}, 60, busy)
+    for day in _days(DAY, last):
+        start, end = day_window(day)
+        overlapping = [interval for interval in busy if interval[0] < end and interval[1] > start]
+        assert result[day] == open_slots(day, time(0), WHOLE_DAY, 60, overlapping)
+
+
+def test_next_open_slots_finds_short_day_with_bookings_outside_hours():
+    # A 09:00-11:00 day whose one booking is outside those hours still has room
+    hours = {DAY: hours_mask(9 * 60, 11 * 60), DAY + timedelta(days=1): NINE_TO_FIVE}
+    busy = [span(DAY, time(12), time(20))]
+    found = next_open_slots(DAY, DAY + timedelta(days=1), lambda day: time(0), hours, 120,
+                            lambda first, last: busy, limit=1)
+    assert found == [(DAY, time(9))]
+
+
+def test_next_open_slots_skips_closed_and_short_days():
+    hours = {DAY: CLOSED, DAY + timedelta(days=1): hours_mask(9 * 60, 10 * 60),
+             DAY + timedelta(days=2): NINE_TO_FIVE}
+    fetched = []
+
+    def busy_between(first, last):
+        fetched.append((first, last))
+        return []
+
+    found = next_open_slots(DAY, DAY + timedelta(days=2), lambda day: time(0), hours, 120, busy_between, limit=2)
+    assert found == [(DAY + timedelta(days=2), time(9)), (DAY + timedelta(days=2), time(9, 30))]
+    assert fetched == [(DAY + timedelta(days=2), DAY + timedelta(days=2))]
+
+
+@pytest.fixture
+def week(db):
+    first = amr.get_current_eastern_date() + timedelta(days=7)
+    return first, first + timedelta(days=6)
+
+
+def get_availability(client, headers=None, **params):
+    return client.get('/api/availability', query_string={'service_id': 1, **params}, headers=headers)
+
+
+def test_availability_response(app, week):
+    first, last = week
+    response = get_availability(app.test_client(), **{'from': first.isoformat(), 'to': last.isoformat()})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache' and response.headers['ETag']
+
+    body = response.get_json()
+    assert body['success'] and body['from'] == first.isoformat() and body['to'] == last.isoformat()
+    assert body['service'] == {'id': 1, 'name': 'Standard Lawn Service', 'category': 'landscaping',
+                               'duration_hours': 1.5}
+    assert [day['date'] for day in body['days']] == [day.isoformat() for day in _days(first, last)]
+    for day in body['days']:
+        assert day['available'] == bool(day['slots'])
+        assert day['slots'] == sorted(day['slots'])
+    assert body['days'][0]['slots'][0] == '06:00' and '18:30' in body['days'][0]['slots']
+
+
+def test_availability_default_range(app, db):
+    body = get_availability(app.test_client()).get_json()
+    today = amr.get_current_eastern_date()
+    assert body['from'] == today.isoformat() and body['to'] == (today + timedelta(days=6)).isoformat()
+    assert len(body['days']) == 7
+
+
+def test_availability_from_to_as_built_by_time_selection(app, week):
+    # time_selection.html passes the reserved word `from` through url_for(**{...})
+    day = week[0]
+    with app.test_request_context():
+        url = url_for('main.api_availability', service_id=1, **{'from': day.isoformat(), 'to': day.isoformat()})
+    assert f'from={day.isoformat()}' in url and f'to={day.isoformat()}' in url
+    body = app.test_client().get(url).get_json()
+    assert [entry['date'] for entry in body['days']] == [day.isoformat()]
+
+
+def test_availability_not_modified_until_a_booking(app, week):
+    client = app.test_client()
+    day = week[0].isoformat()
+    first = get_availability(client, **{'from': day, 'to': day})
+    etag = first.headers['ETag']
+
+    again = get_availability(client, headers={'If-None-Match': etag}, **{'from': day, 'to': day})
+    assert again.status_code == 304 and again.get_data() == b''
+
+    amr.db.session.add(amr.Booking(user_id=1, service_type_id=1, booking_date=week[0], start_time=time(6),
+                                   end_time=time(7, 30), status='confirmed'))
+    amr.db.session.commit()
+    changed = get_availability(client, headers={'If-None-Match': etag}, **{'from': day, 'to': day})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert '06:00' not in changed.get_json()['days'][0]['slots']
+
+
+def test_availability_rejects_bad_ranges(app, week):
+    client = app.test_client()
+    first, last = week
+    inverted = get_availability(client, **{'from': last.isoformat(), 'to': first.isoformat()})
+    assert inverted.status_code == 400 and inverted.get_json()['message'] == 'to must not be before from'
+
+    too_long = first + timedelta(days=amr.MAX_AVAILABILITY_RANGE_DAYS)
+    response = get_availability(client, **{'from': first.isoformat(), 'to': too_long.isoformat()})
+    assert response.status_code == 400
+    longest = too_long - timedelta(days=1)
+    assert get_availability(client, **{'from': first.isoformat(), 'to': longest.isoformat()}).status_code == 200
+
+    assert get_availability(client, **{'from': '2026-13-01'}).status_code == 400
+    assert client.get('/api/availability?service_id=999').status_code == 404
+
+
+def _days(first, last):
+    while first <= last:
+        yield first
+        first += timedelta(days=1)
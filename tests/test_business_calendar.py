@@ -0,0 +1,156 @@
+from datetime import date, timedelta
+
+import pytest
+
+import app as amr
+import business_calendar
+from availability import SLOT_MINUTES
+from business_calendar import CLOSED, BusinessCalendar, CalendarRules, hours_mask
+
+MONDAY = date(2026, 6, 1)
+NINE_TO_FIVE = hours_mask(9 * 60, 17 * 60)
+SIX_TO_EIGHT = hours_mask(6 * 60, 20 * 60)
+
+
+def cells(mask):
+    """Start minute of every open cell"""
+    return [i * SLOT_MINUTES for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def test_hours_mask_rounds_inwards():
+    assert cells(hours_mask(9 * 60, 10 * 60)) == [9 * 60, 9 * 60 + 30]
+    # 08:15-10:45 only fully covers the cells from 08:30 to 10:00
+    assert cells(hours_mask(8 * 60 + 15, 10 * 60 + 45)) == [8 * 60 + 30, 9 * 60, 9 * 60 + 30, 10 * 60]
+    assert hours_mask(9 * 60 + 5, 9 * 60 + 25) == CLOSED
+    assert hours_mask(10 * 60, 9 * 60) == CLOSED
+
+
+def test_compile_precedence():
+    override = hours_mask(10 * 60, 12 * 60)
+    rules = CalendarRules(
+        default=SIX_TO_EIGHT,
+        weekly={0: NINE_TO_FIVE, 6: CLOSED},
+        overrides={MONDAY: override, MONDAY + timedelta(days=6): NINE_TO_FIVE,
+                   MONDAY + timedelta(days=2): SIX_TO_EIGHT},
+        blackouts=[(MONDAY + timedelta(days=2), MONDAY + timedelta(days=3))],
+    )
+    masks = rules.compile(MONDAY, MONDAY + timedelta(days=13))
+
+    assert masks[MONDAY] == override                          # override beats the weekly hours
+    assert masks[MONDAY + timedelta(days=7)] == NINE_TO_FIVE  # weekly template
+    assert masks[MONDAY + timedelta(days=1)] == SIX_TO_EIGHT  # default
+    assert masks[MONDAY + timedelta(days=6)] == NINE_TO_FIVE  # override opens a closed Sunday
+    assert masks[MONDAY + timedelta(days=13)] == CLOSED
+    # A blackout beats an override too
+    assert masks[MONDAY + timedelta(days=2)] == masks[MONDAY + timedelta(days=3)] == CLOSED
+    assert masks == {day: rules.mask(day) for day in masks}
+
+
+class Clock:
+    now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_calendar_reloads_after_ttl_clear_and_new_day(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(business_calendar, 'time_module', clock)
+    loads, today = [], [MONDAY]
+
+    def load():
+        loads.append(1)
+        return CalendarRules(default=NINE_TO_FIVE)
+
+    calendar = BusinessCalendar(load, lambda: today[0], horizon_days=14, ttl=60)
+    assert calendar.mask(MONDAY) == NINE_TO_FIVE
+    calendar.masks(MONDAY, MONDAY + timedelta(days=30))
+    clock.now += 59
+    calendar.mask(MONDAY)
+    assert len(loads) == 1
+
+    clock.now += 2
+    calendar.mask(MONDAY)
+    assert len(loads) == 2
+    calendar.clear()
+    calendar.mask(MONDAY)
+    assert len(loads) == 3
+    today[0] += timedelta(days=1)
+    calendar.mask(MONDAY)
+    assert len(loads) == 4
+
+
+# ========================================
+# ADMIN ENDPOINTS
+# ========================================
+
+@pytest.fixture
+def day(db):
+    return amr.get_current_eastern_date() + timedelta(days=10)
+
+
+def slots(client, day):
+    body = client.get('/api/availability', query_string={
+        'service_id': 1, 'from': day.isoformat(), 'to': day.isoformat()}).get_json()
+    return body['days'][0]['slots']
+
+
+def test_rules_listing(admin_client, day):
+    body = admin_client.get('/api/admin/business-hours').get_json()
+    assert body['weekly'][0] == {'weekday': 0, 'open': '06:00', 'close': '20:00', 'closed': False}
+    assert body['overrides'] == [] and body['blackouts'] == []
+
+    admin_client.post('/api/admin/business-hours/weekly', json={'weekday': 2, 'closed': True})
+    admin_client.post('/api/admin/business-hours/overrides',
+                      json={'date': day.isoformat(), 'open': '08:15', 'close': '12:45', 'note': 'Short day'})
+    body = admin_client.get('/api/admin/business-hours').get_json()
+    assert body['weekly'][2] == {'weekday': 2, 'open': None, 'close': None, 'closed': True}
+    assert body['overrides'] == [{'date': day.isoformat(), 'open': '08:15', 'close': '12:45',
+                                  'closed': False, 'note': 'Short day'}]
+
+
+def test_weekly_hours_close_a_weekday(admin_client, day):
+    assert slots(admin_client, day)
+    response = admin_client.post('/api/admin/business-hours/weekly', json={'weekday': day.weekday(), 'closed': True})
+    assert response.status_code == 200
+    # The write cleared the cached calendar; no TTL wait
+    assert slots(admin_client, day) == []
+    assert slots(admin_client, day + timedelta(days=1))
+
+
+def test_override_beats_weekly_hours_and_rounds_inwards(admin_client, day):
+    admin_client.post('/api/admin/business-hours/weekly', json={'weekday': day.weekday(), 'closed': True})
+    admin_client.post('/api/admin/business-hours/overrides',
+                      json={'date': day.isoformat(), 'open': '08:15', 'close': '12:45'})
+    # A 1.5 hour service in the 08:30-12:30 cells
+    assert slots(admin_client, day) == ['08:30', '09:00', '09:30', '10:00', '10:30', '11:00']
+
+    assert admin_client.delete(f'/api/admin/business-hours/overrides/{day.isoformat()}').status_code == 200
+    assert slots(admin_client, day) == []
+    assert admin_client.delete(f'/api/admin/business-hours/overrides/{day.isoformat()}').status_code == 404
+
+
+def test_blackout_closes_days(admin_client, day):
+    admin_client.post('/api/admin/business-hours/overrides', json={'date': day.isoformat(), 'open': '08:00',
+                                                                   'close': '12:00'})
+    response = admin_client.post('/api/admin/business-hours/blackouts', json={
+        'start_date': day.isoformat(), 'end_date': (day + timedelta(days=1)).isoformat(), 'reason': 'Vacation'})
+    assert response.status_code == 201
+    blackout = response.get_json()['blackout']
+    assert slots(admin_client, day) == [] and slots(admin_client, day + timedelta(days=1)) == []
+    assert slots(admin_client, day + timedelta(days=2))
+
+    assert admin_client.delete(f"/api/admin/business-hours/blackouts/{blackout['id']}").status_code == 200
+    assert slots(admin_client, day)[0] == '08:00'
+    assert slots(admin_client, day + timedelta(days=1))
+
+
+def test_rule_validation(admin_client, day):
+    post = admin_client.post
+    assert post('/api/admin/business-hours/weekly', json={'weekday': 7, 'closed': True}).status_code == 400
+    assert post('/api/admin/business-hours/weekly', json={'weekday': True, 'closed': True}).status_code == 400
+    assert post('/api/admin/business-hours/weekly',
+                json={'weekday': 1, 'open': '12:00', 'close': '09:00'}).status_code == 400
+    assert post('/api/admin/business-hours/overrides', json={'date': 'soon', 'closed': True}).status_code == 400
+    assert post('/api/admin/business-hours/blackouts', json={
+        'start_date': day.isoformat(), 'end_date': (day - timedelta(days=1)).isoformat()}).status_code == 400
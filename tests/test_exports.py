@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time
+
+import app as amr
+
+
+def add_customer(email, first_name='Jane', created_at=None):
+    customer = amr.User(first_name=first_name, last_name='Doe', email=email, phone='555-0100',
+                        address='1 Main St', created_at=created_at)
+    customer.set_password('secret')
+    amr.db.session.add(customer)
+    amr.db.session.commit()
+    return customer
+
+
+def add_booking(customer, booking_date, start, status='confirmed', notes=None):
+    booking = amr.Booking(user_id=customer.id, service_type_id=1, booking_date=booking_date,
+                          start_time=start, end_time=time(start.hour + 1), status=status, admin_notes=notes)
+    amr.db.session.add(booking)
+    amr.db.session.commit()
+    return booking
+
+
+def export(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response
+
+
+def test_bookings_csv_in_time_order(admin_client, db):
+    customer = add_customer('jane@example.com')
+    late = add_booking(customer, date(2026, 6, 3), time(8))
+    evening = add_booking(customer, date(2026, 6, 2), time(15))
+    morning = add_booking(customer, date(2026, 6, 2), time(9), status='pending')
+    add_booking(customer, date(2026, 6, 1), time(9))
+    add_booking(customer, date(2026, 6, 4), time(9))
+
+    response = export(admin_client, '/api/admin/export/bookings?from=2026-06-02&to=2026-06-03')
+    assert response.content_type == 'text/csv; charset=utf-8'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row['booking_id']) for row in rows] == [morning.id, evening.id, late.id]
+    assert rows[0]['booking_date'] == '2026-06-02' and rows[0]['start_time'] == '09:00'
+    assert rows[0]['email'] == 'jane@example.com' and rows[0]['service_name']
+
+    response = export(admin_client, '/api/admin/export/bookings?from=2026-06-02&to=2026-06-03&status=pending')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row['booking_id']) for row in rows] == [morning.id]
+
+
+def test_bookings_ndjson(admin_client, db):
+    customer = add_customer('jane@example.com')
+    booking = add_booking(customer, date(2026, 6, 2), time(9), notes='=gate code')
+
+    response = export(admin_client, '/api/admin/export/bookings?format=ndjson')
+    assert response.content_type == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 1
+    row = json.loads(lines[0])
+    assert row['booking_id'] == booking.id and row['customer_id'] == customer.id
+    assert row['booking_date'] == '2026-06-02' and row['end_time'] == '10:00'
+    # Values are exported as they are; only CSV cells are escaped
+    assert row['admin_notes'] == '=gate code'
+
+
+def test_csv_escapes_formulas(admin_client, db):
+    customer = add_customer('jane@example.com', first_name='=HYPERLINK("http://example.com")')
+    add_booking(customer, date(2026, 6, 2), time(9), notes='-1+2')
+    add_booking(customer, date(2026, 6, 3), time(9), notes='@SUM(A1)')
+    add_booking(customer, date(2026, 6, 4), time(9), notes='call first')
+
+    response = export(admin_client, '/api/admin/export/bookings')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert {row['first_name'] for row in rows} == {'\'=HYPERLINK("http://example.com")'}
+    assert [row['admin_notes'] for row in rows] == ["'-1+2", "'@SUM(A1)", 'call first']
+
+
+def test_customers_signup_range(admin_client, db):
+    for n, created_at in enumerate([datetime(2025, 12, 31, 23, 30), datetime(2026, 1, 1),
+                                    datetime(2026, 1, 31, 23, 59, 59), datetime(2026, 2, 1)]):
+        customer = add_customer(f'customer{n}@example.com', created_at=created_at)
+        add_booking(customer, date(2026, 6, 1 + n), time(9), status='completed' if n % 2 else 'pending')
+
+    response = export(admin_client, '/api/admin/export/customers?format=ndjson&from=2026-01-01&to=2026-01-31')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['email'] for row in rows] == ['customer1@example.com', 'customer2@example.com']
+    assert [(row['total_bookings'], row['completed_bookings']) for row in rows] == [(1, 1), (1, 0)]
+
+    response = export(admin_client, '/api/admin/export/customers?from=2026-01-01&to=2026-01-31')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['email'] for row in rows] == ['customer1@example.com', 'customer2@example.com']
+
+
+def test_export_rejects_bad_arguments(admin_client, db):
+    assert admin_client.get('/api/admin/export/bookings?format=xlsx').status_code == 400
+    assert admin_client.get('/api/admin/export/bookings?from=2026-02-01&to=2026-01-01').status_code == 400
+    assert admin_client.get('/api/admin/export/invoices').status_code == 404
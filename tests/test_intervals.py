@@ -0,0 +1,160 @@
+from datetime import time, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.exc import IntegrityError
+
+import app as amr
+from booking_status import CANCELLED, COMPLETED, PENDING, STATUS_CODE_CHECK_NAME
+from intervals import booking_span, day_window, install_interval_schema, is_overlap_violation
+
+
+def add_booking(day, start, end, status='confirmed', service_type_id=1):
+    booking = amr.Booking(user_id=1, service_type_id=service_type_id, booking_date=day,
+                          start_time=start, end_time=end, status=status)
+    amr.db.session.add(booking)
+    amr.db.session.commit()
+    return booking
+
+
+@pytest.fixture
+def day(db):
+    return amr.get_current_eastern_date() + timedelta(days=7)
+
+
+def test_booking_span_past_midnight(day):
+    start, end = booking_span(day, time(22), time(1))
+    assert end - start == 180
+    assert start >= day_window(day)[0] and end > day_window(day)[1]
+
+
+def test_guard_rejects_overlapping_insert(day):
+    add_booking(day, time(9), time(11))
+    with pytest.raises(IntegrityError) as error:
+        add_booking(day, time(10), time(12))
+    amr.db.session.rollback()
+    assert is_overlap_violation(error.value)
+    assert amr.Booking.query.count() == 1
+
+
+def test_guard_allows_back_to_back_and_cancelled(day):
+    add_booking(day, time(9), time(11))
+    add_booking(day, time(11), time(13))
+    cancelled = add_booking(day, time(14), time(16))
+    cancelled.status = 'cancelled'
+    amr.db.session.commit()
+    add_booking(day, time(14), time(16))
+    assert amr.Booking.query.count() == 4
+
+
+def test_guard_rejects_overlap_across_midnight(day):
+    add_booking(day, time(22), time(2))
+    with pytest.raises(IntegrityError) as error:
+        add_booking(day + timedelta(days=1), time(1), time(3))
+    amr.db.session.rollback()
+    assert is_overlap_violation(error.value)
+
+
+def test_guard_rejects_reactivating_a_taken_slot(day):
+    first = add_booking(day, time(9), time(11))
+    first.status = 'cancelled'
+    amr.db.session.commit()
+    add_booking(day, time(9), time(11))
+    first.status = 'confirmed'
+    with pytest.raises(IntegrityError) as error:
+        amr.db.session.commit()
+    amr.db.session.rollback()
+    assert is_overlap_violation(error.value)
+
+
+def test_guard_is_per_crew(day):
+    crews = [amr.Crew(name=f'Crew {n}', category='landscaping') for n in (1, 2)]
+    amr.db.session.add_all(crews)
+    amr.db.session.commit()
+    for crew in crews:
+        booking = amr.Booking(user_id=1, service_type_id=1, crew_id=crew.id, booking_date=day,
+                              start_time=time(9), end_time=time(11), status='confirmed')
+        amr.db.session.add(booking)
+        amr.db.session.commit()
+    amr.db.session.add(amr.Booking(user_id=1, service_type_id=1, crew_id=crews[0].id, booking_date=day,
+                                   start_time=time(10), end_time=time(12), status='confirmed'))
+    with pytest.raises(IntegrityError):
+        amr.db.session.commit()
+    amr.db.session.rollback()
+
+
+def test_bulk_reactivation_reports_slot_taken(admin_client, day):
+    first = add_booking(day, time(9), time(11))
+    first.status = 'cancelled'
+    amr.db.session.commit()
+    add_booking(day, time(9), time(11))
+    other = add_booking(day, time(13), time(15), status='pending')
+    taken_id, other_id = first.id, other.id
+
+    response = admin_client.post('/api/admin/bookings/status', json={'updates': [
+        {'id': taken_id, 'status': 'confirmed'},
+        {'id': other_id, 'status': 'confirmed'},
+    ]})
+
+    results = {result['id']: result for result in response.get_json()['results']}
+    assert results[taken_id] == {'id': taken_id, 'success': False, 'message': 'slot taken'}
+    assert results[other_id]['success']
+    amr.db.session.expire_all()
+    assert amr.db.session.get(amr.Booking, taken_id).status == 'cancelled'
+    assert amr.db.session.get(amr.Booking, other_id).status == 'confirmed'
+
+
+def test_status_code_must_match_status(day):
+    booking = add_booking(day, time(9), time(11))
+    table = amr.Booking.__table__
+    with pytest.raises(IntegrityError):
+        amr.db.session.execute(update(table).where(table.c.id == booking.id).values(status='cancelled'))
+    amr.db.session.rollback()
+    amr.db.session.execute(update(table).where(table.c.id == booking.id)
+                           .values(status='cancelled', status_code=CANCELLED))
+    amr.db.session.commit()
+
+
+def test_migration_ties_status_code_to_status(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "legacy.db"}')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE crew (id INTEGER PRIMARY KEY)'))
+        conn.execute(text('CREATE TABLE booking (id INTEGER PRIMARY KEY, user_id INTEGER, service_type_id INTEGER, '
+                          'booking_date DATE, start_time TIME, end_time TIME, status VARCHAR(20), '
+                          'created_at DATETIME, updated_at DATETIME)'))
+        conn.execute(text("INSERT INTO booking VALUES (1, 1, 1, '2026-06-02', '09:00:00.000000', "
+                          "'11:00:00.000000', 'completed', NULL, NULL), (2, 1, 1, '2026-06-02', '12:00:00.000000', "
+                          "'13:00:00.000000', 'on_hold', NULL, NULL)"))
+        result = install_interval_schema(conn, amr.Booking.__table__)
+    assert result['coded'] == 1 and result['guard']
+
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT status_code FROM booking ORDER BY id')).scalars().all() == [COMPLETED, None]
+        with pytest.raises(IntegrityError) as error:
+            conn.execute(text("UPDATE booking SET status = 'pending' WHERE id = 1"))
+        assert STATUS_CODE_CHECK_NAME in str(error.value)
+        conn.execute(text(f"UPDATE booking SET status = 'pending', status_code = {PENDING} WHERE id = 1"))
+
+
+def test_custom_booking_holds_the_block_it_was_offered(app, day, monkeypatch):
+    monkeypatch.setattr(amr, 'defer', lambda *args, **kwargs: None)
+    custom = amr.ServiceType.query.filter_by(is_custom=True).first()
+    custom.duration_hours = 3.0
+    amr.db.session.commit()
+    assert amr.blocking_minutes(custom.duration_hours, custom) == 60
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(selected_service_id=custom.id, selected_date=day.isoformat(), selected_time='10:00')
+    response = client.post('/submit-booking', data={'first_name': 'Jane', 'last_name': 'Doe',
+                                                    'email': 'jane@example.com', 'phone': '555-0100',
+                                                    'address': '1 Main St', 'custom_description': 'Patio'})
+    assert response.status_code == 302 and '/confirmation/' in response.location
+
+    booking = amr.Booking.query.filter_by(service_type_id=custom.id).one()
+    assert booking.end_time == time(11)
+    assert booking.span_end - booking.span_start == 60
+    # The hour after it is free, as the slot search promised
+    slots = amr.get_available_time_slots(day, custom.duration_hours, custom)
+    assert time(10) not in slots and time(10, 30) not in slots and time(11) in slots
+    add_booking(day, time(11), time(12, 30))
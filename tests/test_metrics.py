@@ -0,0 +1,44 @@
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import app as amr
+import metrics
+
+
+@pytest.fixture
+def metrics_token(app):
+    app.config['METRICS_TOKEN'] = None
+    yield app
+    app.config['METRICS_TOKEN'] = None
+
+
+def test_metrics_loopback_only_without_token(metrics_token):
+    client = metrics_token.test_client()
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '::1'}).status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 403
+    assert client.get('/metrics', headers={'X-Forwarded-For': '203.0.113.9'}).status_code == 403
+
+
+def test_metrics_token(metrics_token):
+    metrics_token.config['METRICS_TOKEN'] = 'secret'
+    client = metrics_token.test_client()
+    remote = {'REMOTE_ADDR': '10.0.0.5'}
+    assert client.get('/metrics', environ_base=remote).status_code == 401
+    assert client.get('/metrics', environ_base=remote, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', environ_base=remote, headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert b'amr_http_requests_total' in response.data
+
+
+def test_failed_statement_releases_its_start_time(app, db):
+    with app.test_request_context('/'):
+        metrics._start_request()
+        with amr.db.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM no_such_table'))
+            assert conn.info['_metrics_query_start'] == {}
+        assert g._metrics_sql_count == 2
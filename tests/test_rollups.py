@@ -0,0 +1,86 @@
+from datetime import time, timedelta
+
+import pytest
+from sqlalchemy import select
+
+import app as amr
+from rollups import rebuild_rollups
+
+
+def rollup_rows():
+    conn = amr.db.session.connection()
+    daily = amr.BookingDailyStat.__table__
+    totals = amr.BookingStatusTotal.__table__
+    return (
+        sorted(tuple(row) for row in conn.execute(
+            select(daily.c.booking_date, daily.c.service_type_id, daily.c.status,
+                   daily.c.booking_count)
+            .where(daily.c.booking_count != 0)).all()),
+        sorted(tuple(row) for row in conn.execute(
+            select(totals.c.status, totals.c.booking_count).where(totals.c.booking_count != 0)).all()),
+    )
+
+
+def assert_matches_rebuild():
+    incremental = rollup_rows()
+    rebuild_rollups(amr.db.session.connection(), amr.Booking.__table__,
+                    amr.BookingDailyStat.__table__, amr.BookingStatusTotal.__table__)
+    assert incremental == rollup_rows()
+    amr.db.session.rollback()
+
+
+@pytest.fixture
+def bookings(db):
+    day = amr.get_current_eastern_date() + timedelta(days=3)
+    rows = [
+        amr.Booking(user_id=1, service_type_id=1, booking_date=day, start_time=time(9), end_time=time(11),
+                    status='confirmed'),
+        amr.Booking(user_id=1, service_type_id=2, booking_date=day, start_time=time(12), end_time=time(13),
+                    status='pending'),
+        amr.Booking(user_id=1, service_type_id=1, booking_date=day + timedelta(days=1), start_time=time(23),
+                    end_time=time(1), status='confirmed'),
+    ]
+    amr.db.session.add_all(rows)
+    amr.db.session.commit()
+    return rows
+
+
+def test_rollups_after_insert(bookings):
+    assert_matches_rebuild()
+    daily, totals = rollup_rows()
+    assert dict(totals) == {'confirmed': 2, 'pending': 1}
+    assert sum(row[3] for row in daily) == 3
+
+
+def test_rollups_after_status_change(bookings):
+    bookings[1].status = 'confirmed'
+    bookings[0].status = 'completed'
+    amr.db.session.commit()
+    assert_matches_rebuild()
+
+
+def test_rollups_after_cancel_and_delete(bookings):
+    bookings[0].status = 'cancelled'
+    amr.db.session.delete(bookings[2])
+    amr.db.session.commit()
+    assert_matches_rebuild()
+    assert dict(rollup_rows()[1]) == {'cancelled': 1, 'pending': 1}
+
+
+def test_rollups_after_rescheduling(bookings):
+    bookings[1].booking_date += timedelta(days=2)
+    bookings[1].end_time = time(15)
+    amr.db.session.commit()
+    assert_matches_rebuild()
+
+
+def test_rollups_after_bulk_status_update(admin_client, bookings):
+    ids = [booking.id for booking in bookings]
+    response = admin_client.post('/api/admin/bookings/status', json={'updates': [
+        {'id': ids[0], 'status': 'cancelled'},
+        {'id': ids[1], 'status': 'confirmed', 'admin_notes': 'Called back'},
+        {'id': ids[2], 'status': 'completed'},
+    ]})
+    assert response.get_json()['updated'] == 3
+    amr.db.session.expire_all()
+    assert_matches_rebuild()
@@ -0,0 +1,83 @@
+import logging
+
+from sqlalchemy import create_engine, inspect, text
+
+import app as amr
+import search
+from search import search_customers
+
+
+def add_customers(*names):
+    for first_name, last_name, email in names:
+        customer = amr.User(first_name=first_name, last_name=last_name, email=email, phone='555-0100',
+                            address='12 Willow Lane')
+        customer.set_password('secret')
+        amr.db.session.add(customer)
+    amr.db.session.commit()
+
+
+def found(client, q, **params):
+    response = client.get('/api/admin/customers/search', query_string={'q': q, **params})
+    assert response.status_code == 200
+    return [customer['name'] for customer in response.get_json()['customers']]
+
+
+CUSTOMERS = [
+    ('Jane', 'Smith', 'jane.smith@example.com'),
+    ('John', 'SMITHSON', 'JOHN@Example.com'),
+    ('Ana', 'Robinson', 'ana@mail.test'),
+]
+
+
+def test_search_endpoint(admin_client, db):
+    add_customers(*CUSTOMERS)
+
+    # Newest first; admins are never returned
+    assert found(admin_client, 'smith') == ['John SMITHSON', 'Jane Smith']
+    assert found(admin_client, 'SMITH jane') == ['Jane Smith']
+    assert found(admin_client, 'example') == ['John SMITHSON', 'Jane Smith']
+    assert found(admin_client, 'admin') == []
+    # Short terms match as prefixes, ignoring case
+    assert found(admin_client, 'jo') == ['John SMITHSON']
+    assert found(admin_client, 'SM ro') == []
+    assert found(admin_client, 'smith', limit=1) == ['John SMITHSON']
+
+    response = admin_client.get('/api/admin/customers/search', query_string={'q': 'smith'})
+    customer = response.get_json()['customers'][0]
+    assert customer['email'] == 'JOHN@Example.com' and customer['total_bookings'] == 0
+
+
+def test_search_requires_admin(app, db):
+    add_customers(*CUSTOMERS)
+    client = app.test_client()
+    client.post('/api/login', json={'email': 'jane.smith@example.com', 'password': 'secret'})
+    assert client.get('/api/admin/customers/search?q=smith').status_code == 403
+
+
+def test_search_without_index_ignores_case(admin_client, db):
+    amr.db.session.execute(text('DROP TABLE user_search'))
+    for trigger in ('insert', 'update', 'delete'):
+        amr.db.session.execute(text(f'DROP TRIGGER user_search_{trigger}'))
+    amr.db.session.commit()
+    add_customers(*CUSTOMERS)
+
+    assert found(admin_client, 'smith') == ['John SMITHSON', 'Jane Smith']
+    assert found(admin_client, 'EXAMPLE.COM ja') == ['Jane Smith']
+    assert found(admin_client, 'j') == ['John SMITHSON', 'Jane Smith']
+
+
+def test_create_all_survives_index_failure(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(search, '_SQLITE_DDL', [
+        "CREATE VIRTUAL TABLE user_search USING fts5(first_name, tokenize='no_such_tokenizer')"])
+    engine = create_engine(f'sqlite:///{tmp_path / "no-fts.db"}')
+    with caplog.at_level(logging.WARNING, logger='amr.search'):
+        amr.db.metadata.create_all(engine)
+
+    tables = inspect(engine).get_table_names()
+    assert 'user' in tables and 'booking' in tables and 'user_search' not in tables
+    assert 'Customer search index not created' in caplog.text
+    with engine.begin() as conn:
+        conn.execute(amr.User.__table__.insert().values(
+            first_name='Jane', last_name='Smith', email='jane@example.com', email_normalized='jane@example.com',
+            phone='555-0100', address='12 Willow Lane', password_hash='x', is_admin=False))
+        assert [row.last_name for row in search_customers(conn, 'SMITH')] == ['Smith']
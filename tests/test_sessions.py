@@ -0,0 +1,133 @@
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from markupsafe import Markup
+from sqlalchemy import select
+
+import sessions
+from conftest import ADMIN_EMAIL, ADMIN_PASSWORD
+from sessions import dumps, loads, session_table
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions, 'time_module', clock)
+    return clock
+
+
+@pytest.fixture
+def store(app):
+    return app.extensions['amr_sessions']
+
+
+def session_id(client, app):
+    cookie = client.get_cookie(app.config['SESSION_COOKIE_NAME'])
+    return cookie.value if cookie else None
+
+
+def expires_at(store, sid):
+    with store.engine.connect() as conn:
+        return conn.execute(select(session_table.c.expires_at).where(session_table.c.id == sid)).scalar()
+
+
+def test_round_trip_tagged_types():
+    data = {
+        'seen': datetime(2026, 6, 2, 9, 30, tzinfo=timezone.utc),
+        'slot': (9, 30),
+        'token': b'\x00\xff',
+        'uuid': uuid.UUID(int=1),
+        '_flashes': [('ok', Markup('<b>Hi</b>'))],
+        'options': {'notes': 'x', 'extras': [1, 2.5, None, True]},
+    }
+    assert loads(dumps(data)) == data
+    assert isinstance(loads(dumps(data))['_flashes'][0][1], Markup)
+
+    small = dumps({'selected_service_id': 3})
+    assert small[:1] == b'\x00' and loads(small) == {'selected_service_id': 3}
+    large = dumps({'notes': 'x' * 2000})
+    assert large[:1] == b'\x01' and len(large) < 100
+    assert loads(large) == {'notes': 'x' * 2000}
+
+    with pytest.raises(ValueError):
+        loads(b'\x07{}')
+
+
+def test_session_id_rotates_on_login_and_logout(app, db, store):
+    client = app.test_client()
+    client.post('/api/set-booking-options', json={'notes': 'gate code'})
+    anonymous = session_id(client, app)
+    assert anonymous and len(anonymous) == 43
+
+    client.post('/api/login', json={'email': ADMIN_EMAIL, 'password': ADMIN_PASSWORD})
+    logged_in = session_id(client, app)
+    assert logged_in != anonymous
+    assert expires_at(store, anonymous) is None
+
+    client.post('/api/logout')
+    logged_out = session_id(client, app)
+    assert logged_out not in (None, anonymous, logged_in)
+    assert expires_at(store, logged_in) is None
+    # The funnel data moves with the session; the login doesn't
+    with client.session_transaction() as session:
+        assert session['booking_options'] == {'notes': 'gate code'}
+        assert '_user_id' not in session
+
+
+def test_refresh_after_half_life(app, db, store, clock):
+    ttl = app.config['SESSION_TTL_SECONDS']
+    client = app.test_client()
+    client.post('/api/set-booking-options', json={'notes': 'gate code'})
+    # Flask-Login marks the session not fresh on its first anonymous request
+    client.get('/api/current-user')
+    sid = session_id(client, app)
+    first_expiry = expires_at(store, sid)
+    assert first_expiry == int(clock.now) + ttl
+
+    # Unchanged and not yet half way: the row isn't rewritten
+    clock.now += ttl // 2 - 60
+    client.get('/api/current-user')
+    assert expires_at(store, sid) == first_expiry
+
+    clock.now += 120
+    client.get('/api/current-user')
+    assert session_id(client, app) == sid
+    assert expires_at(store, sid) == int(clock.now) + ttl
+
+    # Past its expiry the session is gone and a new one starts
+    clock.now += ttl + 1
+    client.post('/api/set-booking-options', json={'notes': 'new'})
+    assert session_id(client, app) != sid
+
+
+def test_sweep_removes_expired_rows(store):
+    now = int(time.time())
+    store.save('expired-' + 'a' * 35, dumps({'n': 1}), now - 1)
+    store.save('current-' + 'a' * 35, dumps({'n': 2}), now + 60)
+
+    assert store.sweep(now) >= 1
+    assert expires_at(store, 'expired-' + 'a' * 35) is None
+    assert expires_at(store, 'current-' + 'a' * 35) == now + 60
+    assert store.load('current-' + 'a' * 35, now) == ({'n': 2}, now + 60)
+    assert store.load('current-' + 'a' * 35, now + 60) is None
+
+    # maybe_sweep runs at most once per sweep_seconds
+    store._next_sweep = 0
+    store.save('expired-' + 'b' * 35, dumps({}), now - 1)
+    store.maybe_sweep(now)
+    assert expires_at(store, 'expired-' + 'b' * 35) is None
+    store.save('expired-' + 'c' * 35, dumps({}), now - 1)
+    store.maybe_sweep(now + 1)
+    assert expires_at(store, 'expired-' + 'c' * 35) == now - 1
+    store.maybe_sweep(now + store.sweep_seconds)
+    assert expires_at(store, 'expired-' + 'c' * 35) is None
@@ -0,0 +1,18 @@
+"""
+WSGI Entry Point
+================
+
+The one place the production app is built, for WSGI servers:
+
+    gunicorn wsgi:app
+
+app.py only defines create_app(), so modules that import it for models or
+helpers (exports, reminders, seeding, tests, benchmarks) don't open the
+database, start the event listener or spin up task threads as a side effect
+of the import. `flask --app app ...` finds create_app() on its own, and
+`python app.py` builds its own app for local development.
+"""
+
+from app import create_app
+
+app = create_app()